@@ -1,23 +1,29 @@
+import time
+# measured from here, before the imports
+START_TIME = time.perf_counter()
 import sys 
+import argparse
 from PyQt5.QtWidgets import QApplication    
-from PyQt5.QtCore import QThread
+from PyQt5.QtCore import QThread, QTimer
 from views.menu import MainMenu
 from model.menu_model import MenuModel
-from model.tool_model import ToolModel
-from model.year_panel_model import YearPanelModel
 from model.widget_models import ClassificationModel, RegistrationModel
 from controller.menu_controller import MenuController
-from controller.tool_controller import ToolController
-from controller.year_panel_controller import YearPanelController
 from controller.widget_controllers import ClassificationController, RegistrationController
-from views.annotation_tool import AnnotationTool
-from views.year_panel import YearPanel
 from views.menu_widgets import ClassificationMenu, RegistrationMenu
+from views import ui_loader
 from database.db import SlabInventory
-from registration.registration import SlabRegistration
+# the modules of the annotation tool and the registration script are only
+# imported when they are used, so the main menu shows up sooner
+IMPORT_TIME = time.perf_counter() - START_TIME
+
+
 class App(QApplication):
-    def __init__(self, sys_argv):
+    def __init__(self, sys_argv, debug=False, profile_startup=False):
         super().__init__(sys_argv)
+        self.debug = debug
+        self.profile_startup = profile_startup
+        construct_start = time.perf_counter()
         self.slab_inventory = SlabInventory()
         self.menu_model = MenuModel(self.slab_inventory)
         self.classification_model = ClassificationModel(
@@ -42,12 +48,34 @@ class App(QApplication):
         self.menu = MainMenu(self.menu_controller, self.menu_model, 
                              self.classification_view, self.registration_view)
         self.menu.show()
+        if self.profile_startup:
+            construct_time = time.perf_counter() - construct_start
+            # runs on the first iteration of the event loop
+            QTimer.singleShot(
+                0, lambda: self.print_startup_profile(construct_time)
+                )
+
+
+    def print_startup_profile(self, construct_time):
+        """Prints the time spent importing modules, building the windows from
+        their .ui files and constructing the main menu.
+
+        Args:
+            construct_time (float): seconds spent constructing the main menu
+        """
+        print(f'Imports: {IMPORT_TIME:.3f} s')
+        for name, load_time in ui_loader.ui_load_times.items():
+            print(f'  {name}.ui: {load_time:.3f} s')
+        print(f'Main menu construction: {construct_time:.3f} s')
+        print('Time to first event loop iteration: '
+              f'{time.perf_counter() - START_TIME:.3f} s')
 
 
     def run_registration_script(self):
         """Runs script to register slabs and output spreadsheet of slab data.
 
         """
+        from registration.registration import SlabRegistration
         sorted_years = dict(sorted(self.registration_model.years_selected.items()))
         years_selected = list(sorted_years.keys())
         start_bys = list(sorted_years.values()) 
@@ -91,37 +119,94 @@ class App(QApplication):
         form. The main menu window is closed and the annotation tool window is
         opened.
         """
+        start = time.perf_counter()
+        from model.tool_model import ToolModel
+        from model.year_panel_model import YearPanelModel
+        from controller.tool_controller import ToolController
+        from controller.year_panel_controller import YearPanelController
+        from controller.slab_prefetcher import SlabPrefetcher
+        from views.annotation_tool import AnnotationTool
+        from views.year_panel import YearPanel
+        from database.write_behind import SlabUpdateWriter
+        from utils.lru_cache import LRUCache
+        import_time = time.perf_counter() - start
 
-        reg_data = self.classification_model.registrations[
+        reg_metadata = self.classification_model.registrations[
             self.classification_model.registration
             ]
+        # the menu only has the metadata of the registrations
+        reg_data = self.slab_inventory.fetch_registration(reg_metadata['_id'])
         dir = self.menu_model.directory
         self.year_panels = {}
         self.year_controllers = {}
         self.year_models = {}
 
-        # Each year to annotate has its own MVC components
+        # annotations are saved to the database in the background
+        self.slab_writer = SlabUpdateWriter(self.slab_inventory)
+
+        # Each year to annotate has its own model
         for year in reg_data['years']:
-            year_model = YearPanelModel(year, self.slab_inventory, 
-                                        reg_data['segment_id'])
-            year_controller = YearPanelController(year_model)
+            self.year_models[year] = YearPanelModel(year, self.slab_inventory, 
+                                                    reg_data['segment_id'],
+                                                    self.slab_writer)
+        self.tool_model = ToolModel(self.year_models, self.slab_inventory, 
+                                    dir, reg_data, self.slab_writer)
+        # slab images are shared by all the years and loaded in advance
+        self.prefetcher = SlabPrefetcher(self.tool_model, YearPanel.IMAGE_SIZE)
+        self.aboutToQuit.connect(self.prefetcher.shutdown)
+        # scaled images shown by the year panels
+        self.pixmap_cache = LRUCache(
+            128 * 1024 * 1024,
+            size_of=lambda pix: pix.width() * pix.height() * pix.depth() // 8
+            )
+
+        for year, year_model in self.year_models.items():
+            year_controller = YearPanelController(year_model, self.prefetcher,
+                                                  self.pixmap_cache)
             year_view = YearPanel(year_controller, year_model)
-            self.year_models[year] = year_model
             self.year_controllers[year] = year_controller
             self.year_panels[year] = year_view
 
         # set up the clasification widgets
     
-        self.tool_model = ToolModel(self.year_models, self.slab_inventory, 
-                                    dir, reg_data)
         self.tool_controller = ToolController(self.tool_model,
-                                              self.year_controllers)  
+                                              self.year_controllers,
+                                              self.prefetcher)  
+        self.aboutToQuit.connect(self.tool_controller.save_updates)
+        debug_caches = None
+        if self.debug:
+            debug_caches = {'images': self.prefetcher.image_cache,
+                            'pixmaps': self.pixmap_cache}
         self.annotation_tool = AnnotationTool(self.tool_controller, 
                                               self.tool_model, 
-                                              self.year_panels)
+                                              self.year_panels,
+                                              debug_caches)
         self.annotation_tool.show()
+        if self.profile_startup:
+            print(f'Annotation tool imports: {import_time:.3f} s')
+            for name in ('mainapp', 'year_panel'):
+                if name in ui_loader.ui_load_times:
+                    print(f'  {name}.ui (last load): '
+                          f'{ui_loader.ui_load_times[name]:.3f} s')
+            print('Annotation tool startup: '
+                  f'{time.perf_counter() - start:.3f} s')
 
 
 if __name__ == '__main__':
-    app = App(sys.argv)
+    parser = argparse.ArgumentParser(
+        description='Slab registration and classification tool'
+    )
+    parser.add_argument('--debug',
+                        default=False,
+                        action='store_true',
+                        help='show cache statistics in the status bar of the '
+                             'annotation tool')
+    parser.add_argument('--profile-startup',
+                        default=False,
+                        action='store_true',
+                        help='print the time spent importing modules and '
+                             'building the windows at startup')
+    # remaining arguments are passed to Qt
+    args, qt_args = parser.parse_known_args()
+    app = App(sys.argv[:1] + qt_args, args.debug, args.profile_startup)
     sys.exit(app.exec_())    
\ No newline at end of file
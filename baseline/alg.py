@@ -1,56 +1,231 @@
-import pandas as pd
+import argparse
+
 import numpy as np
-def baseline(lengths, replacements, pattern, BYID_start):
-    baseline_lengths = []
-    valid_indices = []
-    num_slabs = len(lengths)
-    bsid = [None for _ in range(num_slabs)]
-    byid = []
-    for i in range(num_slabs):
-        if (replacements[i] != 'R'
-            and (i == 0 or replacements[i-1] != 'R') 
-            and (i == len(lengths) - 1 or replacements[i+1] != 'R')):
-
-            valid_indices.append(i)
-    print(valid_indices)
-    for i in range(len(valid_indices)):
-        curr_index = valid_indices[i]
-        if i == 0 or valid_indices[i - 1] == curr_index - 1:
-            baseline_lengths.append(lengths[curr_index])
-            byid.append(curr_index + BYID_start)
-            
-        else:
-            r = curr_index
-            l = valid_indices[i - 1]
-            replacement_lengths = lengths[l+1:r]
-            baseline_lengths += generate_baseline_lengths(replacement_lengths, pattern, byid)
-            baseline_lengths.append(lengths[curr_index])
-            byid.append(curr_index + BYID_start)
-        bsid[curr_index] = len(baseline_lengths)
-    return baseline_lengths, bsid, byid
-
-
-
-def generate_baseline_lengths(replacement_lengths, pattern, byid):
-    pattern_avg = sum(pattern) / len(pattern)   
-    est_slabs = round(sum(replacement_lengths) / pattern_avg)
-    baseline_lengths = [sum(replacement_lengths) / est_slabs for i in range(est_slabs)]
-    for _ in range(len(baseline_lengths)):
-        byid.append(None)
-    return baseline_lengths
-
-df = pd.read_excel('lengths.xlsx')
-lengths = df['BY_length (ft)'].tolist()
-replacements = df['2013_state'].tolist()
-pattern = [16, 17, 22, 23]
-# lengths = [21.88, 23.29, 17.49, 16.57, 21.82, 9.49, 13.23, 8.9, 9.03, 22, 23]
-# rep = [0, 0, 0, 0, 0, 1, 1, 1, 1, 0, 0]
-
-baseline_lengths, bsid, byid = baseline(lengths, replacements, pattern, 8)
-df_1 = pd.DataFrame()
-df_1['baseline_lengths'] = baseline_lengths
-df_1['byid'] = byid
-df_1['bsid'] = [i for i in range(1, len(baseline_lengths) + 1)]
-df['bsid'] = bsid
-df.to_excel('baseline_lengths.xlsx')
-df_1.to_excel('baseline_lengths_and_BYID.xlsx', index=False)
\ No newline at end of file
+import pandas as pd
+
+from registration.export import (fetch_year_table, read_single_table,
+                                 slab_states)
+
+
+def kept_slabs(replaced: np.ndarray) -> np.ndarray:
+    """Finds the slabs kept in the baseline: slabs that are not replaced and
+    not next to a replaced slab.
+
+    Args:
+        replaced (np.ndarray): True for each replaced slab
+
+    Returns:
+        np.ndarray: indices of the kept slabs, in order
+    """
+    replaced = np.asarray(replaced, dtype=bool)
+    # a replaced slab also invalidates its neighbors, whose joints were
+    # rebuilt with it
+    invalid = replaced.copy()
+    invalid[1:] |= replaced[:-1]
+    invalid[:-1] |= replaced[1:]
+    return np.flatnonzero(~invalid)
+
+
+def baseline(lengths: np.ndarray, replaced: np.ndarray, pattern: list[float],
+             by_ids: np.ndarray=None):
+    """Reconstructs the slabs of the segment before the replacements. The
+    slabs that are not replaced and not next to a replaced slab are kept.
+    Each run of slabs between two kept slabs is split into slabs of equal
+    length, as many as slabs of the average joint spacing of the pattern fit
+    in the run (at least one). Slabs before the first and after the last kept
+    slab are left out.
+
+    Args:
+        lengths (np.ndarray): length of each BY slab
+        replaced (np.ndarray): True for each replaced BY slab
+        pattern (list[float]): joint spacing pattern of the segment, in the
+        unit of the lengths
+        by_ids (np.ndarray, optional): id of each BY slab. Defaults to None
+        (the index of the slab).
+
+    Returns:
+        tuple: the length of each baseline slab, the 1-based index of the
+        baseline slab of each BY slab (-1 for the BY slabs not kept), and the
+        BY id of each baseline slab (-1 for the reconstructed slabs)
+    """
+    lengths = np.asarray(lengths, dtype=float)
+    if by_ids is None:
+        by_ids = np.arange(len(lengths))
+    kept = kept_slabs(replaced)
+    bsid = np.full(len(lengths), -1, dtype=np.int64)
+    if not kept.size:
+        return np.empty(0), bsid, np.empty(0, dtype=np.int64)
+
+    # runs of slabs between two consecutive kept slabs, with the kept slab
+    # closing each run
+    run_ends = kept[1:][np.diff(kept) > 1]
+    run_starts = kept[:-1][np.diff(kept) > 1] + 1
+    cum_lengths = np.concatenate(([0], np.cumsum(lengths)))
+    run_lengths = cum_lengths[run_ends] - cum_lengths[run_starts]
+    num_slabs = np.maximum(
+        np.round(run_lengths / np.mean(pattern)).astype(np.int64), 1)
+
+    # number of reconstructed slabs before each kept slab
+    before = np.zeros(len(kept), dtype=np.int64)
+    before[np.searchsorted(kept, run_ends)] = num_slabs
+    # position of each kept slab in the baseline
+    positions = np.cumsum(before + 1) - 1
+    total = int(positions[-1]) + 1
+    baseline_lengths = np.empty(total)
+    baseline_by_ids = np.full(total, -1, dtype=np.int64)
+    reconstructed = np.ones(total, dtype=bool)
+    reconstructed[positions] = False
+    baseline_lengths[positions] = lengths[kept]
+    baseline_lengths[reconstructed] = np.repeat(run_lengths / num_slabs,
+                                                num_slabs)
+    baseline_by_ids[positions] = np.asarray(by_ids)[kept]
+    bsid[kept] = positions + 1
+    return baseline_lengths, bsid, baseline_by_ids
+
+
+def load_spreadsheet(path: str, year: int):
+    """Loads the BY slabs of a registration from its single spreadsheet.
+
+    Args:
+        path (str): path of the CSV or Parquet file of the spreadsheet
+        year (int): year the replaced slabs are taken from
+
+    Returns:
+        tuple: length of each BY slab in feet, True for each replaced BY slab
+        and id of each BY slab
+    """
+    parquet_path = path if path.endswith('.parquet') else None
+    table = read_single_table(path, parquet_path)
+    return (table['BY_length (ft)'].to_numpy(dtype=float),
+            (table[f'{year}_state'] == 'R').to_numpy(),
+            table['BY_id'].to_numpy(dtype=np.int64))
+
+
+def load_registration(slab_inventory, registration: dict, year: int,
+                      include_intensity_replaced=False):
+    """Loads the BY slabs of a registration from the database, reading the
+    BY slabs and the slabs of the year in a query each.
+
+    Args:
+        slab_inventory (SlabInventory): database containing all the slab data
+        registration (dict): the registration entry
+        year (int): year the replaced slabs are taken from
+        include_intensity_replaced (bool, optional): see slab_states. Defaults
+        to False.
+
+    Raises:
+        ValueError: if the registration does not have its majority slabs
+
+    Returns:
+        tuple: length of each BY slab in feet, True for each replaced BY slab
+        and id of each BY slab
+    """
+    if registration.get('layout') == 'slabs':
+        reg_data = slab_inventory.fetch_registration_slabs(
+            registration['_id'], registration['first_base_id'],
+            registration['last_base_id'])
+    else:
+        reg_data = registration['registration_data']
+    if any('majority' not in entry for entry in reg_data):
+        raise ValueError('The registration does not have its majority slabs, '
+                         'run the registration again.')
+    seg_str = registration['segment_id']
+    by_ids = np.fromiter((entry['base_id'] for entry in reg_data),
+                         dtype=np.int64, count=len(reg_data))
+    year_ids = np.fromiter(
+        (entry['majority'].get(str(year), -1) for entry in reg_data),
+        dtype=np.int64, count=len(reg_data)
+        )
+    by_table = fetch_year_table(slab_inventory, seg_str,
+                                registration['base_year'])
+    year_table = fetch_year_table(slab_inventory, seg_str, year)
+    lengths = np.round(
+        by_table['length'].reindex(by_ids).to_numpy() / 304.8, 2)
+    states = slab_states(year_table.reindex(year_ids),
+                         include_intensity_replaced)
+    return lengths, states == 'R', by_ids
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description='Reconstructs the slabs of a segment before the '
+                    'replacements, from the single spreadsheet of a '
+                    'registration or from the database'
+    )
+    parser.add_argument('-s',
+                        metavar='<spreadsheet>',
+                        type=str,
+                        default=None,
+                        help='CSV or Parquet single spreadsheet of the '
+                             'registration (default: read the registration '
+                             'from the database)')
+    parser.add_argument('-i',
+                        metavar='<interstate>',
+                        type=str,
+                        default=None,
+                        help='Interstate of the registration (eg. I16WB)')
+    parser.add_argument('-b',
+                        metavar='<beginning MM>',
+                        type=str,
+                        default=None,
+                        help='begining MM of the segment')
+    parser.add_argument('-e',
+                        metavar='<ending MM>',
+                        type=str,
+                        default=None,
+                        help='ending MM of the segment')
+    parser.add_argument('--by',
+                        metavar='<base year>',
+                        type=int,
+                        default=None,
+                        help='Base year of the registration')
+    parser.add_argument('-y',
+                        metavar='<year>',
+                        type=int,
+                        required=True,
+                        help='Year the replaced slabs are taken from')
+    parser.add_argument('--pattern',
+                        metavar='<length in ft>',
+                        type=float,
+                        nargs='+',
+                        default=[16, 17, 22, 23],
+                        help='Joint spacing pattern of the segment, in feet')
+    parser.add_argument('-o',
+                        metavar='<output prefix>',
+                        type=str,
+                        required=True,
+                        help='Prefix of the output files, <prefix>_bsid.csv '
+                             '(baseline slab of each BY slab) and '
+                             '<prefix>_slabs.csv (baseline slabs)')
+    args = parser.parse_args()
+
+    if args.s is not None:
+        lengths, replaced, by_ids = load_spreadsheet(args.s, args.y)
+    else:
+        if None in (args.i, args.b, args.e, args.by):
+            parser.error('-i, -b, -e and --by are required without -s')
+        from database.db import SlabInventory
+        slab_inventory = SlabInventory()
+        registrations = list(slab_inventory.all_registration_data(
+            {'segment_id': f'{args.i}_MM{args.b}_MM{args.e}',
+             'base_year': args.by}))
+        if len(registrations) != 1:
+            parser.error(f'Found {len(registrations)} registrations with '
+                         f'base year {args.by}')
+        lengths, replaced, by_ids = load_registration(
+            slab_inventory, registrations[0], args.y)
+
+    baseline_lengths, bsid, baseline_by_ids = baseline(lengths, replaced,
+                                                       args.pattern, by_ids)
+    pd.DataFrame({
+        'BY_id': by_ids,
+        'BY_length (ft)': lengths,
+        f'{args.y}_replaced': replaced,
+        'bsid': pd.array(np.where(bsid == -1, None, bsid), dtype='Int64')
+        }).to_csv(f'{args.o}_bsid.csv', index=False)
+    pd.DataFrame({
+        'baseline_lengths': baseline_lengths,
+        'byid': pd.array(np.where(baseline_by_ids == -1, None,
+                                  baseline_by_ids), dtype='Int64'),
+        'bsid': np.arange(1, len(baseline_lengths) + 1)
+        }).to_csv(f'{args.o}_slabs.csv', index=False)
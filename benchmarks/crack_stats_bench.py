@@ -0,0 +1,111 @@
+import argparse
+import os
+import sys
+import time
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from cvm import CvmBuilder
+from cvm.core.summary import fast_crack_stats
+
+
+def synthetic_masks(count, height, width, seed):
+    """Generates segmentation masks with 1 to 5 random polyline cracks 1 to
+    9 pixels wide.
+
+    Args:
+        count (int): number of masks
+        height (int): height of the masks
+        width (int): width of the masks
+        seed (int): seed of the random generator
+
+    Returns:
+        list: the masks
+    """
+    rng = np.random.default_rng(seed)
+    masks = []
+    for _ in range(count):
+        mask = np.zeros((height, width), np.uint8)
+        for _ in range(rng.integers(1, 6)):
+            points = [rng.integers(0, [width, height])]
+            for _ in range(rng.integers(2, 8)):
+                step = rng.integers(-height // 4, height // 4, 2)
+                points.append(np.clip(points[-1] + step, 0, 
+                                      [width - 1, height - 1]))
+            cv2.polylines(mask, [np.array(points, np.int32)], False, 255,
+                          int(rng.integers(1, 10)))
+        masks.append(mask)
+    return masks
+
+
+def read_masks(mask_dir):
+    """Reads the segmentation images of a folder as binary masks, the same
+    way the crop does.
+
+    Args:
+        mask_dir (str): folder of the segmentation images
+
+    Returns:
+        list: the masks
+    """
+    masks = []
+    for file in sorted(os.listdir(mask_dir)):
+        img = cv2.imread(os.path.join(mask_dir, file), cv2.IMREAD_GRAYSCALE)
+        if img is not None:
+            masks.append(cv2.threshold(img, 127, 255, cv2.THRESH_BINARY)[1])
+    return masks
+
+
+def relative_error(estimate, reference):
+    if reference == 0:
+        return 0.0 if estimate == 0 else 1.0
+    return abs(estimate - reference) / reference
+
+
+def print_errors(name, errors, unit):
+    errors = np.asarray(errors)
+    print(f'{name:<22}median {np.median(errors):.3f}{unit}  '
+          f'p95 {np.percentile(errors, 95):.3f}{unit}  '
+          f'max {errors.max():.3f}{unit}')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description='Compares the speed and accuracy of the fast crack stats '
+                    'estimate with the full crack vector model'
+    )
+    parser.add_argument('--masks', type=str, default=None,
+                        help='Folder of segmentation images to use instead '
+                             'of synthetic masks')
+    parser.add_argument('--count', type=int, default=200,
+                        help='Number of synthetic masks')
+    parser.add_argument('--pxheight', type=int, default=1250)
+    parser.add_argument('--pxwidth', type=int, default=1040)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    if args.masks:
+        masks = read_masks(args.masks)
+    else:
+        masks = synthetic_masks(args.count, args.pxheight, args.pxwidth, 
+                                args.seed)
+
+    start = time.perf_counter()
+    full = [CvmBuilder().use_seg_img_obj(mask).build().summary() 
+            for mask in masks]
+    full_time = time.perf_counter() - start
+    start = time.perf_counter()
+    fast = [fast_crack_stats(mask) for mask in masks]
+    fast_time = time.perf_counter() - start
+
+    print(f'{len(masks)} masks')
+    print(f'full model: {full_time:.2f} s, fast estimate: {fast_time:.2f} s '
+          f'({full_time / fast_time:.1f}x)')
+    print_errors('total length', [relative_error(f.total_length, r.total_length)
+                                  for f, r in zip(fast, full)], '')
+    print_errors('mean width', [relative_error(f.mean_width, r.mean_width)
+                                for f, r in zip(fast, full)], '')
+    print_errors('median width (px)', [abs(f.median_width - r.median_width)
+                                       for f, r in zip(fast, full)], '')
@@ -0,0 +1,156 @@
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from crop_app.joint import HorizontalJoint
+from crop_app.subjoint import SubJoint
+
+
+class LegacyJoint:
+    """Copy of the list-based HorizontalJoint the crop used before extents
+    were maintained incrementally, kept for comparison.
+    """
+    def __init__(self, subjoints):
+        self.subjoints = subjoints
+
+
+    def add_subjoint(self, subjoint):
+        self.subjoints.append(subjoint)
+        self.subjoints.sort(key=lambda subjoint: subjoint.x1)
+
+
+    def belongs_to_joint(self, new_subjoint):
+        if not self.subjoints:
+            return True
+        y_max = self.get_max_y()
+        y_min = self.get_min_y()
+        return (y_min - 50 <= new_subjoint.y1 <= y_max + 50
+                or y_min - 50 <= new_subjoint.y2 <= y_max + 50)
+
+
+    def get_max_y(self):
+        return max(max([subjoint.y2 for subjoint in self.subjoints]),
+                   (max([subjoint.y1 for subjoint in self.subjoints])))
+
+
+    def get_min_y(self):
+        return min(min([subjoint.y2 for subjoint in self.subjoints]),
+                   (min([subjoint.y1 for subjoint in self.subjoints])))
+
+
+    def get_max_x(self):
+        return max(max([subjoint.x2 for subjoint in self.subjoints]),
+                   (max([subjoint.x1 for subjoint in self.subjoints])))
+
+
+    def get_min_x(self):
+        return min(min([subjoint.x2 for subjoint in self.subjoints]),
+                   (min([subjoint.x1 for subjoint in self.subjoints])))
+
+
+    def get_leftmost_point(self):
+        ret = None
+        for subjoint in self.subjoints:
+            if ret is None or subjoint.x1 < ret[0]:
+                ret = (subjoint.x1, subjoint.y1)
+        return ret
+
+
+def synthetic_subjoints(num_frames: int, px_height: int, px_width: int,
+                        seed: int) -> list[tuple]:
+    """Generates the subjoints of a synthetic annotation set, ordered from
+    bottom to top like the crop reads them. Each joint is broken up into a
+    few subjoints across the lane, with some noise in the y-values.
+
+    Args:
+        num_frames (int): number of frames (images) in the segment
+        px_height (int): height of the images in pixels
+        px_width (int): width of the images in pixels
+        seed (int): seed of the random generator
+
+    Returns:
+        list[tuple]: (x1, y1, x2, y2) of each subjoint, in relative pixels
+    """
+    rng = random.Random(seed)
+    subjoints = []
+    y = num_frames * px_height - rng.randint(200, 1500)
+    while y > 0:
+        num_parts = rng.randint(2, 4)
+        part_width = px_width // num_parts
+        for part in range(num_parts):
+            x1 = part * part_width + rng.randint(0, 20)
+            x2 = (part + 1) * part_width - rng.randint(1, 20)
+            subjoints.append((x1, y + rng.randint(-15, 15),
+                              x2, y + rng.randint(-15, 15)))
+        # slabs are around 4.5 m long, about 1100 px
+        y -= rng.randint(900, 1400)
+    return subjoints
+
+
+def run(joint_class, subjoints: list[tuple], queries: int) -> tuple:
+    """Groups the subjoints into joints and queries the extents of every
+    joint the way the crop does for each slab.
+
+    Args:
+        joint_class (type): joint implementation to benchmark
+        subjoints (list[tuple]): (x1, y1, x2, y2) of each subjoint
+        queries (int): number of times each extent is queried per joint
+
+    Returns:
+        tuple: grouping time (s), query time (s) and the extents of the joints
+    """
+    objs = [SubJoint(*points) for points in subjoints]
+    start = time.perf_counter()
+    joints = []
+    curr_joint = joint_class([])
+    for subjoint in objs:
+        if not curr_joint.belongs_to_joint(subjoint):
+            joints.append(curr_joint)
+            curr_joint = joint_class([])
+        curr_joint.add_subjoint(subjoint)
+    joints.append(curr_joint)
+    group_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for joint in joints:
+        for _ in range(queries):
+            extents = (joint.get_min_x(), joint.get_max_x(),
+                       joint.get_min_y(), joint.get_max_y(),
+                       joint.get_leftmost_point())
+    query_time = time.perf_counter() - start
+    extents = [(joint.get_min_x(), joint.get_max_x(), joint.get_min_y(),
+                joint.get_max_y(), joint.get_leftmost_point())
+               for joint in joints]
+    return group_time, query_time, extents
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description='Benchmarks joint grouping and extent queries on a '
+                    'synthetic annotation set'
+    )
+    parser.add_argument('--frames', type=int, default=20000,
+                        help='Number of synthetic frames')
+    parser.add_argument('--queries', type=int, default=12,
+                        help='Extent queries per joint (per slab in the crop)')
+    parser.add_argument('--pxheight', type=int, default=1250)
+    parser.add_argument('--pxwidth', type=int, default=1040)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    subjoints = synthetic_subjoints(args.frames, args.pxheight, args.pxwidth,
+                                    args.seed)
+    print(f"{args.frames} frames, {len(subjoints)} subjoints")
+    results = {}
+    for name, joint_class in [('list-based', LegacyJoint),
+                              ('incremental', HorizontalJoint)]:
+        group_time, query_time, extents = run(joint_class, subjoints,
+                                              args.queries)
+        results[name] = extents
+        print(f"{name:<12} grouping {group_time:8.3f} s   "
+              f"queries {query_time:8.3f} s   joints {len(extents)}")
+    if results['list-based'] != results['incremental']:
+        raise ValueError("Joint extents differ between implementations.")
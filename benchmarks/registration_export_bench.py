@@ -0,0 +1,218 @@
+import argparse
+import csv
+import os
+import random
+import sys
+import tempfile
+import time
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from registration.export import (build_single_table, refresh_single_table,
+                                 single_spreadsheet_fields,
+                                 write_single_table)
+
+
+class MemoryInventory:
+    """In-memory stand-in for the slab queries of SlabInventory used by the
+    spreadsheet export, with a fixed delay per query to account for the
+    round trip to the database. Update times are plain numbers.
+    """
+    def __init__(self, slabs, latency):
+        self.slabs = slabs
+        self.latency = latency
+
+
+    def fetch_slab(self, year, slab_index, seg_str):
+        time.sleep(self.latency)
+        return self.slabs[year][slab_index]
+
+
+    def fetch_slabs(self, year, slab_indices, seg_str, projection=None,
+                    updated_since=None):
+        time.sleep(self.latency)
+        if slab_indices is None:
+            slab_indices = self.slabs[year].keys()
+        return {slab_index: {field: slab[field] for field in projection
+                             if field in slab} | {'slab_index': slab_index}
+                for slab_index, slab in ((i, self.slabs[year][i])
+                                         for i in slab_indices)
+                if updated_since is None
+                or slab.get('updated_at', -1) >= updated_since}
+
+
+    def annotate(self, year, slab_index, update_data, time):
+        self.slabs[year][slab_index].update(update_data, updated_at=time)
+
+
+def synthetic_registration(num_slabs: int, years: list[int], seed: int):
+    """Generates the slabs and the registration data of a synthetic
+    registration. Every BY slab is associated with one to three slabs of
+    every other year.
+
+    Args:
+        num_slabs (int): number of BY slabs
+        years (list[int]): years of the registration, the first being the BY
+        seed (int): seed of the random generator
+
+    Returns:
+        tuple: slabs by year and slab index, registration data and majority
+        slabs
+    """
+    rng = random.Random(seed)
+    by = years[0]
+    slabs = {year: {} for year in years}
+    reg_data = [{'base_id': i + 1, 'replaced': None, 'replaced_type': None,
+                 str(by): [i + 1]} for i in range(num_slabs)]
+    majority_slabs = [{str(by): i + 1} for i in range(num_slabs)]
+    for year in years:
+        slab_index = 1
+        for i in range(num_slabs):
+            count = 1 if year == by else rng.choice((1, 1, 1, 2, 3))
+            ids = list(range(slab_index, slab_index + count))
+            slab_index += count
+            for cy_id in ids:
+                slab = {'length': rng.uniform(3000, 6000),
+                        'median_faulting': rng.uniform(-2, 4),
+                        'mean_faulting': rng.choice((0, rng.uniform(-2, 4))),
+                        'p95_faulting': rng.uniform(0, 6)}
+                if rng.random() < 0.8:
+                    slab['total_crack_length'] = rng.uniform(0, 9000)
+                    slab['median_crack_width'] = rng.uniform(1, 8)
+                slabs[year][cy_id] = slab
+            if year != by:
+                reg_data[i][str(year)] = ids
+                majority_slabs[i][str(year)] = rng.choice(ids)
+                if rng.random() < 0.02:
+                    reg_data[i]['replaced'] = year
+                    reg_data[i]['replaced_type'] = 'FULL_REPLACEMENT'
+    return slabs, reg_data, majority_slabs
+
+
+def legacy_spreadsheet(path, slab_inventory, seg_str, years, by, reg_data,
+                       majority_slabs, avg_faulting):
+    """Copy of the row-by-row export of SlabRegistration used before the
+    spreadsheet was built a column at a time, kept for comparison.
+    """
+    def avg_faulting_BY(byi, year):
+        total = 0
+        count = 0
+        for cy_id in reg_data[byi][str(year)]:
+            slab = slab_inventory.fetch_slab(year, cy_id, seg_str)
+            if slab['mean_faulting']:
+                total += slab['mean_faulting']
+                count += 1
+        if total == 0:
+            return None
+        return total / count
+
+    metadata = seg_str.split('_')
+    interstate = metadata[0]
+    curr_MP = int(metadata[1][2:])
+    with open(path, 'w', newline='') as csv_file:
+        writer = csv.DictWriter(csv_file,
+                                fieldnames=single_spreadsheet_fields(years))
+        writer.writeheader()
+        direction = interstate[-2:].upper()
+        for i, entry in enumerate(reg_data):
+            row_dict = {'interstate': interstate[0:-2],
+                        'direction': direction,
+                        'year_replaced': entry['replaced'],
+                        'replaced_type': entry['replaced_type']}
+            for year in years:
+                if str(year) in majority_slabs[i]:
+                    yr_id = majority_slabs[i][str(year)]
+                    yr_slab = slab_inventory.fetch_slab(year, yr_id, seg_str)
+                    row_dict[f'{year}_faulting'] = (
+                        avg_faulting_BY(i, year) if avg_faulting
+                        else yr_slab['median_faulting'])
+                    row_dict[f'{year}_p95_faulting'] = yr_slab['p95_faulting']
+                    row_dict[f'{year}_total_crack_length'] = yr_slab.get(
+                        'total_crack_length')
+                    row_dict[f'{year}_median_crack_width'] = yr_slab.get(
+                        'median_crack_width')
+                if year == by:
+                    row_dict['BY_id'] = yr_id
+                    row_dict['BY_length (ft)'] = round(
+                        yr_slab['length'] / 304.8, 2)
+                    row_dict['MP_from'] = curr_MP
+                    curr_MP += (round(yr_slab['length'] / 1609000, 5)
+                                if direction in ['NB', 'EB']
+                                else -round(yr_slab['length'] / 1609000, 5))
+                    row_dict['MP_to'] = curr_MP
+            writer.writerow(row_dict)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description='Benchmarks the single spreadsheet export of a synthetic '
+                    'registration against the row-by-row export'
+    )
+    parser.add_argument('--slabs', type=int, default=10000,
+                        help='Number of BY slabs')
+    parser.add_argument('--years', type=int, default=10,
+                        help='Number of years, including the BY')
+    parser.add_argument('--latency', type=float, default=0.2,
+                        help='Delay of each database query, in ms')
+    parser.add_argument('--avg-faulting', default=False, action='store_true',
+                        help='average the faulting of the CY slabs')
+    parser.add_argument('--annotated', type=float, default=0.01,
+                        help='Fraction of the slabs annotated before the '
+                             'spreadsheet is refreshed')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    seg_str = 'I16WB_MM0_MM10'
+    years = list(range(2010, 2010 + args.years))
+    slabs, reg_data, majority_slabs = synthetic_registration(
+        args.slabs, years, args.seed)
+    inventory = MemoryInventory(slabs, args.latency / 1000)
+    print(f'{args.slabs} BY slabs x {args.years} years, '
+          f'{args.latency} ms per query')
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        legacy_path = os.path.join(tmp_dir, 'legacy.csv')
+        start = time.perf_counter()
+        legacy_spreadsheet(legacy_path, inventory, seg_str, years, years[0],
+                           reg_data, majority_slabs, args.avg_faulting)
+        print(f'row-by-row  {time.perf_counter() - start:8.3f} s')
+
+        csv_path = os.path.join(tmp_dir, 'columnar.csv')
+        start = time.perf_counter()
+        table = build_single_table(inventory, seg_str, years, years[0],
+                                   reg_data, majority_slabs,
+                                   args.avg_faulting)
+        build_time = time.perf_counter() - start
+        write_single_table(table, csv_path,
+                           os.path.join(tmp_dir, 'columnar.parquet'))
+        print(f'columnar    {time.perf_counter() - start:8.3f} s   '
+              f'(building {build_time:.3f} s)')
+
+        legacy = pd.read_csv(legacy_path)
+        columnar = pd.read_csv(csv_path)
+        pd.testing.assert_frame_equal(legacy, columnar, check_dtype=False,
+                                      rtol=1e-12)
+        pd.testing.assert_frame_equal(
+            table, pd.read_parquet(os.path.join(tmp_dir, 'columnar.parquet')))
+
+    rng = random.Random(args.seed)
+    for year in years:
+        for slab_index in rng.sample(sorted(slabs[year]),
+                                     int(len(slabs[year]) * args.annotated)):
+            inventory.annotate(year, slab_index, {
+                'primary_state': rng.choice(('N', 'L1', 'T1', 'C1')),
+                'special_state': rng.choice((None, None, None, 'R')),
+                'mean_faulting': rng.uniform(-2, 4),
+                'median_faulting': rng.uniform(-2, 4)
+                }, time=1)
+    start = time.perf_counter()
+    refreshed = refresh_single_table(table, inventory, seg_str, years,
+                                     reg_data, majority_slabs, 1,
+                                     args.avg_faulting)
+    print(f'refresh     {time.perf_counter() - start:8.3f} s   '
+          f'({refreshed} rows)')
+    start = time.perf_counter()
+    rebuilt = build_single_table(inventory, seg_str, years, years[0],
+                                 reg_data, majority_slabs, args.avg_faulting)
+    print(f'rebuild     {time.perf_counter() - start:8.3f} s')
+    pd.testing.assert_frame_equal(table, rebuilt)
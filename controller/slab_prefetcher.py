@@ -0,0 +1,177 @@
+from PyQt5.QtCore import QObject, QRunnable, QThreadPool
+import threading
+
+from file_manager.slab_images import is_raw_directory, load_slab_image
+from utils.lru_cache import LRUCache
+
+
+class SlabLoadTask(QRunnable):
+    def __init__(self, prefetcher, generation, key, slab_index, start_im,
+                 end_im):
+        """Task reading the image of a single slab on a worker thread of the
+        prefetcher's thread pool.
+
+        Args:
+            prefetcher (SlabPrefetcher): prefetcher the task belongs to
+            generation (int): navigation the task was submitted for
+            key (tuple): cache key of the image, (image directory, slab index,
+            display size)
+            slab_index (int): slab index of the slab
+            start_im (int): bottommost raw frame id of the slab
+            end_im (int): topmost raw frame id of the slab
+        """
+        super().__init__()
+        self._prefetcher = prefetcher
+        self._generation = generation
+        self._key = key
+        self._slab_index = slab_index
+        self._start_im = start_im
+        self._end_im = end_im
+
+
+    def run(self):
+        img = None
+        try:
+            # the user navigated away before the task started
+            if self._generation == self._prefetcher.generation:
+                img = load_slab_image(self._key[0], self._slab_index,
+                                      self._start_im, self._end_im,
+                                      self._key[2])
+        except Exception:
+            img = None
+        finally:
+            self._prefetcher.finish_task(self._key, img)
+
+
+class SlabPrefetcher(QObject):
+    def __init__(self, tool_model, panel_size: tuple[int, int], 
+                 radius: int=2, max_bytes: int=512 * 1024 * 1024, 
+                 max_threads: int=4):
+        """Loads the images of the slabs around the base year slab being
+        displayed on background threads, so going to the next or previous
+        slab does not wait on the disk. Images are kept in a bounded least
+        recently used cache shared by all the year panels. Slab states are
+        not prefetched, as each year panel keeps the states of all its slabs
+        in memory.
+
+        Args:
+            tool_model (ToolModel): model containing all the data for the tool
+            panel_size (tuple[int, int]): (width, height) the year panels
+            display the slab images at. Raw frames are prefetched at the 
+            reduced resolution used for that size
+            radius (int, optional): number of base year slabs to prefetch
+            on each side of the displayed one. Defaults to 2.
+            max_bytes (int, optional): maximum size of the cached images in
+            bytes. Defaults to 512 MB.
+            max_threads (int, optional): maximum number of threads reading
+            images at once. Defaults to 4.
+        """
+        super().__init__()
+        self._tool_model = tool_model
+        self._panel_size = panel_size
+        self._radius = radius
+        self.image_cache = LRUCache(max_bytes, size_of=lambda img: img.nbytes)
+        self.generation = 0
+        self._pending = set()
+        self._lock = threading.Lock()
+        self._pool = QThreadPool()
+        self._pool.setMaxThreadCount(max_threads)
+
+
+    def get_image(self, img_dir, slab_index, start_im, end_im, max_size=None):
+        """Gets the image of a slab, from the cache if it was prefetched, or
+        by reading it from disk otherwise.
+
+        Args:
+            img_dir (str): image directory of the year
+            slab_index (int): slab index of the slab
+            start_im (int): bottommost raw frame id of the slab
+            end_im (int): topmost raw frame id of the slab
+            max_size (tuple[int, int], optional): (width, height) the image 
+            will be displayed at (see load_slab_image). Defaults to None 
+            (full resolution).
+
+        Returns:
+            np.array: the image of the slab
+        """
+        key = (img_dir, slab_index, max_size)
+        img = self.image_cache.get(key)
+        if img is None:
+            img = load_slab_image(img_dir, slab_index, start_im, end_im, 
+                                  max_size)
+            self.image_cache.put(key, img)
+        return img
+
+
+    def prefetch(self, by_slab_id):
+        """Submits the images of the CY slabs of the base year slabs within
+        the prefetch radius of a base year slab, nearest first. Tasks
+        submitted for a previous base year slab that have not started yet are
+        dropped.
+
+        Args:
+            by_slab_id (int): base year slab ID being displayed
+        """
+        self.generation += 1
+        offsets = [0]
+        for distance in range(1, self._radius + 1):
+            offsets += [distance, -distance]
+        for offset in offsets:
+            reg_entry = self._tool_model.registration_entry(
+                by_slab_id + offset)
+            if reg_entry is None:
+                continue
+            for year, panel_model in self._tool_model.year_panel_models.items():
+                year_img_list = reg_entry.get(str(year))
+                if not year_img_list:
+                    continue
+                img_dir = self._tool_model.year_img_directory(year)
+                for slab_index in year_img_list:
+                    start_im, end_im = None, None
+                    if is_raw_directory(img_dir):
+                        slab_range = panel_model.slab_image_range(slab_index)
+                        if slab_range is None:
+                            continue
+                        start_im, end_im = slab_range
+                    self.submit((img_dir, slab_index, self._panel_size), 
+                                start_im, end_im)
+
+
+    def submit(self, key, start_im, end_im):
+        """Submits a task to read an image, unless it is cached or already
+        being read.
+
+        Args:
+            key (tuple): cache key of the image, (image directory, slab index,
+            display size)
+            start_im (int): bottommost raw frame id of the slab
+            end_im (int): topmost raw frame id of the slab
+        """
+        with self._lock:
+            if key in self._pending or key in self.image_cache:
+                return
+            self._pending.add(key)
+        self._pool.start(SlabLoadTask(self, self.generation, key, key[1],
+                                      start_im, end_im))
+
+
+    def finish_task(self, key, img):
+        """Stores the image read by a task. Called from the worker thread.
+
+        Args:
+            key (tuple): cache key of the image
+            img (np.array): the image read, or None if it could not be read
+        """
+        if img is not None:
+            self.image_cache.put(key, img)
+        with self._lock:
+            self._pending.discard(key)
+
+
+    def shutdown(self):
+        """Drops the tasks that have not started and waits for the running
+        ones to finish.
+        """
+        self.generation += 1
+        self._pool.clear()
+        self._pool.waitForDone()
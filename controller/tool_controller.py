@@ -4,7 +4,7 @@ import cv2
 import os
 
 class ToolController(QObject):
-    def __init__(self, tool_model, year_controllers):
+    def __init__(self, tool_model, year_controllers, prefetcher):
         """Constructor for ToolController, containing all the logic for the
         main window of the annotation tool.
 
@@ -12,10 +12,13 @@ class ToolController(QObject):
             tool_model (ToolModel): model containing all the data for the tool
             year_controllers (dict[int, YearPanelController]): mappings from 
             each registration year to its corresponding controller
+            prefetcher (SlabPrefetcher): loads the images of the neighboring
+            slabs in the background
         """
         super().__init__()
         self._tool_model = tool_model
         self._year_controllers = year_controllers
+        self._prefetcher = prefetcher
     
 
     @pyqtSlot(str, QLineEdit)
@@ -45,6 +48,19 @@ class ToolController(QObject):
         slab_form.setText(str(new_by_slab_id))  
     
 
+    def save_updates(self):
+        """Queues the changes of every year panel and writes all the queued
+        slab updates to the database, waiting for the write. Used when the
+        application exits.
+        """
+        seg_str = self._tool_model.seg_str
+        for panel_model in self._tool_model.year_panel_models.values():
+            if panel_model.panel_updated:
+                panel_model.push_updates_to_db(seg_str)
+                panel_model.panel_updated = False
+        self._tool_model.slab_writer.stop()
+
+
     def update_year_slabs(self, by_slab_id):
         """Updates the displayed slabs in the annotation tool main window. 
         Also sends signals to update the database with changes made to the 
@@ -55,20 +71,17 @@ class ToolController(QObject):
             by_slab_id (int): base year slab ID to update associating CY slabs 
             to
         """
-        img_type = self._tool_model.image_type.value
-        reg_data = self._tool_model.reg_data
+        reg_entry = self._tool_model.registration_entry(by_slab_id)
         seg_str = self._tool_model.seg_str  
-        first_BY_index = self._tool_model.first_BY_index    
         for year, panel_model in self._tool_model.year_panel_models.items():
             if panel_model.panel_updated:
                 panel_model.push_updates_to_db(seg_str)
                 panel_model.panel_updated = False
 
             # fetch slab state information for CY slabs
-            try:
-                year_img_list = reg_data[by_slab_id - first_BY_index][str(year)]  
-            except:
-                year_img_list = None
+            year_img_list = None
+            if reg_entry is not None:
+                year_img_list = reg_entry.get(str(year))
 
             if year_img_list is None or len(year_img_list) == 0:
                 # no slabs for this year, deactivate panel
@@ -84,12 +97,6 @@ class ToolController(QObject):
                 panel_model.slab_id_list = year_img_list    
                 panel_model.base_img_directory = os.path.join(
                     self._tool_model.directory, str(year))
-
-                suffix = None
-                if img_type == 'Range' or img_type == 'Intensity':
-                    suffix = img_type
-                else:
-                    suffix = os.path.join('Slabs', img_type)
                 
 
                 # set states for each CY slab
@@ -111,15 +118,17 @@ class ToolController(QObject):
                 }
                 
                 panel_model.populate_slab_info()
-                panel_model.img_directory = os.path.join(
-                    panel_model.base_img_directory, suffix
-                    )
+                panel_model.img_directory = self._tool_model.year_img_directory(
+                    year)
 
 
-        self._tool_model.replaced_year = reg_data[by_slab_id - first_BY_index]['replaced']
-        self._tool_model.replaced_type = reg_data[by_slab_id - first_BY_index]['replaced_type']
+        self._tool_model.replaced_year = reg_entry['replaced']
+        self._tool_model.replaced_type = reg_entry['replaced_type']
+        self._tool_model.current_BY_index = by_slab_id
         # database updates   
         self._tool_model.execute_updates()
+        # load the neighboring slabs while this one is annotated
+        self._prefetcher.prefetch(by_slab_id)
             
 
     @pyqtSlot(str)
@@ -134,25 +143,8 @@ class ToolController(QObject):
     
         self._tool_model.set_image_type(img_type)
 
-        for panel_model in self._tool_model.year_panel_models.values():
+        for year, panel_model in self._tool_model.year_panel_models.items():
             if not panel_model.lock_panel:
-                # last_slash_index = panel_model.base_img_directory.rfind('/')
-                # panel_model.base_img_directory = (
-                #     panel_model.base_img_directory[:last_slash_index]
-                #     + f'/{img_type}'
-                # )
-                suffix = None
-                if img_type == 'Range' or img_type == 'Intensity':
-                    suffix = img_type
-                else:
-                    suffix = os.path.join('Slabs', img_type)
-                panel_model.img_directory = os.path.join(
-                    panel_model.base_img_directory, suffix
-                    )
-    
-
-    
-
-
-
-
+                panel_model.img_directory = self._tool_model.year_img_directory(
+                    year)
+        self._prefetcher.prefetch(self._tool_model.current_BY_index)
@@ -6,9 +6,20 @@ from PIL import Image
 import cv2
 import os
 class YearPanelController(QObject):
-    def __init__(self, year_panel_model):
+    def __init__(self, year_panel_model, prefetcher, pixmap_cache):
+        """Constructor for YearPanelController, containing the logic of a
+        year panel.
+
+        Args:
+            year_panel_model (YearPanelModel): model of the year panel
+            prefetcher (SlabPrefetcher): loads and caches the slab images
+            pixmap_cache (LRUCache): cache of the scaled slab pixmaps shown
+            by the year panels, shared by all the years
+        """
         super().__init__()
         self._year_panel_model = year_panel_model
+        self._prefetcher = prefetcher
+        self._pixmap_cache = pixmap_cache
 
     
     @pyqtSlot(bool)
@@ -155,74 +166,65 @@ class YearPanelController(QObject):
         
 
 
-    def get_slab_image(self, convertToQtImage=True):
+    def get_scaled_slab_pixmap(self, width, height):
+        """Returns the image of the slab scaled to fit in the given size, 
+        keeping the aspect ratio. Scaled images are cached, so showing a slab
+        again (e.g. when switching image types back and forth) does not read
+        and scale the image again.
+
+        Args:
+            width (int): maximum width of the image
+            height (int): maximum height of the image
+
+        Returns:
+            QPixmap: the scaled image of the slab
+        """
+        model = self._year_panel_model
+        img_dir = model.img_directory
+        if img_dir == '':
+            raise Exception('No slab image for the year')
+        key = (model.year, model.slab_id_list[model.slab_id_list_index],
+               os.path.basename(os.path.normpath(img_dir)), width, height)
+        pix = self._pixmap_cache.get(key)
+        if pix is None:
+            pix = self.get_slab_image(max_size=(width, height)).scaled(
+                width, height, 1, 0)
+            self._pixmap_cache.put(key, pix)
+        return pix
+
+
+    def get_slab_image(self, convertToQtImage=True, max_size=None):
         """Returns the image of the slab
 
         Args:
             convertToQtImage (bool, optional): if True, converts the image to a
             QPixmap. Defaults to True.
+            max_size (tuple[int, int], optional): (width, height) the image 
+            will be displayed at. If provided, uncropped images are decoded
+            in grayscale at a reduced resolution. Defaults to None (full 
+            resolution).
         Returns:
             QPixmap or np.arrray: the image of the slab
         """
         img_dir = self._year_panel_model.img_directory
         slab_index = self._year_panel_model.slab_id_list[
             self._year_panel_model.slab_id_list_index]
-        img = None
         if img_dir == '':
             raise Exception('No slab image for the year')
         
-        if 'Range' in img_dir or 'Intensity' in img_dir:
-            bottom_im = self._year_panel_model.slabs_info['start_im'][
-                self._year_panel_model.slab_id_list_index
-            ]
-            top_im = self._year_panel_model.slabs_info['end_im'][
-                self._year_panel_model.slab_id_list_index
-            ]
-            img = self.concat_images(bottom_im, top_im)
-        else: 
-            img_path = os.path.join(img_dir, f'{slab_index}.jpg')
-            if not os.path.exists(img_path):
-                img_path = os.path.join(img_dir, f'{slab_index}.png')
-            if not os.path.exists(img_path):
-                raise Exception(f'Slab Image Not Found')
-            img = cv2.imread(img_path)
+        bottom_im = self._year_panel_model.slabs_info['start_im'][
+            self._year_panel_model.slab_id_list_index
+        ]
+        top_im = self._year_panel_model.slabs_info['end_im'][
+            self._year_panel_model.slab_id_list_index
+        ]
+        img = self._prefetcher.get_image(img_dir, slab_index, bottom_im, 
+                                         top_im, max_size)
         if convertToQtImage:
             return self.convertCvImage2QtImage(img)
        
-        #return cv2.imread(img_path)    
         return img
 
-    def concat_images(self, id1, id2):
-        """Concatenates two images vertically
-
-        Args:
-            id1 (int): the bottommost image id
-            img2 (int): the topmost image id
-        Raises:
-            Exception: if the start image id is greater than the end image id
-            Exception: if there is no slab image for the year
-        """
-        if id1 > id2:
-            raise Exception('start Im greater than end Im')
-        if not id1 or not id2:
-            raise Exception('No slab image for the year')
-        img_dir = self._year_panel_model.img_directory
-        imgs = []
-        for i in range(id1, id2 + 1):
-            im_path = None
-            if 'Range' in img_dir:
-                im_path = os.path.join(
-                    img_dir, f'LcmsResult_ImageRng_{i:06}.jpg'
-                    )
-            else:
-                im_path = os.path.join(
-                    img_dir, f'LcmsResult_ImageInt_{i:06}.jpg'
-                    )
-            if not os.path.exists(im_path):
-                raise Exception('Slab Image Not Found')
-            imgs.append(cv2.imread(im_path))
-        return cv2.vconcat(imgs[::-1])
-
         
     def convertCvImage2QtImage(self, image):
         """Converts a cv2 image to a QPixmap
@@ -233,9 +235,13 @@ class YearPanelController(QObject):
         Returns:
             QPixmap: the converted image
         """
-        image = QImage(image, image.shape[1],\
-                            image.shape[0], image.shape[1] * 3, 
-                            QImage.Format_RGB888)
+        if image.ndim == 2:
+            image = QImage(image, image.shape[1], image.shape[0], 
+                           image.strides[0], QImage.Format_Grayscale8)
+        else:
+            image = QImage(image, image.shape[1],\
+                                image.shape[0], image.shape[1] * 3, 
+                                QImage.Format_RGB888)
         pix = QPixmap(image)
         return pix
 
@@ -0,0 +1,159 @@
+import json
+import os
+
+
+class CropCheckpoint:
+    """Keeps track of the progress of a crop run in a JSON file so an
+    interrupted run can be resumed. For each image mode, the slab number of
+    the last slab that was completely processed (image written and database
+    entry upserted) is recorded, along with the bottom y-value of its bottom
+    joint to detect annotations changing between runs. The index of the last
+    slab whose crack stats were calculated is recorded as well.
+
+    Attributes:
+        path (str): path of the checkpoint file
+        seg_str (str): segment string of the run
+        writes_db (bool): whether the run writes slab entries to the database
+        state (dict): the progress recorded so far
+    """
+    def __init__(self, path: str, seg_str: str, writes_db: bool):
+        self.path = path
+        self.seg_str = seg_str
+        self.writes_db = writes_db
+        self.state = self.new_state()
+
+
+    def new_state(self) -> dict:
+        """Creates the state of a run that has not processed any slabs yet.
+
+        Returns:
+            dict: the empty state
+        """
+        return {
+            'seg_str': self.seg_str,
+            'writes_db': self.writes_db,
+            'modes': {},
+            'crack_stats': 0
+        }
+
+
+    def load(self) -> bool:
+        """Loads the progress of a previous run from the checkpoint file.
+
+        Raises:
+            ValueError: If the checkpoint was recorded for another segment or
+            for a run that did not write the same data to the database
+
+        Returns:
+            bool: True if a checkpoint was found, False otherwise
+        """
+        if not os.path.exists(self.path):
+            return False
+        with open(self.path) as f:
+            state = json.load(f)
+        if (state['seg_str'] != self.seg_str
+            or state['writes_db'] != self.writes_db):
+            raise ValueError("Checkpoint does not match the current run. "
+                             "Rerun without --resume to start over.")
+        self.state = state
+        return True
+
+
+    def reset(self):
+        """Discards any recorded progress and saves the empty state.
+        """
+        self.state = self.new_state()
+        self.save()
+
+
+    def save(self):
+        """Writes the state to the checkpoint file. The file is replaced
+        atomically so a crash while saving never leaves a corrupt checkpoint.
+        """
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(self.state, f)
+        os.replace(tmp_path, self.path)
+
+
+    def completed_slabs(self, mode: str) -> int:
+        """Gets the slab number of the last slab completed for the mode.
+
+        Args:
+            mode (str): image mode
+
+        Returns:
+            int: slab number of the last completed slab, 0 if none
+        """
+        return self.state['modes'].get(mode, {}).get('slab_num', 0)
+
+
+    def completed_joint_y(self, mode: str) -> int:
+        """Gets the bottom y-value of the bottom joint of the last slab
+        completed for the mode.
+
+        Args:
+            mode (str): image mode
+
+        Returns:
+            int: bottom y-value in relative pixels, None if no slab completed
+        """
+        return self.state['modes'].get(mode, {}).get('joint_y')
+
+
+    def is_complete(self, mode: str) -> bool:
+        """Checks if every slab was processed for the mode.
+
+        Args:
+            mode (str): image mode
+
+        Returns:
+            bool: True if the mode was completely processed
+        """
+        return self.state['modes'].get(mode, {}).get('complete', False)
+
+
+    def mark_slab(self, mode: str, slab_num: int, joint_y: int):
+        """Records a slab as completely processed.
+
+        Args:
+            mode (str): image mode
+            slab_num (int): slab number of the slab
+            joint_y (int): bottom y-value of the bottom joint of the slab, in
+            relative pixels
+        """
+        self.state['modes'][mode] = {
+            'slab_num': slab_num,
+            'joint_y': joint_y,
+            'complete': False
+        }
+        self.save()
+
+
+    def mark_complete(self, mode: str):
+        """Records every slab of the mode as processed.
+
+        Args:
+            mode (str): image mode
+        """
+        self.state['modes'].setdefault(mode, {})['complete'] = True
+        self.save()
+
+
+    def crack_stats_done(self) -> int:
+        """Gets the index of the last slab whose crack stats were stored.
+
+        Returns:
+            int: index of the last slab, 0 if none
+        """
+        return self.state['crack_stats']
+
+
+    def mark_crack_stats(self, slab_index: int):
+        """Records the crack stats of a slab as stored.
+
+        Args:
+            slab_index (int): index of the slab
+        """
+        self.state['crack_stats'] = slab_index
+        self.save()
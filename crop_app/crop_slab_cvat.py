@@ -5,15 +5,17 @@
 ######################################################
 
 from tqdm import tqdm
-from bs4 import BeautifulSoup
 import csv
 import cv2
 import os
-from collections import deque
 from crop_app.subjoint import SubJoint
 from crop_app.joint import HorizontalJoint
+from crop_app.checkpoint import CropCheckpoint
 from utils.functions import LinearFunction
 from file_manager.crop_files import CropFileManager
+from file_manager.framestore import FrameBuffer
+from file_manager.slab_images import (PYRAMID_LEVELS, pyramid_directory, 
+                                      write_pyramid)
 from utils.px_mm_converter import PXMMConverter
 import numpy as np
 import crop_app.fault_calc as fc
@@ -25,7 +27,9 @@ class CropSlabsCVAT:
                  px_height, px_width, 
                  mm_height, mm_width,
                  mode, begin_MM, end_MM, year, interstate, 
-                 slab_inventory, overwrite, validation_only=False, crop_only=False):
+                 slab_inventory, overwrite, validation_only=False, crop_only=False,
+                 resume=False, pyramid=False, crack_workers=1, 
+                 frame_store=False):
         # filepath of the dataset
         self.seg_str = f"{interstate}_MM{begin_MM}_MM{end_MM}"
         self.year = year
@@ -38,28 +42,62 @@ class CropSlabsCVAT:
         self.mm_width = mm_width
         self.validation_only = validation_only
         self.crop_only = crop_only
+        # also write the thumbnails displayed by the annotation tool
+        self.pyramid = pyramid and not validation_only
         self.im_length_mm = 5000
+        # processes calculating the crack stats of the slabs in parallel
+        self.crack_workers = crack_workers
+        # pack the frames into a frame store before cropping them
+        self.frame_store = frame_store and not validation_only
         self.file_manager = CropFileManager(data_path, year)
         self.scaler = None
         self.slab_writer = None
         self.slab_num = 1
         self.first_im = 0
+        # slabs up to this slab number were processed by a previous run
+        self.resume_slab_num = 0
+        self.checkpoint = None
+        resumed = False
+        if not self.validation_only:
+            self.checkpoint = CropCheckpoint(self.file_manager.checkpoint_path,
+                                             self.seg_str, not self.crop_only)
+            if resume and self.checkpoint.load():
+                resumed = True
+            else:
+                self.checkpoint.reset()
         for single_mode in mode:
+            if self.checkpoint and self.checkpoint.is_complete(single_mode):
+                print(f"Skipping {single_mode}, already cropped")
+                self.recorded = True
+                continue
             with open(self.file_manager.debug_path, 'w') as debug_file:
                 writer = csv.writer(debug_file)
                 writer.writerow(["start_img", "end_img", "message"]) 
             self.slab_num = 1
-            self.file_manager.switch_image_mode(single_mode)
+            self.file_manager.switch_image_mode(
+                single_mode, clean=not self.validation_only and not resumed
+                )
+            if self.frame_store:
+                self.file_manager.build_frame_store((self.px_width, 
+                                                     self.px_height))
+            if self.checkpoint:
+                self.resume_slab_num = self.checkpoint.completed_slabs(
+                    single_mode)
             if not self.scaler:
                 self.scaler = PXMMConverter(self.px_height, self.px_width, 
                                             self.mm_height, self.mm_width,
                                             len(self.file_manager.input_im_files))
-            if not self.recorded and not self.validation_only and not self.crop_only and overwrite:
+            if (not self.recorded and not self.validation_only 
+                and not self.crop_only and overwrite and not resumed):
                 self.slab_inventory.delete_segment_year_slabs(
                     self.seg_str, year
                     )
             self.num_files = len(self.file_manager.input_im_files)  
             self.crop()
+            if self.pyramid and single_mode != 'segmentation':
+                self.build_frame_pyramid()
+            if self.checkpoint:
+                self.checkpoint.mark_complete(single_mode)
             self.recorded = True
 
         if 'segmentation' in mode and not self.crop_only:
@@ -68,6 +106,27 @@ class CropSlabsCVAT:
 
     
 
+    def build_frame_pyramid(self):
+        """Writes the pyramid thumbnails of the raw frames of the current 
+        image mode, used by the annotation tool for the uncropped views. 
+        Thumbnails newer than their frame are kept.
+        """
+        input_path = self.file_manager.input_im_path
+        for file in tqdm(self.file_manager.input_im_files, 
+                         desc='Building frame pyramid'):
+            frame_path = os.path.join(input_path, file)
+            frame_mtime = os.path.getmtime(frame_path)
+            level_paths = [os.path.join(pyramid_directory(input_path, level), 
+                                        file)
+                           for level in PYRAMID_LEVELS]
+            if all(os.path.exists(path) 
+                   and os.path.getmtime(path) >= frame_mtime
+                   for path in level_paths):
+                continue
+            img = cv2.imread(frame_path, cv2.IMREAD_GRAYSCALE)
+            write_pyramid(img, input_path, file)
+
+
     def crack_stats_calculation(self):
         """Calculates the crack width and length for each slab and updates
         each slab entry accordingly.
@@ -75,34 +134,49 @@ class CropSlabsCVAT:
         img_path = os.path.join(self.file_manager.data_path, 
                                 'Slabs', 'output_segmentation')
         num_files = len(os.listdir(img_path))
-        for i in tqdm(range(1, num_files + 1), desc='Calculating crack stats'):
-            p = os.path.join(img_path, f'{str(i)}{IMG_EXT}')
-            img = cv2.imread(p)
-            gray_img = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)   
-            ret, binary_img = cv2.threshold(gray_img, 127, 255, cv2.THRESH_BINARY)
-            builder = CvmBuilder()
-            builder.use_seg_img_obj(binary_img)
-            model = builder.build()
-            total_length = sum(model.branches_length)
-            widths = model.branches_width
-            sum_m = 0
-            count = 0
-            for width in widths:
-                for w in width:
-                    sum_m += w
-                    count += 1
-            avg_width = 0 if count == 0 else sum_m / count
-            median_width = 0 if count == 0 else float(np.median(np.array([item for sublist in widths for item in sublist])))
-            self.slab_inventory.add_crack_stats(i, total_length, avg_width, median_width,
-                                            self.seg_str, self.year)
+        first_index = 1
+        if self.checkpoint:
+            first_index = self.checkpoint.crack_stats_done() + 1
+        slab_nums = range(first_index, num_files + 1)
+        stats = CvmBuilder.build_many(
+            (self.read_segmentation_mask(img_path, i) for i in slab_nums),
+            workers=self.crack_workers, summary=True, 
+            # slabs span several frames, process them one frame at a time
+            tile_height=self.px_height
+            )
+        for i, slab_stats in tqdm(zip(slab_nums, stats), 
+                                  initial=first_index - 1, total=num_files,
+                                  desc='Calculating crack stats'):
+            self.slab_inventory.add_crack_stats(i, slab_stats.total_length, 
+                                                slab_stats.mean_width,
+                                                slab_stats.median_width,
+                                                self.seg_str, self.year)
+            if self.checkpoint:
+                self.checkpoint.mark_crack_stats(i)
+
+
+    @staticmethod
+    def read_segmentation_mask(img_path, slab_num):
+        """Reads the cropped segmentation image of a slab as a binary mask.
+
+        Args:
+            img_path (str): folder of the cropped segmentation images
+            slab_num (int): slab number of the slab
+
+        Returns:
+            np.array: the mask, 255 on cracks and 0 elsewhere
+        """
+        img = cv2.imread(os.path.join(img_path, f'{slab_num}{IMG_EXT}'))
+        gray_img = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+        _, binary_img = cv2.threshold(gray_img, 127, 255, cv2.THRESH_BINARY)
+        return binary_img
 
 
         
     def crop(self):
         """Algorithm to crop slabs from the dataset. 
         """
-        NUM_JOINTS_PER_IMAGE = 2    
-        
+        joints = self.load_joint_plan()
         with open(self.file_manager.csv_path, 'w', newline='') as range_csv:
 
             fields = ["slab_index", "length (mm)", "left_length (mm)", "width (mm)", 
@@ -111,53 +185,87 @@ class CropSlabsCVAT:
             writer = csv.DictWriter(range_csv, fieldnames=fields)
             writer.writeheader()
 
-            joint_queue = deque()
-            curr_joint = None
-            # Iterate through all manual_xml files
-            xml_data = open(self.file_manager.annotation_file)
-            xml_soup = BeautifulSoup(xml_data, "lxml")
-            images = xml_soup.find_all('image')
-            for i, image in enumerate(tqdm(images)):
-                subjoints_data = image.find_all('polyline')
-                subjoints_data = [subjoint for subjoint in subjoints_data
-                             if subjoint['label'] == 'subjoint']
-
-                if curr_joint is None:
-                    bottom_y = len(self.file_manager.input_im_files) * self.px_height - 1
-                    curr_joint = HorizontalJoint([SubJoint(0, bottom_y, self.px_width - 1, bottom_y)])
-                # Fetch all joint segments data in the xml file
-                subjoints = self.generate_subjoints_list(subjoints_data, i)
-                for subjoint in subjoints:
-                    if not curr_joint.belongs_to_joint(subjoint):
-                        joint_queue.append(curr_joint)
-                        # handle image cropping when two joints are collected
-                        if len(joint_queue) == NUM_JOINTS_PER_IMAGE:
-                            self.produce_image(joint_queue[0], joint_queue[1], 
-                                             writer)
-                            joint_queue.popleft()
-                        # create new joint
-                        curr_joint = HorizontalJoint([])
-                        
-                    curr_joint.add_subjoint(subjoint)
-
-            if len(joint_queue) == 1:
-                self.produce_image(joint_queue[0], curr_joint, writer)
-
-            # delete if cutoff slab is not necessary to include
-            top_joint = HorizontalJoint([SubJoint(0, 0, self.px_width - 1, 0)])   
-            self.produce_image(curr_joint, top_joint, writer)
+            # each slab lies between two consecutive joints
+            for i in tqdm(range(len(joints) - 1), desc='Cropping slabs'):
+                self.produce_image(joints[i], joints[i + 1], writer)
         # end write
+
+
+    def load_joint_plan(self) -> list[HorizontalJoint]:
+        """Gets the joint plan, the ordered list of joints of the segment from
+        bottom to top. The plan is cached in the annotation folder and reused
+        as long as the annotations and the input images do not change.
+
+        Returns:
+            list[HorizontalJoint]: the joints, including the bottom and top 
+            boundaries of the segment
+        """
+        key = (f"{self.file_manager.annotation_hash}:{self.scaler.num_images}:"
+               f"{self.num_files}:{self.px_height}:{self.px_width}")
+        plan = self.file_manager.load_joint_plan(key)
+        if plan is None:
+            joints = self.build_joint_plan()
+            points = np.array(
+                [[subjoint.x1, subjoint.y1, subjoint.x2, subjoint.y2] 
+                 for joint in joints for subjoint in joint.subjoints],
+                dtype=np.int64
+                ).reshape(-1, 4)
+            offsets = np.cumsum([0] + [len(joint.subjoints) 
+                                       for joint in joints])
+            self.file_manager.save_joint_plan(key, points, offsets)
+            return joints
+        
+        points, offsets = plan
+        return [HorizontalJoint([SubJoint(*map(int, row)) 
+                                 for row in points[offsets[j]:offsets[j + 1]]])
+                for j in range(len(offsets) - 1)]
+
+
+    def build_joint_plan(self) -> list[HorizontalJoint]:
+        """Groups the annotated subjoints into horizontal joints.
+
+        Returns:
+            list[HorizontalJoint]: the joints ordered from bottom to top, 
+            including the bottom and top boundaries of the segment
+        """
+        bottom_y = len(self.file_manager.input_im_files) * self.px_height - 1
+        curr_joint = HorizontalJoint([SubJoint(0, bottom_y, self.px_width - 1, bottom_y)])
+        joints = []
+        # subjoints of all the images, parsed when merging annotations
+        num_images, image_ids, points = self.file_manager.load_subjoints()
+        # the points of the whole segment are converted to relative pixels at
+        # once, after truncating them to whole pixels
+        points = np.trunc(points).astype(np.int64)
+        points[:, 1::2] = self.scaler.px_abs_to_rel(points[:, 1::2], 
+                                                    image_ids[:, None])
+        bounds = np.searchsorted(image_ids, np.arange(num_images + 1))
+        for i in tqdm(range(num_images), desc='Grouping joints'):
+            # Fetch all joint segments data of the image
+            subjoints = self.generate_subjoints_list(
+                points[bounds[i]:bounds[i + 1]]
+                )
+            for subjoint in subjoints:
+                if not curr_joint.belongs_to_joint(subjoint):
+                    joints.append(curr_joint)
+                    # create new joint
+                    curr_joint = HorizontalJoint([])
+                    
+                curr_joint.add_subjoint(subjoint)
+        joints.append(curr_joint)
+
+        # delete if cutoff slab is not necessary to include
+        joints.append(HorizontalJoint([SubJoint(0, 0, self.px_width - 1, 0)]))
+        return joints
                     
                     
-    def generate_subjoints_list(self, subjoints_data, i: int) -> list[SubJoint]:
-        """Given a piece of subjoint data extracted from BeautifulSoup, creates
-        a list of subjoint objects
+    def generate_subjoints_list(self, 
+                                subjoints_data: np.ndarray) -> list[SubJoint]:
+        """Given the subjoint points of an image, creates a list of subjoint
+        objects
 
         Args:
-            subjoint_data (bs4.ResultSet): A piece of subjoint data extracted
-            from BeautifulSoup
-            i (int): current index, representing the i-th xml file the loop is
-            currently in
+            subjoints_data (np.ndarray): (x1, y1, x2, y2) points of each 
+            subjoint of the image, in relative pixels
 
         Returns:
             list[SubJoint]: the list of SubJoint objects created from the 
@@ -166,37 +274,27 @@ class CropSlabsCVAT:
         """
         subjoints = []
         for subjoint_data in subjoints_data:
-            subjoint = self.create_subjoint_obj(subjoint_data, i)
+            subjoint = self.create_subjoint_obj(subjoint_data)
             if subjoint is not None and subjoint.dist > 50:
                 subjoints.append(subjoint)
         subjoints.sort(key=lambda subjoint: subjoint.y1, reverse=True)
         return subjoints               
     
 
-    def create_subjoint_obj(self, subjoint_data, i) -> SubJoint:
-        """Given a piece of subjoint data extracted from BeautifulSoup, creates
-        a subjoint object
+    def create_subjoint_obj(self, subjoint_data: np.ndarray) -> SubJoint:
+        """Given the points of a subjoint, creates a subjoint object
 
         Args:
-            subjoint_data (bs4.ResultSet): subjoint data extracted
-            from BeautifulSoup
-            i (int): current index, representing the i-th xml file the loop is
-            currently in
+            subjoint_data (np.ndarray): (x1, y1, x2, y2) points of the 
+            subjoint, in relative pixels
 
         Returns:
             SubJoint: the SubJoint object created from the subjoint data or
             None if subjoint data is invalid (i.e. a point instead of a line)
         """
-        
-        points = subjoint_data['points']     
-        points = points.replace(',', ';')
-        points = points.split(';')
-        x1 = int(float(points[0]))
-        y1 = self.scaler.px_abs_to_rel(int(float(points[1])), i)
-        x2 = int(float(points[2]))
-        y2 = self.scaler.px_abs_to_rel(int(float(points[3])), i)
+        x1, y1, x2, y2 = map(int, subjoint_data)
         try:
-            subjoint = SubJoint(int(x1), int(y1), int(x2), int(y2))
+            subjoint = SubJoint(x1, y1, x2, y2)
         except ValueError:
             return None
         
@@ -219,15 +317,28 @@ class CropSlabsCVAT:
         bottom_img_index = bottom_joint.get_bottom_img_id(self.num_files, self.px_height)
         top_img_index = top_joint.get_top_img_id(self.num_files, self.px_height)
         y_offset = self.scaler.px_abs_to_rel(0, top_img_index)
+        completed = self.slab_num <= self.resume_slab_num
+        if (self.slab_num == self.resume_slab_num 
+            and bottom_joint.get_max_y() != self.checkpoint.completed_joint_y(
+                self.file_manager.image_mode.value)):
+            raise ValueError("Annotations changed since the checkpoint was "
+                             "recorded. Rerun without --resume to start over.")
         
-        if not self.validation_only:
+        # slabs completed by a previous run are not cropped again
+        if not self.validation_only and not completed:
             img = self.join_images(bottom_img_index, top_img_index)
             img = self.modify_image(img, bottom_joint, top_joint, y_offset)
             # save image to files
             cv2.imwrite(
                 os.path.join(self.file_manager.output_im_path, str(self.slab_num) + IMG_EXT), img
                 )
-        self.write_slab_metadata(writer, bottom_joint, top_joint)
+            if self.pyramid:
+                write_pyramid(img, self.file_manager.output_im_path, 
+                              str(self.slab_num) + IMG_EXT)
+        self.write_slab_metadata(writer, bottom_joint, top_joint, completed)
+        if self.checkpoint and not completed:
+            self.checkpoint.mark_slab(self.file_manager.image_mode.value, 
+                                      self.slab_num, bottom_joint.get_max_y())
         self.slab_num += 1
 
     
@@ -251,31 +362,33 @@ class CropSlabsCVAT:
         x_abs_min = int(bottom_joint.get_min_x())
         x_abs_max = int(bottom_joint.get_max_x())
         img = img[y_abs_min:y_abs_max, x_abs_min:x_abs_max]
-        
-
-        # blacken corners of image
-        height, width, _ = img.shape
-        subjoints = bottom_joint.subjoints
+        # the mosaic is a view of the frame buffer, which must not be changed.
+        # Frames read from the frame store are already in grayscale
+        if img.ndim == 3:
+            img = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY) 
+        else:
+            img = img.copy()
+
+        # blacken corners of image, below the bottom joint and above the top
+        # joint of each column
+        height, width = img.shape[:2]
+        x = np.arange(x_abs_min, x_abs_min + width)
+        # buffer to erase falsely detected cracks from joints
+        buffer = 0
+        if self.file_manager.image_mode.value == 'segmentation':
+            buffer = 20
 
         # trim bottom
+        subjoints = bottom_joint.subjoints
         bottom_func = LinearFunction(
             subjoints[0].x1, 
             subjoints[0].y1 - y_offset,
             subjoints[-1].x2, 
             subjoints[-1].y2 - y_offset
             )
-        for x in range(width):
-            y = bottom_func.get_y(x_abs_min + x) - y_abs_min
-            # buffer to erase falsely detected cracks from joints
-            if self.file_manager.image_mode.value == 'segmentation':
-                y -= 20
-            # account for edge calculations that may be slightly off
-            if y < 0:
-                y = 0
-            elif y >= height:
-                y = height - 1
-            y = int(y)
-            img[y:, x] = [0, 0, 0]
+        # account for edge calculations that may be slightly off
+        bottom_y = np.clip(bottom_func.get_y(x) - y_abs_min - buffer, 
+                           0, height - 1).astype(np.int64)
 
         # trim top
         subjoints = top_joint.subjoints
@@ -285,61 +398,63 @@ class CropSlabsCVAT:
             subjoints[-1].x2, 
             subjoints[-1].y2 - y_offset
             )
-        for x in range(width):
-            y = top_func.get_y(x_abs_min + x) - y_abs_min
-            if self.file_manager.image_mode.value == 'segmentation':
-                y += 20
-            # account for edge calculations that may be slightly off
-            if y < 0:
-                y = 0
-            elif y >= height:
-                y = height - 1
-            y = int(y)
-            img[:y, x] = [0, 0, 0]
-        
-        if self.file_manager.image_mode.value == 'segmentation':
-            pass
-        img = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY) 
+        top_y = np.clip(top_func.get_y(x) - y_abs_min + buffer, 
+                        0, height - 1).astype(np.int64)
+
+        # only the bands of rows the joints cross need to be masked
+        rows = np.arange(height)[:, None]
+        band = slice(bottom_y.min(initial=height), height)
+        np.copyto(img[band], 0, where=rows[band] >= bottom_y)
+        band = slice(0, top_y.max(initial=0))
+        np.copyto(img[band], 0, where=rows[band] < top_y)
         return img
 
         
 
     def join_images(self, bottom_img_index: int, top_img_index: int) -> None:
-        """Joins images together into one image
+        """Joins images together into one image, topmost image first. The 
+        frames are sliced from the frame store if there is one, and decoded
+        otherwise.
+
         Args:
             bottom_img_index (int): the index of the bottom image
             top_img_index (int): the index of the top image
 
         Returns:
-            np.ndarray: the joined image
+            np.ndarray: the joined image, in grayscale if it comes from the
+            frame store. The image is a view of the frames, read-only in the 
+            case of the frame store
         """
+        store = self.file_manager.frame_store
+        if (store is not None 
+            and store.frame_shape == (self.px_height, self.px_width)):
+            return store.mosaic(bottom_img_index, top_img_index)
         input_path = self.file_manager.input_im_path
         input_files = self.file_manager.input_im_files
-        img = cv2.imread(
-            os.path.join(input_path, input_files[bottom_img_index]))
+        frame_size = None
         if self.file_manager.image_mode.value == 'segmentation':
-            img = cv2.resize(img, (self.px_width, self.px_height))
-        for i in range(bottom_img_index + 1, top_img_index + 1):
-            temp_img = cv2.imread(
-                os.path.join(input_path, input_files[i])
-                )
-            if self.file_manager.image_mode.value == 'segmentation':
-                temp_img = cv2.resize(temp_img, (self.px_width, self.px_height))
-            img = cv2.vconcat([temp_img, img])
-        
-        return img
+            frame_size = (self.px_width, self.px_height)
+        paths = [os.path.join(input_path, input_files[i]) 
+                 for i in range(bottom_img_index, top_img_index + 1)]
+        # frames are decoded in place in a buffer of the slab's frames
+        frames = FrameBuffer.decode(paths, frame_size)
+        return frames.mosaic(0, len(paths) - 1)
 
 
     def write_slab_metadata(self, 
                             writer: csv.DictWriter, 
                             bottom_joint: HorizontalJoint, 
-                            top_joint: HorizontalJoint) -> None:
+                            top_joint: HorizontalJoint,
+                            completed: bool=False) -> None:
         """Writes slab metadata to csv file (one row)
 
         Args:
             writer (csv.DictWriter): csv writer
             bottom_joint (HorizontalJoint): the bottom joint
             top_joint (HorizontalJoint): the top joint
+            completed (bool, optional): if True, the slab entry was already
+            written to the database by a previous run and is not written
+            again. Defaults to False.
         """
         bottom_img_index = bottom_joint.get_bottom_img_id(self.num_files, 
                                                           self.px_height)
@@ -362,18 +477,15 @@ class CropSlabsCVAT:
         y_px_bottom = int(bottom_joint.get_max_y())
         y_px_top = int(top_joint.get_min_y())
 
-        y_mm_bottom = self.scaler.convert_px_to_mm_relative(
-            0, y_px_bottom % self.px_height, bottom_img_index
-            )[1]               
-        y_mm_offset = self.scaler.convert_px_to_mm_relative(
-            0, y_px_offset % self.px_height, mid_img_index
-            )[1]
-        y_mm_top = self.scaler.convert_px_to_mm_relative(
-            0, y_px_top % self.px_height, top_img_index
-            )[1]        
-        y_mm_bottom_joint_top = self.scaler.convert_px_to_mm_relative(
-            0, bottom_joint.get_min_y() % self.px_height, top_bottom_joint_img_index
-        )[1]
+        # all the y-values of the slab are converted at once
+        y_px = np.array([y_px_bottom, y_px_offset, y_px_top, 
+                         bottom_joint.get_min_y()])
+        img_indices = np.array([bottom_img_index, mid_img_index, 
+                                top_img_index, top_bottom_joint_img_index])
+        (y_mm_bottom, y_mm_offset, 
+         y_mm_top, y_mm_bottom_joint_top) = self.scaler.convert_px_to_mm_relative(
+            0, y_px % self.px_height, img_indices
+            )[1].tolist()
         # print(y_mm_bottom, y_mm_bottom_joint_top)
         input_files = self.file_manager.input_im_files
         if not self.validation_only:
@@ -392,11 +504,13 @@ class CropSlabsCVAT:
                 input_files[bottom_img_index]) 
         end_im = self.file_manager.get_im_id(input_files[top_img_index])
         
-        if not self.recorded and not self.validation_only and not self.crop_only:
+        if (not self.recorded and not self.validation_only and not self.crop_only
+            and not completed):
             x_min_px = bottom_joint.get_min_x()
             x_max_px = bottom_joint.get_max_x()
-            x_min_mm = self.scaler.convert_px_to_mm_relative(x_min_px, 0, 0)[0]
-            x_max_mm = self.scaler.convert_px_to_mm_relative(x_max_px, 0, 0)[0]
+            x_min_mm, x_max_mm = self.scaler.convert_px_to_mm_relative(
+                np.array([x_min_px, x_max_px]), 0, 0
+                )[0].tolist()
             faulting_data = fc.get_faulting_data(y_mm_bottom, y_mm_bottom_joint_top,
                                              self.seg_str, self.year,
                                              self.slab_inventory)
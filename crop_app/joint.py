@@ -1,4 +1,4 @@
-import sys
+import bisect
 import crop_app.subjoint as subjoint
 class HorizontalJoint:
     """A horizontal joint is a joint that spans from the left boundary of the
@@ -10,18 +10,55 @@ class HorizontalJoint:
     In the XML files, each horizontal joint is often broken up into two seperate
     joints, one for each side of the lane. This is because there are two cameras
 
+    The x and y extents and the leftmost point are kept up to date as 
+    subjoints are added, so they can be queried in constant time.
+
 
     Attributes:
         subjoints (list): list of subjoints that compose the horizontal joint
         left_bound (int): left boundary of the lane/joint
         right_bound (int): right boundary of the lane/joint
+        min_x, max_x, min_y, max_y (int): extents of the subjoints, None if
+        there are no subjoints
+        leftmost (SubJoint): subjoint with the leftmost point
     """
+    __slots__ = ('subjoints', 'left_bound', 'right_bound', 
+                 'min_x', 'max_x', 'min_y', 'max_y', 'leftmost')
+
     def __init__(self, subjoints, left_bound: int=0, right_bound: int=3500):
         self.subjoints = subjoints
         self.left_bound = left_bound
         self.right_bound = right_bound
+        self.min_x = self.max_x = self.min_y = self.max_y = None
+        self.leftmost = None
+        for subjoint in subjoints:
+            self.update_extents(subjoint)
     
 
+    def update_extents(self, subjoint: subjoint.SubJoint) -> None:
+        """Updates the extents and the leftmost point of the horizontal joint
+        with a new subjoint.
+
+        Args:
+            subjoint (SubJoint): subjoint added to the horizontal joint
+        """
+        if self.leftmost is None:
+            self.min_x, self.max_x = subjoint.x1, subjoint.x2
+            self.min_y = min(subjoint.y1, subjoint.y2)
+            self.max_y = max(subjoint.y1, subjoint.y2)
+            self.leftmost = subjoint
+            return
+        # x1 <= x2 for every subjoint
+        if subjoint.x1 < self.min_x:
+            self.min_x = subjoint.x1
+        if subjoint.x2 > self.max_x:
+            self.max_x = subjoint.x2
+        self.min_y = min(self.min_y, subjoint.y1, subjoint.y2)
+        self.max_y = max(self.max_y, subjoint.y1, subjoint.y2)
+        if subjoint.x1 < self.leftmost.x1:
+            self.leftmost = subjoint
+
+
     def add_subjoint(self, subjoint: subjoint.SubJoint) -> None:
         """Adds a subjoint to the horizontal joint's list of subjoints and
         orders the subjoints from left to right.
@@ -30,8 +67,9 @@ class HorizontalJoint:
         Args:
             subjoint (SubJoint): subjoint to add to the horizontal joint
         """ 
-        self.subjoints.append(subjoint)
-        self.subjoints.sort(key=lambda subjoint: subjoint.x1)
+        # inserted after subjoints with the same x1, like a stable sort
+        bisect.insort(self.subjoints, subjoint, key=lambda s: s.x1)
+        self.update_extents(subjoint)
 
     
     def belongs_to_joint(self, new_subjoint: subjoint.SubJoint) -> bool:
@@ -53,8 +91,8 @@ class HorizontalJoint:
         if not self.subjoints:
             return True
 
-        y_max = self.get_max_y()
-        y_min = self.get_min_y()
+        y_max = self.max_y
+        y_min = self.min_y
         return (y_min - 50 <= new_subjoint.y1 <= y_max + 50 
                 or y_min - 50 <= new_subjoint.y2 <= y_max + 50)
             
@@ -67,8 +105,7 @@ class HorizontalJoint:
         Returns:
             int: maximum y value of the horizontal joint
         """
-        return max(max([subjoint.y2 for subjoint in self.subjoints]), 
-                   (max([subjoint.y1 for subjoint in self.subjoints])))
+        return self.max_y
     
 
     def get_min_y(self) -> int:
@@ -78,8 +115,7 @@ class HorizontalJoint:
         Returns:
             int: minimum y value of the horizontal joint
         """
-        return min(min([subjoint.y2 for subjoint in self.subjoints]),
-                   (min([subjoint.y1 for subjoint in self.subjoints])))
+        return self.min_y
 
 
     def get_leftmost_point(self) -> tuple:
@@ -89,11 +125,9 @@ class HorizontalJoint:
         Returns:
             tuple: (x, y) of the leftmost point of the horizontal joint
         """
-        ret = None
-        for subjoint in self.subjoints:
-            if ret is None or subjoint.x1 < ret[0]:
-                ret = (subjoint.x1, subjoint.y1)
-        return ret
+        if self.leftmost is None:
+            return None
+        return (self.leftmost.x1, self.leftmost.y1)
     
 
     def get_max_x(self) -> int:
@@ -103,8 +137,7 @@ class HorizontalJoint:
         Returns:
             int: maximum x value of the horizontal joint
         """
-        return max(max([subjoint.x2 for subjoint in self.subjoints]),
-                   (max([subjoint.x1 for subjoint in self.subjoints])))
+        return self.max_x
     
 
     def get_min_x(self) -> int:
@@ -114,8 +147,7 @@ class HorizontalJoint:
         Returns:
             int: minimum x value of the horizontal joint
         """
-        return min(min([subjoint.x2 for subjoint in self.subjoints]),
-                   (min([subjoint.x1 for subjoint in self.subjoints])))
+        return self.min_x
     
     
     def get_bottom_img_id(self, num_images: int, img_size: int):
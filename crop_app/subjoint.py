@@ -1,5 +1,7 @@
 import math
 class SubJoint:
+    __slots__ = ('x1', 'y1', 'x2', 'y2', 'dist')
+
     def __init__(self, x1: int, y1: int, x2: int, y2: int, dist: int=None):
         """A SubJoint is a line segment, defined by two endpoints, that is part
         of a HorizontalJoint.
@@ -80,9 +80,35 @@ if __name__ == '__main__':
                         default=False,
                         action='store_true',
                         help='delete segment entries in database before running')
+
+    parser.add_argument('--resume',
+                        default=False,
+                        action='store_true',
+                        help='continue an interrupted run from its last '
+                             'completed slab')
+
+    parser.add_argument('--pyramid',
+                        default=False,
+                        action='store_true',
+                        help='also write thumbnails of the slabs and frames '
+                             'for the annotation tool')
+
+    parser.add_argument('--workers',
+                        metavar='<number of processes>',
+                        type=int,
+                        default=1,
+                        help='processes calculating the crack stats in '
+                             'parallel (default: 1)')
+
+    parser.add_argument('--frame-store',
+                        default=False,
+                        action='store_true',
+                        help='pack the frames of each mode into a single '
+                             'memory-mapped file before cropping, reused by '
+                             'later runs and the annotation tool')
     
 
-    func, dir, pxh, pxw, mmh, mmw, mode, begin_MM, end_MM, year, interstate, overwrite = list(vars(parser.parse_args()).values())
+    func, dir, pxh, pxw, mmh, mmw, mode, begin_MM, end_MM, year, interstate, overwrite, resume, pyramid, workers, frame_store = list(vars(parser.parse_args()).values())
     begin_MM = int(begin_MM)
     end_MM = int(end_MM)
     year = int(year)
@@ -97,6 +123,9 @@ if __name__ == '__main__':
 
     if begin_MM < 0 or end_MM < 0:
         raise ValueError("MM cannot be negative")
+
+    if workers <= 0:
+        raise ValueError("Number of workers must be positive.")
     
     if len(str(year)) != 4 or year < 0:
         raise ValueError("Please enter a valid year.")
@@ -122,4 +151,5 @@ if __name__ == '__main__':
         crop_only = True
     CropSlabsCVAT(dir, pxh, pxw, mmh, mmw, mode, 
                   begin_MM, end_MM, year, interstate, 
-                  SlabInventory(), overwrite, v_only, crop_only)
+                  SlabInventory(), overwrite, v_only, crop_only, resume, 
+                  pyramid, workers, frame_store)
@@ -1,3 +1,4 @@
 from .core.cvm_builder import CvmBuilder
+from .schemas import CrackStats, CrackVectorModel
 
-__all__ = ["CvmBuilder"]
+__all__ = ["CvmBuilder", "CrackStats", "CrackVectorModel"]
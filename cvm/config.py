@@ -1,8 +1,21 @@
-from dynaconf import LazySettings
-
-settings = LazySettings(
-    settings_files=["configs/settings.yaml"],
-    envvar_prefix=False,
-    environments=True,
-    load_dotenv=True,
-)
+class _LazySettings:
+    """Settings loaded with dynaconf on first access, so importing cvm does
+    not import dynaconf or read the settings file until a setting is used."""
+
+    def __init__(self):
+        self._settings = None
+
+    def __getattr__(self, name):
+        if self._settings is None:
+            from dynaconf import LazySettings
+
+            self._settings = LazySettings(
+                settings_files=["configs/settings.yaml"],
+                envvar_prefix=False,
+                environments=True,
+                load_dotenv=True,
+            )
+        return getattr(self._settings, name)
+
+
+settings = _LazySettings()
@@ -9,7 +9,6 @@ import copy
 import logging
 
 import cv2 as cv
-import matplotlib.pyplot as plt
 import numpy as np
 from skimage import measure, morphology
 
@@ -18,6 +17,12 @@ from cvm.types import Np2dArray
 
 logger = logging.getLogger(__name__)
 
+# kernels shared by every image
+BLURRED_KERNEL = np.array([[1, 1, 1], [1, 0, 1], [1, 1, 1]], np.uint8)
+CENTERED_KERNEL = np.array([[0, 0, 0], [0, 1, 0], [0, 0, 0]], np.uint8)
+LAPLACIAN_KERNEL = np.array([[0, 1, 0], [1, 0, 1], [0, 1, 0]], np.uint8)
+ONE_NEIGHBOR_KERNEL = np.array([[0, 1, 0], [1, 1, 0], [0, 0, 0]], np.uint8)
+
 
 def get_crack_skeleton(seg_img: np.ndarray) -> np.ndarray:
     """Return the binary skeleton of the provided binary segmentation image."""
@@ -26,92 +31,73 @@ def get_crack_skeleton(seg_img: np.ndarray) -> np.ndarray:
     return crack_skeleton
 
 
+def get_branch_endpoints(branch: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Return the (row, column) indices of the end points of a branch, in row-major order.
+
+    The end points are found on the bounding box of the branch (plus a one pixel margin) instead of
+    a full-size copy of the image, which gives the same result for a fraction of the memory and time.
+    """
+    top, left = branch.min(axis=0) - 1
+    bottom, right = branch.max(axis=0) + 2
+    branch_image = np.zeros((bottom - top, right - left), dtype=bool)
+    branch_image[branch.T[0] - top, branch.T[1] - left] = 1
+    rows, cols = np.where(get_endpoints_mask(branch_image))
+    return rows + top, cols + left
+
+
 def get_intersections(crack_skeleton: np.ndarray, image_size):
     """Return intersections using `get_branches_mask` operation"""
 
-    branch_points = get_branches_mask(crack_skeleton)
-
-    blurred_kernel = np.array([[1, 1, 1], [1, 0, 1], [1, 1, 1]], np.uint8)
+    branch_points = get_branches_mask(crack_skeleton).astype(np.uint8)
 
     # isolate cells that have no neighbors
-    centered_kernel = np.array([[0, 0, 0], [0, 1, 0], [0, 0, 0]], np.uint8)
     hitormiss1 = cv.morphologyEx(
-        branch_points.astype(np.uint8),
+        branch_points,
         cv.MORPH_ERODE,
-        centered_kernel,
+        CENTERED_KERNEL,
         borderValue=0,
     )
     hitormiss2 = cv.morphologyEx(
-        cv.bitwise_not(branch_points.astype(np.uint8)),
+        cv.bitwise_not(branch_points),
         cv.MORPH_ERODE,
-        blurred_kernel,
+        BLURRED_KERNEL,
         borderValue=0,
     )
     no_neighbor_cells = cv.bitwise_and(hitormiss1, hitormiss2)
 
     # multi neighbor cells
-    laplacian_kernel = np.array([[0, 1, 0], [1, 0, 1], [0, 1, 0]], np.uint8)
-    # Apply convolution
     result = cv.filter2D(
-        branch_points.astype(np.uint8),
+        branch_points,
         -1,
-        laplacian_kernel,
+        LAPLACIAN_KERNEL,
         borderType=cv.BORDER_CONSTANT,
     )
-    multi_neighbor_cells = np.where((crack_skeleton == 1) & (result >= 2), 1, 0)
+    on_skeleton = crack_skeleton == 1
+    multi_neighbor_cells = (on_skeleton & (result >= 2)).astype(np.uint8)
 
     left_over_multineighbor_intersections = np.logical_and(
         branch_points,
-        np.logical_not(np.where((crack_skeleton == 1) & (result >= 1), 1, 0)),
+        np.logical_not(on_skeleton & (result >= 1)),
     )
 
-    # multi neighbor intersection
-    kernel4 = np.array([[1, 0, 1], [0, 0, 0], [1, 0, 1]], np.uint8)
-    # Apply convolution
-    result = cv.filter2D(
-        branch_points.astype(np.uint8),
-        -1,
-        laplacian_kernel,
-        borderType=cv.BORDER_CONSTANT,
-    )
-    multi_neighbor_cells = np.where((crack_skeleton == 1) & (result >= 2), 1, 0)
-
-    # can maybe turn this into a convolution in the future with 4 kernals and a bunch of XORs
     # consolidate intersections that have 2 neighbor intersections
-    one_neighbor_kernel = np.array([[-1, 1, -1], [1, 1, 1], [-1, 1, -1]], np.uint8)
     result = cv.filter2D(
-        branch_points.astype(np.uint8),
+        branch_points,
         -1,
-        one_neighbor_kernel,
+        ONE_NEIGHBOR_KERNEL,
         borderType=cv.BORDER_CONSTANT,
     )
-    one_neighbor_intersection = np.where((crack_skeleton == 1) & (result == 2), 1, 0)
-    one_neighbor_kernel_final = np.array([[0, 1, 0], [1, 1, 0], [0, 0, 0]], np.uint8)
-    result = cv.filter2D(
-        branch_points.astype(np.uint8),
-        -1,
-        one_neighbor_kernel_final,
-        borderType=cv.BORDER_CONSTANT,
+    one_neighbor_intersection = (on_skeleton & (result == 2)).astype(np.uint8)
+
+    # drop the ones next to a multi neighbor cell (4-connectivity), except on the image border
+    next_to_multi_neighbor = np.zeros_like(one_neighbor_intersection)
+    next_to_multi_neighbor[1:-1, 1:-1] = (
+        multi_neighbor_cells[2:, 1:-1]
+        | multi_neighbor_cells[1:-1, 2:]
+        | multi_neighbor_cells[:-2, 1:-1]
+        | multi_neighbor_cells[1:-1, :-2]
     )
-    one_neighbor_intersection = np.where((crack_skeleton == 1) & (result == 2), 1, 0)
-
-    # TODO: Convert this loops into numpy
-    for j in range(image_size[1]):
-        for i in range(image_size[0]):
-            if (
-                one_neighbor_intersection[j][i] == 1
-                and i - 1 >= 0
-                and i + 1 < image_size[0]
-                and j - 1 >= 0
-                and j + 1 < image_size[1]
-            ):
-                if (
-                    multi_neighbor_cells[j + 1][i] == 1
-                    or multi_neighbor_cells[j][i + 1] == 1
-                    or multi_neighbor_cells[j - 1][i] == 1
-                    or multi_neighbor_cells[j][i - 1] == 1
-                ):
-                    one_neighbor_intersection[j][i] = 0
+    one_neighbor_intersection[next_to_multi_neighbor == 1] = 0
 
     # combine single and multi neighbor intersections
     final_intersections = crack_skeleton & (
@@ -162,11 +148,11 @@ def find_neighbors(
     # Filter unique neighbors
     neighbors_idx = list(set(neighbors_idx))
 
-    # Remove intersections from neighbors
-    neighbors_idx = [idx for idx in neighbors_idx if idx not in intersections_idx]
-
-    # Retain only those neighbors that are part of the crack skeleton
-    neighbors_idx = np.array([idx for idx in neighbors_idx if idx in crack_skeleton_idx], dtype=np.int32)
+    # Remove intersections from neighbors and retain only those neighbors that are part of the crack skeleton
+    neighbors_idx = np.array(neighbors_idx, dtype=np.int64)
+    neighbors_idx = neighbors_idx[
+        ~np.isin(neighbors_idx, intersections_idx) & np.isin(neighbors_idx, crack_skeleton_idx)
+    ].astype(np.int32)
 
     # Convert linear indices to x, y coordinates
     x, y = np.unravel_index(neighbors_idx, image_size)
@@ -190,16 +176,13 @@ def split_to_branches(crack_skeleton: np.ndarray) -> list[Np2dArray]:
 
 def add_neighbors_back_to_branches(neighbors_idx, branches_idx, image):
     modified_neighbors_idx = np.array([neighbors_idx[0], neighbors_idx[1]]).T
+    # same neighbors as modified_neighbors_idx, for fast lookups
+    remaining_neighbors = set(map(tuple, modified_neighbors_idx.tolist()))
     special_pixels_idx = []
 
     for i, branch in enumerate(branches_idx):
         if len(branch) >= 2:
-            temp_image = np.zeros_like(image)
-            temp_image[branch.T[0], branch.T[1]] = 1
-
-            ends = get_endpoints_mask(temp_image)
-
-            ends_idx = np.where(ends)
+            ends_idx = get_branch_endpoints(branch)
 
             if len(ends_idx[0]) > 2:
                 logger.debug("Hard warning (this branch is skipped): more than 2 end points " "found in a branch")
@@ -222,7 +205,7 @@ def add_neighbors_back_to_branches(neighbors_idx, branches_idx, image):
                 ]
 
                 selected_neighbors_idx = np.array(
-                    [np.array(idx) for idx in end_surroundings_idx if idx in modified_neighbors_idx.tolist()]
+                    [np.array(idx) for idx in end_surroundings_idx if tuple(idx) in remaining_neighbors]
                 )
 
                 if len(selected_neighbors_idx) > 1:
@@ -237,6 +220,7 @@ def add_neighbors_back_to_branches(neighbors_idx, branches_idx, image):
                 modified_neighbors_idx = np.array(
                     [idx for idx in modified_neighbors_idx.tolist() if idx not in selected_neighbors_idx.tolist()]
                 )
+                remaining_neighbors.difference_update(map(tuple, selected_neighbors_idx.tolist()))
         elif len(branch) == 1:
             center_idx = branch[0]
             end_surroundings_idx = [
@@ -251,7 +235,7 @@ def add_neighbors_back_to_branches(neighbors_idx, branches_idx, image):
             ]
 
             selected_neighbors_idx = np.array(
-                [idx for idx in end_surroundings_idx if idx in modified_neighbors_idx.tolist()]
+                [idx for idx in end_surroundings_idx if tuple(idx) in remaining_neighbors]
             )
 
             if len(selected_neighbors_idx) > 2:
@@ -267,6 +251,7 @@ def add_neighbors_back_to_branches(neighbors_idx, branches_idx, image):
             modified_neighbors_idx = np.array(
                 [idx for idx in modified_neighbors_idx.tolist() if idx not in selected_neighbors_idx.tolist()]
             )
+            remaining_neighbors.difference_update(map(tuple, selected_neighbors_idx.tolist()))
 
     return modified_neighbors_idx, special_pixels_idx, branches_idx
 
@@ -286,14 +271,11 @@ def connect_branches_with_intersections(branches_idx: list[np.ndarray], image: n
     special_pixels_1_idx = []
     special_pixels_2_idx = []
     use_of_intersections = []
+    intersections_set = set(map(tuple, intersections_idx.tolist()))
 
     for i, branch in enumerate(branches_idx):
         if len(branch) >= 2:
-            temp_image = np.zeros_like(image)
-            temp_image[branch.T[0], branch.T[1]] = 1
-
-            ends = get_endpoints_mask(temp_image)
-            ends_idx = np.where(ends)
+            ends_idx = get_branch_endpoints(branch)
 
             if len(ends_idx[0]) > 2:
                 logger.debug("Hard warning (this branch is skipped): more than 2 end points found in a branch")
@@ -315,7 +297,7 @@ def connect_branches_with_intersections(branches_idx: list[np.ndarray], image: n
                     [end_idx[1] + 1, end_idx[0] - 1],
                 ]
 
-                selected_neighbors_idx = [idx for idx in end_surroundings_idx if idx in intersections_idx.tolist()]
+                selected_neighbors_idx = [idx for idx in end_surroundings_idx if tuple(idx) in intersections_set]
 
                 if len(selected_neighbors_idx) > 1:
                     logger.debug(
@@ -342,7 +324,7 @@ def connect_branches_with_intersections(branches_idx: list[np.ndarray], image: n
                 [end_idx[1] - 1, end_idx[0] + 1],
                 [end_idx[1] + 1, end_idx[0] - 1],
             ]
-            selected_neighbors_idx = [idx for idx in end_surroundings_idx if idx in intersections_idx.tolist()]
+            selected_neighbors_idx = [idx for idx in end_surroundings_idx if tuple(idx) in intersections_set]
 
             if len(selected_neighbors_idx) > 2:
                 logger.debug(
@@ -373,10 +355,7 @@ def linearize_branches(branches_idx, image):
             continue
 
         # Branches containing more than 2 pixels
-        temp_image = np.zeros(image.shape, dtype=bool)
-        temp_image[branch.T[0], branch.T[1]] = 1
-        ends = get_endpoints_mask(temp_image)
-        ends_idx = np.where(ends)
+        ends_idx = get_branch_endpoints(branch)
 
         # Check the number of end points
         if len(ends_idx[0]) < 2:
@@ -440,6 +419,9 @@ def linearize_branches(branches_idx, image):
 def plot_result_of_crack_length_and_width(
     rng_image, branches_xy, intersections_xy, lon1, lon2, lat1, lat2, branches_length, branches_width, **kwargs
 ):
+    # matplotlib is only needed for plotting, so it is not imported with the numeric core
+    import matplotlib.pyplot as plt
+
     is_plain = "plain" in kwargs and kwargs["plain"]
 
     # Prepare the figure and axis
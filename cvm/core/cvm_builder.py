@@ -1,9 +1,12 @@
 import logging
+from collections import deque
+from collections.abc import Iterable, Iterator
+from concurrent.futures import ProcessPoolExecutor
 from itertools import chain
 from pathlib import Path
+from typing import TYPE_CHECKING
 
 import cv2 as cv
-import geojson
 import numpy as np
 
 from cvm.config import settings
@@ -14,7 +17,7 @@ from cvm.exceptions import (
     MissingImageOrGeojsonError,
     RedundantImageError,
 )
-from cvm.schemas import CrackVectorModel
+from cvm.schemas import CrackStats, CrackVectorModel
 from cvm.utils import geojson_to_geodataframe
 
 from .base import (
@@ -29,8 +32,19 @@ from .base import (
     split_to_branches,
 )
 from .length import compute_crack_length
+from .summary import fast_crack_stats
+from .tiled import (
+    get_crack_skeleton_points,
+    get_intersections_tiled,
+    remove_points,
+    split_points_to_branches,
+)
 from .width import compute_crack_width
 
+# GeoJSON support is imported on first use, so importing the builder only loads the numeric core
+if TYPE_CHECKING:
+    import geojson
+
 logger = logging.getLogger(__name__)
 
 
@@ -48,15 +62,19 @@ class CvmBuilder:
         use_seg_img_obj(seg_img_obj): Sets the segmentation image using an image object.
         use_range_img_obj(range_img_obj): Sets the range image using an image object.
         build(): Constructs and returns the CrackVectorModel.
+        build_summary(fast): Computes the crack statistics, optionally with a fast estimate.
+        build_many(masks, workers, summary): Constructs the CrackVectorModels of many segmentation images.
         _get_binarized_range_img(range_img): A static method to binarize the range image.
     """
 
     def __init__(self):
         self._seg_img: np.ndarray | None = None
         self._range_img: np.ndarray | None = None
-        self._geojson_obj: geojson.FeatureCollection | None = None
+        self._geojson_obj: "geojson.FeatureCollection | None" = None
 
         self._use_rng_img_for_width_cal: bool = False
+        self._tile_height: int | None = None
+        self._tile_halo: int | None = None
 
     def use_seg_img_path(self, path: str | Path, /) -> "CvmBuilder":
         """
@@ -130,7 +148,7 @@ class CvmBuilder:
         self._range_img = 255 - _range_img
         return self
 
-    def use_geojson_obj(self, obj: geojson.FeatureCollection, /):
+    def use_geojson_obj(self, obj: "geojson.FeatureCollection", /):
         """
         Sets the GeoJSON object for the CVM using a FeatureCollection object.
 
@@ -170,6 +188,8 @@ class CvmBuilder:
         if not Path(file).exists():
             raise FileNotFoundError(f"Not found geojson file at the given path {file}")
 
+        import geojson
+
         with open(str(file)) as f:
             self._geojson_obj = geojson.load(f)
             if not self._geojson_obj.is_valid:
@@ -190,6 +210,28 @@ class CvmBuilder:
 
         return self
 
+    def use_tiled_processing(self, tile_height: int = 1250, halo: int | None = None) -> "CvmBuilder":
+        """
+        Processes the segmentation image in horizontal strips, for slab masks spanning many frames. The model
+        is the same as with whole-image processing, but the skeleton is kept as pixel coordinates and the
+        intermediate images are the size of a strip, so the memory used besides the image does not grow
+        with its length.
+
+        Parameters:
+            tile_height (int, optional): Number of rows processed at once. Defaults to 1250 (one frame).
+            halo (int | None, optional): Rows added on each side of a strip when thinning it. A halo smaller
+                than about the width of the widest crack changes the skeleton near the strip borders. Defaults
+                to None, which chooses the halo of each strip from the width of its cracks.
+
+        Returns:
+            CvmBuilder: The instance of this builder for chaining.
+        """
+        if tile_height <= 0:
+            raise ValueError("tile_height must be positive!")
+        self._tile_height = tile_height
+        self._tile_halo = halo
+        return self
+
     def remove_lane_mark(self) -> "CvmBuilder":
         if self._seg_img is not None:
             return self
@@ -217,6 +259,65 @@ class CvmBuilder:
             return self._build_from_geojson(self._geojson_obj)
 
         # ... or use image to construct the CVM
+        if self._tile_height is not None:
+            intersections_xy, linearized_branches_xy = self._split_branches_tiled()
+        else:
+            intersections_xy, linearized_branches_xy = self._split_branches()
+
+        # Set the unit length of the pavement image (length that each pixel represents)
+        pixel_length = 4  # unit in mm
+        branches_length = compute_crack_length(linearized_branches_xy, pixel_length)
+
+        image_for_width = self._range_img if self._use_rng_img_for_width_cal else self._seg_img
+        thresh = (
+            settings.WIDTH_INTENSITY_THRESHOLD.range
+            if self._use_rng_img_for_width_cal
+            else settings.WIDTH_INTENSITY_THRESHOLD.segmentation
+        )
+        branches_width_xy, branches_width = compute_crack_width(
+            linearized_branches_xy, thresh=thresh, image=image_for_width
+        )
+
+        # TODO: The intersections reprenstation is reversed compared to the correct one.
+        # TODO: It should be fixed but it might mess up the connect_branches_with_intersections function.
+        # TODO: Therefore, we temporarily flip it back here.
+        intersections_xy = np.flip(intersections_xy, axis=1)
+
+        return CrackVectorModel.from_branches(
+            intersections_xy=intersections_xy,
+            branches_length_xy=linearized_branches_xy,
+            branches_width_xy=branches_width_xy,
+            branches_length=branches_length,
+            branches_width=branches_width,
+        )
+
+    def build_summary(self, fast: bool = False) -> CrackStats:
+        """
+        Computes the total length and the mean and median widths of the cracks of the segmentation image.
+
+        Parameters:
+            fast (bool, optional): Estimate the statistics from the skeleton and the distance transform of the
+                image instead of building the model, which is about an order of magnitude faster (see
+                `cvm.core.summary` for the accuracy). Widths are always measured on the segmentation image.
+                Defaults to False.
+
+        Returns:
+            CrackStats: The crack statistics.
+        """
+        if not fast:
+            return self.build().summary()
+        self._check_current_state()
+        if self._seg_img is None:
+            raise MissingImageError("The fast crack statistics need a segmentation image!")
+        return fast_crack_stats(self._seg_img, tile_height=self._tile_height)
+
+    def _split_branches(self) -> tuple[np.ndarray, list]:
+        """
+        Splits the skeleton of the segmentation image into linearized branches.
+
+        Returns:
+            tuple[np.ndarray, list]: The intersections and the points of each branch.
+        """
         img_size = (self._seg_img.shape[1], self._seg_img.shape[0])
 
         # Step 1: Extract Crack Skeleton
@@ -242,6 +343,42 @@ class CvmBuilder:
         branches = split_to_branches(crack_skeleton_no_intersection)
 
         # Step 3: Branch connectivity refinement
+        return intersections_xy, self._refine_branches(branches, neighbors_idx, intersections_xy, crack_skeleton)
+
+    def _split_branches_tiled(self) -> tuple[np.ndarray, list]:
+        """
+        Same as `_split_branches`, processing the segmentation image in strips (see `use_tiled_processing`).
+
+        Returns:
+            tuple[np.ndarray, list]: The intersections and the points of each branch.
+        """
+        height, width = self._seg_img.shape[:2]
+        img_size = (width, height)
+
+        # Step 1: Extract Crack Skeleton, as pixel coordinates
+        skeleton_points = get_crack_skeleton_points(self._seg_img, self._tile_height, self._tile_halo)
+
+        ### Step 2: Split Continuous Crack Skeleton to Disconnected Crack Branches
+        intersections_idx, intersections_xy = get_intersections_tiled(
+            skeleton_points, (height, width), self._tile_height
+        )
+        skeleton_no_intersection_points = remove_points(skeleton_points, intersections_idx, width)
+        neighbors_idx, _ = find_neighbors(intersections_idx, img_size, skeleton_no_intersection_points)
+        skeleton_no_intersection_points = remove_points(skeleton_no_intersection_points, neighbors_idx, width)
+        branches = split_points_to_branches(skeleton_no_intersection_points, width)
+
+        # Step 3: Branch connectivity refinement, which only uses the coordinates of the branches
+        return intersections_xy, self._refine_branches(branches, neighbors_idx, intersections_xy, None)
+
+    @staticmethod
+    def _refine_branches(branches: list, neighbors_idx, intersections_xy: np.ndarray, crack_skeleton) -> list:
+        """
+        Adds the neighbors of the intersections back to the branches, connects the branches with the
+        intersections and linearizes them.
+
+        Returns:
+            list: The points of each linearized branch.
+        """
         ## Step 3.1: adding neighbors back to branches
         (
             modified_neighbors_idx,
@@ -254,34 +391,51 @@ class CvmBuilder:
 
         ## Step 3.3: connecting branches with intersections
         branches_idx = connect_branches_with_intersections(branches_idx, crack_skeleton, intersections_xy)
-        linearized_branches_xy = linearize_branches(branches_idx, crack_skeleton)[0]
-
-        # Set the unit length of the pavement image (length that each pixel represents)
-        pixel_length = 4  # unit in mm
-        branches_length = compute_crack_length(linearized_branches_xy, pixel_length)
-
-        image_for_width = self._range_img if self._use_rng_img_for_width_cal else self._seg_img
-        thresh = (
-            settings.WIDTH_INTENSITY_THRESHOLD.range
-            if self._use_rng_img_for_width_cal
-            else settings.WIDTH_INTENSITY_THRESHOLD.segmentation
-        )
-        branches_width_xy, branches_width = compute_crack_width(
-            linearized_branches_xy, thresh=thresh, image=image_for_width
-        )
+        return linearize_branches(branches_idx, crack_skeleton)[0]
+
+    @staticmethod
+    def build_many(
+        masks: Iterable[np.ndarray],
+        *,
+        workers: int = 1,
+        summary: bool = False,
+        fast: bool = False,
+        tile_height: int | None = None,
+    ) -> Iterator[CrackVectorModel | CrackStats]:
+        """
+        Constructs the CrackVectorModel of each segmentation image of an iterable, in order.
 
-        # TODO: The intersections reprenstation is reversed compared to the correct one.
-        # TODO: It should be fixed but it might mess up the connect_branches_with_intersections function.
-        # TODO: Therefore, we temporarily flip it back here.
-        intersections_xy = np.flip(intersections_xy, axis=1)
+        The images are read from the iterable as they are needed, so it can be a generator reading them from
+        disk. With more than one worker, the images are processed in parallel by a pool of processes, with at
+        most two images per worker waiting to be processed.
 
-        return CrackVectorModel(
-            intersections_xy=intersections_xy,
-            branches_length_xy=linearized_branches_xy,
-            branches_width_xy=branches_width_xy,
-            branches_length=branches_length,
-            branches_width=branches_width,
-        )
+        Parameters:
+            masks (Iterable[np.ndarray]): The binary segmentation images.
+            workers (int, optional): Number of processes building models in parallel. Defaults to 1 (no
+                additional processes).
+            summary (bool, optional): Yield the CrackStats of each image instead of its model, which avoids
+                sending the models back from the worker processes. Defaults to False.
+            fast (bool, optional): Yield the fast estimate of the CrackStats of each image (see `build_summary`).
+                Defaults to False.
+            tile_height (int | None, optional): Process the images in strips of this many rows (see
+                `use_tiled_processing`). Defaults to None (whole images).
+
+        Yields:
+            CrackVectorModel | CrackStats: The model (or its summary) of each image, in the order of the images.
+        """
+        if workers <= 1:
+            for mask in masks:
+                yield _build_from_seg_img(mask, summary, fast, tile_height)
+            return
+
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            pending = deque()
+            for mask in masks:
+                pending.append(executor.submit(_build_from_seg_img, mask, summary, fast, tile_height))
+                if len(pending) >= 2 * workers:
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
 
     def _check_current_state(self) -> None:
         """
@@ -307,7 +461,7 @@ class CvmBuilder:
                 "Range image is required for width calculation! Please use use_range_* before using this function."
             )
 
-    def _build_from_geojson(self, geojson_obj: geojson.FeatureCollection) -> CrackVectorModel:
+    def _build_from_geojson(self, geojson_obj: "geojson.FeatureCollection") -> CrackVectorModel:
         """
         Builds a CrackVectorModel from a GeoJSON FeatureCollection object.
 
@@ -377,10 +531,22 @@ class CvmBuilder:
         )
         intersections_xy = intersections_xy[count > 1]
 
-        return CrackVectorModel(
+        return CrackVectorModel.from_branches(
             intersections_xy=intersections_xy,
             branches_length_xy=branches_length_xy,
             branches_width_xy=branches_width_xy,
             branches_length=branches_length,
             branches_width=branches_width,
         )
+
+
+def _build_from_seg_img(
+    seg_img: np.ndarray, summary: bool, fast: bool, tile_height: int | None
+) -> CrackVectorModel | CrackStats:
+    """Builds the model of a segmentation image. Defined at module level so worker processes can run it."""
+    builder = CvmBuilder().use_seg_img_obj(seg_img)
+    if tile_height is not None:
+        builder.use_tiled_processing(tile_height)
+    if summary or fast:
+        return builder.build_summary(fast)
+    return builder.build()
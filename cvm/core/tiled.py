@@ -0,0 +1,163 @@
+"""
+Strip-wise versions of the skeleton and branch splitting steps, for slab masks too long to process whole.
+
+The mask is processed in horizontal strips of `tile_height` rows. Each strip is extended by a halo of rows
+on both sides, so the local operations see the same neighborhood as on the whole image, and only the rows
+of the strip itself are kept. The skeleton is kept as a list of pixel coordinates instead of an image, so
+the memory used besides the mask is proportional to the strip size and to the number of skeleton pixels.
+"""
+
+import math
+
+import cv2 as cv
+import numpy as np
+from scipy import sparse
+from scipy.sparse import csgraph
+from skimage import morphology
+
+from .base import get_intersections
+
+# rows around a pixel that determine whether it is an intersection (get_intersections uses 3x3 operations
+# on a 3x3 neighbor count, and then looks at the 4-neighbors of the result)
+INTERSECTION_HALO = 4
+
+# forward neighbors of a pixel in raster order (8-connectivity)
+FORWARD_OFFSETS = ((0, 1), (1, -1), (1, 0), (1, 1))
+
+
+def iter_strips(height: int, tile_height: int, halo: int):
+    """Yield (top, bottom, halo_top, halo_bottom) rows of each strip, and of the strip extended by the halo."""
+    for top in range(0, height, tile_height):
+        bottom = min(top + tile_height, height)
+        yield top, bottom, max(0, top - halo), min(height, bottom + halo)
+
+
+def get_thinning_halo(seg_img: np.ndarray) -> int:
+    """
+    Return the number of halo rows for which thinning a strip gives the same skeleton as thinning the whole
+    image in the rows of the strip.
+
+    Each thinning iteration removes at most one layer of pixels from each side of a crack and has two
+    sub-iterations looking at the 3x3 neighborhood of each pixel, so a change can travel at most two pixels
+    per iteration, and the number of iterations is bounded by the largest distance of a crack pixel to the
+    background.
+    """
+    if not seg_img.any():
+        return 1
+    distances = cv.distanceTransform((seg_img > 0).astype(np.uint8), cv.DIST_C, 3)
+    return 2 * (math.ceil(float(distances.max())) + 2)
+
+
+def get_crack_skeleton_points(
+    seg_img: np.ndarray, tile_height: int, halo: int | None = None, thin=morphology.thin
+) -> np.ndarray:
+    """
+    Return the (row, column) coordinates of the pixels of the skeleton of a segmentation image, in raster order.
+
+    Args:
+        seg_img (np.ndarray): The binary segmentation image.
+        tile_height (int): Number of rows thinned at once.
+        halo (int | None, optional): Rows added on each side of a strip. Defaults to None, which chooses
+            the halo of each strip from the width of its cracks (see `get_thinning_halo`).
+        thin (callable, optional): Thinning function of a binary image. Defaults to skimage's `thin`, used by
+            the full pipeline.
+
+    Returns:
+        np.ndarray: (N, 2) coordinates of the skeleton pixels.
+    """
+    height = seg_img.shape[0]
+    points = []
+    for top, bottom, _, _ in iter_strips(height, tile_height, 0):
+        strip_halo = halo
+        if strip_halo is None:
+            # the halo needed depends on the cracks around the strip, so it is grown until it covers them
+            strip_halo = INTERSECTION_HALO
+            while True:
+                halo_top, halo_bottom = max(0, top - strip_halo), min(height, bottom + strip_halo)
+                if halo_top == 0 and halo_bottom == height:
+                    break
+                needed = get_thinning_halo(seg_img[halo_top:halo_bottom])
+                if needed <= strip_halo:
+                    break
+                strip_halo = needed
+        halo_top, halo_bottom = max(0, top - strip_halo), min(height, bottom + strip_halo)
+        strip_skeleton = thin(seg_img[halo_top:halo_bottom] > 0)
+        strip_points = np.argwhere(strip_skeleton[top - halo_top : bottom - halo_top])
+        strip_points[:, 0] += top
+        points.append(strip_points)
+    return np.concatenate(points) if points else np.empty((0, 2), dtype=np.intp)
+
+
+def points_to_image(points: np.ndarray, top: int, bottom: int, width: int) -> np.ndarray:
+    """Return the rows `top` to `bottom` of the binary image of a list of (row, column) coordinates."""
+    in_rows = (points[:, 0] >= top) & (points[:, 0] < bottom)
+    image = np.zeros((bottom - top, width), dtype=np.uint8)
+    image[points[in_rows, 0] - top, points[in_rows, 1]] = 1
+    return image
+
+
+def get_intersections_tiled(
+    skeleton_points: np.ndarray, image_shape: tuple[int, int], tile_height: int
+) -> tuple[tuple[np.ndarray, np.ndarray], np.ndarray]:
+    """
+    Strip-wise `get_intersections` on a skeleton given as coordinates.
+
+    Returns:
+        tuple[tuple[np.ndarray, np.ndarray], np.ndarray]: The (rows, columns) indices and the (x, y)
+            coordinates of the intersections, in raster order, as returned by `get_intersections`.
+    """
+    height, width = image_shape
+    rows, cols = [], []
+    for top, bottom, halo_top, halo_bottom in iter_strips(height, tile_height, INTERSECTION_HALO):
+        strip_skeleton = points_to_image(skeleton_points, halo_top, halo_bottom, width)
+        (strip_rows, strip_cols), _ = get_intersections(strip_skeleton, (width, halo_bottom - halo_top))
+        in_strip = (strip_rows >= top - halo_top) & (strip_rows < bottom - halo_top)
+        rows.append(strip_rows[in_strip] + halo_top)
+        cols.append(strip_cols[in_strip])
+    intersections_idx = (
+        np.concatenate(rows) if rows else np.empty(0, dtype=np.intp),
+        np.concatenate(cols) if cols else np.empty(0, dtype=np.intp),
+    )
+    intersections_xy = np.column_stack((intersections_idx[1], intersections_idx[0]))
+    return intersections_idx, intersections_xy
+
+
+def remove_points(points: np.ndarray, removed_idx: tuple[np.ndarray, np.ndarray], width: int) -> np.ndarray:
+    """Return the (row, column) coordinates of `points` that are not in the (rows, columns) `removed_idx`."""
+    keys = points[:, 0].astype(np.int64) * width + points[:, 1]
+    removed_keys = np.asarray(removed_idx[0], dtype=np.int64) * width + np.asarray(removed_idx[1], dtype=np.int64)
+    return points[~np.isin(keys, removed_keys)]
+
+
+def split_points_to_branches(points: np.ndarray, width: int) -> list[np.ndarray]:
+    """
+    Split a skeleton given as coordinates in raster order into its 8-connected components.
+
+    Gives the same branches, in the same order, as `split_to_branches` on the image of the skeleton:
+    branches are ordered by their first pixel in raster order, and the pixels of a branch are in raster order.
+    """
+    if len(points) == 0:
+        return []
+    keys = points[:, 0].astype(np.int64) * width + points[:, 1]
+    sources, targets = [], []
+    for d_row, d_col in FORWARD_OFFSETS:
+        cols = points[:, 1] + d_col
+        neighbor_keys = keys + d_row * width + d_col
+        positions = np.minimum(np.searchsorted(keys, neighbor_keys), len(keys) - 1)
+        found = (keys[positions] == neighbor_keys) & (cols >= 0) & (cols < width)
+        sources.append(np.flatnonzero(found))
+        targets.append(positions[found])
+    sources = np.concatenate(sources)
+    targets = np.concatenate(targets)
+    graph = sparse.coo_matrix((np.ones(len(sources), dtype=np.int8), (sources, targets)), shape=(len(keys),) * 2)
+    n_branches, labels = csgraph.connected_components(graph, directed=False)
+
+    # number the branches by their first pixel, as the labels of skimage.measure.label are
+    _, first_pixels = np.unique(labels, return_index=True)
+    branch_order = np.empty(n_branches, dtype=np.int64)
+    branch_order[np.argsort(first_pixels)] = np.arange(n_branches)
+    labels = branch_order[labels]
+
+    order = np.argsort(labels, kind="stable")
+    sizes = np.bincount(labels, minlength=n_branches)
+    return np.split(points[order], np.cumsum(sizes)[:-1])
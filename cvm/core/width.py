@@ -15,6 +15,8 @@ from cvm.config import settings
 def compute_crack_width(branches_xy, thresh, image):
     branches_width = []
     branches_width_xy = []
+    # read once, settings lookups are slow in the per-pixel loops
+    max_width_expand = settings.MAX_WIDTH_EXPAND
 
     for branch_xy in branches_xy:
         branch_width_measurement = []
@@ -39,7 +41,7 @@ def compute_crack_width(branches_xy, thresh, image):
                 neighb_value = image[int(math.floor(neighb[0])), int(math.floor(neighb[1]))]
                 if neighb_value > thresh:
                     pos_weight += 0.5
-                    if pos_weight > settings.MAX_WIDTH_EXPAND:
+                    if pos_weight > max_width_expand:
                         break
                 else:
                     break
@@ -61,7 +63,7 @@ def compute_crack_width(branches_xy, thresh, image):
                 if neighb_value > thresh:
                     neg_weight += 0.5
 
-                    if neg_weight > settings.MAX_WIDTH_EXPAND:
+                    if neg_weight > max_width_expand:
                         break
 
                 else:
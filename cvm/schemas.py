@@ -1,28 +1,251 @@
 from pathlib import Path
+from typing import TYPE_CHECKING, NamedTuple
 
 import cv2 as cv
-import geopandas as gpd
-import matplotlib.pyplot as plt
 import numpy as np
-import orjson
-import pydantic_numpy.typing as pnd
-from geojson import Feature, FeatureCollection, LineString
-from pydantic import BaseModel, ConfigDict
 
 from cvm import utils
 from cvm.core.base import plot_result_of_crack_length_and_width
 
+# GeoJSON, GeoDataFrame and plotting support is imported on first use
+if TYPE_CHECKING:
+    import geopandas as gpd
+    from geojson import FeatureCollection
 
-class CrackVectorModel(BaseModel):
-    model_config = ConfigDict(frozen=True)
 
-    intersections_xy: pnd.Np2DArrayInt32
-    branches_length_xy: list[pnd.Np2DArrayInt32]
-    branches_width_xy: list[pnd.Np3DArrayInt32]
-    branches_length: pnd.Np1DArrayFp32
-    branches_width: list[pnd.Np1DArrayFp32]
+class CrackStats(NamedTuple):
+    """Summary of the cracks of an image."""
 
-    def to_geojson(self) -> FeatureCollection:
+    total_length: float
+    mean_width: float
+    median_width: float
+
+
+def _to_ragged(arrays: list, item_shape: tuple[int, ...], dtype) -> tuple[np.ndarray, np.ndarray]:
+    """Concatenates a list of per-branch arrays into one array and the offsets of the branches in it.
+
+    Args:
+        arrays (list): per-branch arrays (or nested lists), each holding items of shape `item_shape`.
+        item_shape (tuple[int, ...]): shape of a single item, e.g. (2,) for points.
+        dtype: dtype of the concatenated array.
+
+    Returns:
+        tuple[np.ndarray, np.ndarray]: the concatenated items and the offsets, where the items of branch i
+            are `values[offsets[i]:offsets[i + 1]]`.
+    """
+    parts = [np.asarray(array, dtype=dtype).reshape((-1,) + item_shape) for array in arrays]
+    offsets = np.zeros(len(parts) + 1, dtype=np.int64)
+    np.cumsum([len(part) for part in parts], out=offsets[1:])
+    if not parts:
+        return np.empty((0,) + item_shape, dtype=dtype), offsets
+    return np.concatenate(parts), offsets
+
+
+def _split(values: np.ndarray, offsets: np.ndarray) -> list[np.ndarray]:
+    """Splits a ragged array into the views of its branches."""
+    if len(offsets) < 2:
+        return []
+    return np.split(values, offsets[1:-1])
+
+
+class CrackVectorModel:
+    """
+    Crack vector model stored as ragged arrays: the items of every branch are concatenated into one array,
+    and an offsets array gives where each branch starts and ends, so branch i of `length_xy` is
+    `length_xy[length_offsets[i]:length_offsets[i + 1]]`. The model is immutable (its arrays are read-only).
+
+    Attributes:
+        intersections_xy (np.ndarray): (N, 2) int32 coordinates of the intersections.
+        length_xy (np.ndarray): (P, 2) int32 points of the centerlines of all the branches.
+        length_offsets (np.ndarray): (B + 1,) int64 offsets of the branches in `length_xy`.
+        width_xy (np.ndarray): (Q, 2, 2) int32 end points of the width measurements of all the branches.
+        width_xy_offsets (np.ndarray): (B + 1,) int64 offsets of the branches in `width_xy`.
+        widths (np.ndarray): (Q,) float32 width measurements of all the branches.
+        width_offsets (np.ndarray): (B + 1,) int64 offsets of the branches in `widths`.
+        branches_length (np.ndarray): (B,) float32 length of each branch.
+    """
+
+    __slots__ = (
+        "intersections_xy",
+        "length_xy",
+        "length_offsets",
+        "width_xy",
+        "width_xy_offsets",
+        "widths",
+        "width_offsets",
+        "branches_length",
+    )
+
+    def __init__(
+        self,
+        intersections_xy: np.ndarray,
+        length_xy: np.ndarray,
+        length_offsets: np.ndarray,
+        width_xy: np.ndarray,
+        width_xy_offsets: np.ndarray,
+        widths: np.ndarray,
+        width_offsets: np.ndarray,
+        branches_length: np.ndarray,
+        *,
+        validate: bool = False,
+    ):
+        """
+        Creates a model from ragged arrays (see the class attributes).
+
+        Args:
+            validate (bool, optional): check the shapes and offsets of the arrays. Defaults to False.
+
+        Raises:
+            ValueError: If `validate` is True and the arrays are not consistent.
+        """
+        arrays = {
+            "intersections_xy": np.asarray(intersections_xy, dtype=np.int32).reshape(-1, 2),
+            "length_xy": np.asarray(length_xy, dtype=np.int32).reshape(-1, 2),
+            "length_offsets": np.asarray(length_offsets, dtype=np.int64),
+            "width_xy": np.asarray(width_xy, dtype=np.int32).reshape(-1, 2, 2),
+            "width_xy_offsets": np.asarray(width_xy_offsets, dtype=np.int64),
+            "widths": np.asarray(widths, dtype=np.float32),
+            "width_offsets": np.asarray(width_offsets, dtype=np.int64),
+            "branches_length": np.asarray(branches_length, dtype=np.float32),
+        }
+        for name, array in arrays.items():
+            array.flags.writeable = False
+            object.__setattr__(self, name, array)
+        if validate:
+            self.validate()
+
+    def __setattr__(self, name, value):
+        raise AttributeError("CrackVectorModel is immutable")
+
+    def __reduce__(self):
+        # rebuilt through __init__, as the attributes cannot be set after construction
+        return self.__class__, tuple(getattr(self, name) for name in self.__slots__)
+
+    @classmethod
+    def from_branches(
+        cls,
+        intersections_xy: np.ndarray,
+        branches_length_xy: list,
+        branches_width_xy: list,
+        branches_length: np.ndarray,
+        branches_width: list,
+        *,
+        validate: bool = False,
+    ) -> "CrackVectorModel":
+        """
+        Creates a model from per-branch lists of arrays.
+
+        Args:
+            intersections_xy (np.ndarray): (N, 2) coordinates of the intersections.
+            branches_length_xy (list): (n_i, 2) centerline points of each branch.
+            branches_width_xy (list): (m_i, 2, 2) width measurement end points of each branch.
+            branches_length (np.ndarray): length of each branch.
+            branches_width (list): (k_i,) width measurements of each branch.
+            validate (bool, optional): check the shapes and offsets of the arrays. Defaults to False.
+
+        Returns:
+            CrackVectorModel: The model.
+        """
+        length_xy, length_offsets = _to_ragged(branches_length_xy, (2,), np.int32)
+        width_xy, width_xy_offsets = _to_ragged(branches_width_xy, (2, 2), np.int32)
+        widths, width_offsets = _to_ragged(branches_width, (), np.float32)
+        return cls(
+            intersections_xy,
+            length_xy,
+            length_offsets,
+            width_xy,
+            width_xy_offsets,
+            widths,
+            width_offsets,
+            branches_length,
+            validate=validate,
+        )
+
+    def validate(self) -> None:
+        """
+        Checks that the offsets are consistent with each other and with the arrays they index.
+
+        Raises:
+            ValueError: If the arrays are not consistent.
+        """
+        n_branches = self.num_branches
+        for name, values, offsets in (
+            ("length_xy", self.length_xy, self.length_offsets),
+            ("width_xy", self.width_xy, self.width_xy_offsets),
+            ("widths", self.widths, self.width_offsets),
+        ):
+            if offsets.ndim != 1 or len(offsets) != n_branches + 1:
+                raise ValueError(f"Offsets of {name} must have one entry per branch plus one")
+            if offsets[0] != 0 or offsets[-1] != len(values) or np.any(np.diff(offsets) < 0):
+                raise ValueError(f"Offsets of {name} must increase from 0 to the number of items")
+        if self.widths.ndim != 1:
+            raise ValueError("widths must be a 1D array")
+        if self.branches_length.shape != (n_branches,):
+            raise ValueError("branches_length must have one entry per branch")
+
+    @property
+    def num_branches(self) -> int:
+        """Number of branches of the model."""
+        return len(self.length_offsets) - 1
+
+    @property
+    def branches_length_xy(self) -> list[np.ndarray]:
+        """(n_i, 2) centerline points of each branch, as views of `length_xy`."""
+        return _split(self.length_xy, self.length_offsets)
+
+    @property
+    def branches_width_xy(self) -> list[np.ndarray]:
+        """(m_i, 2, 2) width measurement end points of each branch, as views of `width_xy`."""
+        return _split(self.width_xy, self.width_xy_offsets)
+
+    @property
+    def branches_width(self) -> list[np.ndarray]:
+        """(k_i,) width measurements of each branch, as views of `widths`."""
+        return _split(self.widths, self.width_offsets)
+
+    def total_length(self) -> float:
+        """
+        Returns:
+            float: The sum of the lengths of the branches.
+        """
+        return float(self.branches_length.sum(dtype=np.float64))
+
+    def mean_width(self) -> float:
+        """
+        Returns:
+            float: The mean of the width measurements of all the branches, or 0 if there are none.
+        """
+        if len(self.widths) == 0:
+            return 0.0
+        return float(self.widths.mean(dtype=np.float64))
+
+    def median_width(self) -> float:
+        """
+        Returns:
+            float: The median of the width measurements of all the branches, or 0 if there are none.
+        """
+        return self.width_percentile(50)
+
+    def width_percentile(self, q: float) -> float:
+        """
+        Args:
+            q (float): The percentile to compute, between 0 and 100.
+
+        Returns:
+            float: The q-th percentile of the width measurements of all the branches, or 0 if there are none.
+        """
+        if len(self.widths) == 0:
+            return 0.0
+        return float(np.percentile(self.widths, q))
+
+    def summary(self) -> CrackStats:
+        """
+        Returns:
+            CrackStats: The total length and the mean and median widths of the cracks.
+        """
+        return CrackStats(self.total_length(), self.mean_width(), self.median_width())
+
+    def to_geojson(self) -> "FeatureCollection":
         """
         Generates a GeoJSON representation of the CrackVectorModel.
 
@@ -30,12 +253,10 @@ class CrackVectorModel(BaseModel):
             FeatureCollection: A collection of GeoJSON features representing the crack vector model
             using the branch-based representation (refer to `README.md` to learn more).
         """
-        n_branches = len(self.branches_length_xy)
-        branch_features = []
-        for idx in range(n_branches):
-            cur_branch_point_xy = self.branches_length_xy[idx]
-            cur_branch_width = self.branches_width[idx]
+        from geojson import Feature, FeatureCollection, LineString
 
+        branch_features = []
+        for cur_branch_point_xy, cur_branch_width in zip(self.branches_length_xy, self.branches_width):
             branch_feature = Feature(
                 geometry=LineString(cur_branch_point_xy.tolist()),
                 properties={"name": "branch", "width": cur_branch_width.tolist()},
@@ -56,13 +277,15 @@ class CrackVectorModel(BaseModel):
         Returns:
             None
         """
+        import orjson
+
         with open(str(file), "w") as f:
             geo_cvm_str = orjson.dumps(
                 self.to_geojson(), option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_INDENT_2
             ).decode("utf-8")
             f.write(geo_cvm_str)
 
-    def to_geodataframe(self) -> gpd.GeoDataFrame:
+    def to_geodataframe(self) -> "gpd.GeoDataFrame":
         """
         Converts the CrackVectorModel object to a GeoDataFrame.
 
@@ -84,24 +307,18 @@ class CrackVectorModel(BaseModel):
         Returns:
             None
         """
+        import matplotlib.pyplot as plt
+
         if not isinstance(image, np.ndarray):
             if not Path(image).exists():
                 raise FileNotFoundError(f"Not found image at the given path {image}")
 
             image = cv.imread(str(image))
 
-        lon1 = np.concatenate(
-            [branch_width_xy[:, 0, 0] for branch_width_xy in self.branches_width_xy if branch_width_xy.any()]
-        )
-        lat1 = np.concatenate(
-            [branch_width_xy[:, 0, 1] for branch_width_xy in self.branches_width_xy if branch_width_xy.any()]
-        )
-        lon2 = np.concatenate(
-            [branch_width_xy[:, 1, 0] for branch_width_xy in self.branches_width_xy if branch_width_xy.any()]
-        )
-        lat2 = np.concatenate(
-            [branch_width_xy[:, 1, 1] for branch_width_xy in self.branches_width_xy if branch_width_xy.any()]
-        )
+        lon1 = self.width_xy[:, 0, 0]
+        lat1 = self.width_xy[:, 0, 1]
+        lon2 = self.width_xy[:, 1, 0]
+        lat2 = self.width_xy[:, 1, 1]
         plot_result_of_crack_length_and_width(
             rng_image=image,
             branches_xy=self.branches_length_xy,
@@ -1,6 +1,9 @@
-import geopandas as gpd
+from typing import TYPE_CHECKING
+
 import numpy as np
-from geojson import FeatureCollection
+
+if TYPE_CHECKING:
+    from geojson import FeatureCollection
 
 
 def _idx_to_xy(indices: tuple[np.ndarray, np.ndarray]) -> np.ndarray:
@@ -17,7 +20,7 @@ def _idx_to_xy(indices: tuple[np.ndarray, np.ndarray]) -> np.ndarray:
     return xy
 
 
-def geojson_to_geodataframe(geojson_cvm: FeatureCollection, /):
+def geojson_to_geodataframe(geojson_cvm: "FeatureCollection", /):
     """
     Converts a GeoJSON FeatureCollection to a GeoDataFrame containing length and width features.
 
@@ -27,5 +30,7 @@ def geojson_to_geodataframe(geojson_cvm: FeatureCollection, /):
     Returns:
         GeoDataFrame: A GeoDataFrame with length and width features.
     """
+    import geopandas as gpd
+
     branch_gdf = gpd.GeoDataFrame.from_features(geojson_cvm).drop(columns=["name"])
     return branch_gdf
@@ -1,10 +1,24 @@
 from pymongo import MongoClient
+from contextlib import nullcontext
 from datetime import datetime
 import os
 from dotenv import load_dotenv
 class DBWriter:
     def __init__(self, interstate: str, MM_start: int,
-                 MM_end: int, year: int, mm_height: int):
+                 MM_end: int, year: int, mm_height: int, write_lock=None):
+        """Writes the data of the XML files of a year to the database. 
+        Entries are queued and written by flush, all at once.
+
+        Args:
+            interstate (str): interstate of the segment
+            MM_start (int): beginning MM of the segment
+            MM_end (int): ending MM of the segment
+            year (int): year of the data
+            mm_height (int): height of an image in millimeters
+            write_lock (optional): lock held around the writes, to limit the 
+            number of processes writing to the database at once. Defaults to
+            None (no lock).
+        """
         # set up connection to database
         load_dotenv()
         
@@ -19,19 +33,24 @@ class DBWriter:
         self.MM_start = MM_start
         self.MM_end = MM_end
         self.interstate = interstate
+        self.write_lock = nullcontext() if write_lock is None else write_lock
+        # entries not written yet
+        self.subjoint_entries = []
+        self.img_entries = []
 
-        self.year_id = self.update_segment_entry()
+        with self.write_lock:
+            self.year_id = self.update_segment_entry()
 
-        # in case there are any entries from previous runs
-        self.subjoint_collection.delete_many({'seg_year_id': self.year_id})
-        self.img_collection.delete_many({'seg_year_id': self.year_id})
+            # in case there are any entries from previous runs
+            self.subjoint_collection.delete_many({'seg_year_id': self.year_id})
+            self.img_collection.delete_many({'seg_year_id': self.year_id})
 
 
     def write_faulting_entry(self, 
                              index: int, 
                              endpoints: tuple[float], 
                              faulting_info: list[tuple[float, float]]):
-        """Writes an entry to the faulting_values collection in the database.
+        """Queues an entry of the faulting_values collection in the database.
 
         Args:
             index (int): index of the current XML file
@@ -57,7 +76,7 @@ class DBWriter:
             'x_min': min(x1, x2),
             'x_max': max(x1, x2)
         }                                       
-        self.subjoint_collection.insert_one(entry)
+        self.subjoint_entries.append(entry)
 
 
     def update_segment_entry(self):
@@ -104,7 +123,7 @@ class DBWriter:
     
 
     def write_image_entry(self, index: str, date: datetime):
-        """Writes an entry to the image_data collection in the database.
+        """Queues an entry of the image_data collection in the database.
 
         Args:
             index (int): index of the current XML file
@@ -114,4 +133,18 @@ class DBWriter:
             'img_id': int(index),
             'date': date
         }
-        self.img_collection.insert_one(entry)
\ No newline at end of file
+        self.img_entries.append(entry)
+
+
+    def flush(self):
+        """Writes the queued entries to the database.
+        """
+        if not self.subjoint_entries and not self.img_entries:
+            return
+        with self.write_lock:
+            if self.img_entries:
+                self.img_collection.insert_many(self.img_entries)
+            if self.subjoint_entries:
+                self.subjoint_collection.insert_many(self.subjoint_entries)
+        self.subjoint_entries = []
+        self.img_entries = []
@@ -9,7 +9,7 @@ from datetime import datetime
 class XML_CVAT_Parser:
     def __init__(self, data_dir, px_height, px_width, 
                  mm_height, mm_width, mode, task_size,
-                 begin_MM, end_MM, year, interstate):
+                 begin_MM, end_MM, year, interstate, write_lock=None):
         self.data_dir = os.path.join(data_dir, str(year))
         self.xml_dir = os.path.join(self.data_dir, "XML")
         self.xml_files = os.listdir(self.xml_dir)
@@ -28,7 +28,7 @@ class XML_CVAT_Parser:
         interstate = interstate.replace('-', '')
         
         self.db_writer = DBWriter(interstate, begin_MM, end_MM, 
-                                  year, mm_height)   
+                                  year, mm_height, write_lock)   
         self.parse()
             
     
@@ -114,6 +114,8 @@ class XML_CVAT_Parser:
                                             points=f'{x},{self.px_height};{x},0',
                                             z_order='0')
                 ################################################################
+            # the entries of each XML file are written at once
+            self.db_writer.flush()
             self.id += 1
 
         self.create_task_zip(annotations, task_dir)
@@ -1,10 +1,19 @@
 from pymongo import MongoClient, UpdateOne
 import pymongo
 import os
+from contextlib import nullcontext
 from dotenv import load_dotenv
 
 class SlabInventory():
-    def __init__(self):
+    def __init__(self, write_lock=None):
+        """Slab inventory of the database
+
+        Args:
+            write_lock (optional): lock held around the slab writes of the 
+            crop (write_slab_entry, add_crack_stats and 
+            delete_segment_year_slabs), to limit the number of processes 
+            writing to the database at once. Defaults to None (no lock).
+        """
         load_dotenv()
         CONNECTION_STRING = os.getenv('SLAB_DB_CONN')
 
@@ -15,23 +24,40 @@ class SlabInventory():
             exit(1)
         self.db = self.client['jpcp_deterioration']
         self.registration_collection = self.db['registration']
+        # registration data, one document per BY slab of a registration
+        self.registration_slab_collection = self.db['registration_slabs']
         self.raw_subjoint_collection = self.db['raw_subjoint_data']
         self.slab_collection = self.db['slabs']
         self.requests = []
+        self.write_lock = nullcontext() if write_lock is None else write_lock
 
 
-    def all_registration_data(self, filter = {}):
+    def all_registration_data(self, filter = {}, projection = None):
         """Gets all the slab registaration metadata, such as interstate, 
         direction, mileposts, and years registered for the slab id
 
         Args: filter (dict, optional): filter to apply to the query. 
         Default is an empty dictionary.
+        projection (list[str], optional): fields to fetch. Default is None
+        (all fields, including the registration data itself).
 
         Returns:
             pymongo.cursor.Cursor: A cursor object that can be used to iterate
             over each registration done
         """
-        return self.registration_collection.find(filter)
+        return self.registration_collection.find(filter, projection)
+
+
+    def fetch_registration(self, reg_id):
+        """Fetches a single registration, including its registration data
+
+        Args:
+            reg_id (ObjectId): id of the registration
+
+        Returns:
+            dict: the registration
+        """
+        return self.registration_collection.find_one({"_id": reg_id})
 
 
     def execute_requests(self):
@@ -45,7 +71,9 @@ class SlabInventory():
 
     def add_slab_update_request(self, year, slab_index, update_data, seg_str):
         """Adds an update request to the requests list to update a certain 
-        slab
+        slab. The updated_at field of the slab is set to the time of the 
+        update, so exports can re-read only the slabs modified since (see 
+        fetch_slabs).
 
         Args:
             year (int): year of the slab to update
@@ -57,11 +85,30 @@ class SlabInventory():
         self.requests.append(
             UpdateOne(
                 {"slab_index": slab_index, "seg_year_id": seg_yr_id},
-                {"$set": update_data}
+                {"$set": update_data, "$currentDate": {"updated_at": True}}
                 )
             )
 
 
+    def write_slab_updates(self, updates):
+        """Updates multiple slabs in a single ordered bulk write. Like 
+        add_slab_update_request, sets the updated_at field of the slabs.
+
+        Args:
+            updates (dict): data to update each slab with, by 
+            (seg_year_id, slab_index)
+        """
+        if updates:
+            self.slab_collection.bulk_write(
+                [UpdateOne({"slab_index": slab_index, 
+                            "seg_year_id": seg_yr_id},
+                           {"$set": update_data, 
+                            "$currentDate": {"updated_at": True}})
+                 for (seg_yr_id, slab_index), update_data in updates.items()],
+                ordered=True
+                )
+
+
     def upsert_slab_entry(self, year, slab_index, update_data, seg_str):
         """Updates or inserts a slab entry in the database
 
@@ -95,6 +142,36 @@ class SlabInventory():
             )
 
 
+    def fetch_slabs(self, year, slab_indices, seg_str, projection=None,
+                    updated_since=None):
+        """Fetches multiple slabs of a year from the database in a single 
+        query
+
+        Args:
+            year (int): year of the slabs to fetch
+            slab_indices (list[int]): slab indices of the slabs to fetch. If 
+            None, all the slabs of the year are fetched
+            seg_str (str): segment string
+            projection (list[str], optional): fields to fetch. Defaults to 
+            None (all fields).
+            updated_since (datetime, optional): only fetch the slabs updated 
+            at or after that time. Defaults to None (all slabs).
+
+        Returns:
+            dict[int, dict]: slab data of the slabs fetched, by slab index
+        """
+        seg_yr_id = f"{seg_str}_{year}"
+        query = {"seg_year_id": seg_yr_id}
+        if slab_indices is not None:
+            query["slab_index"] = {"$in": list(slab_indices)}
+        if updated_since is not None:
+            query["updated_at"] = {"$gte": updated_since}
+        if projection is not None:
+            projection = list(projection) + ["slab_index"]
+        return {slab['slab_index']: slab 
+                for slab in self.slab_collection.find(query, projection)}
+
+
     def fetch_seg_ids(self):
         """Fetches all the segment ids in the database
 
@@ -164,21 +241,101 @@ class SlabInventory():
 
     def update_registration_data(self, registration_data: list[dict], 
                                  seg_str: str, base_year: int, 
-                                 years: list[int]):
-        """Updates the registration data in the registration collection
+                                 years: list[int], 
+                                 majority_slabs: list[dict]=None):
+        """Updates the registration data of a registration. The data is 
+        stored in the registration_slabs collection, one document per BY slab
+        indexed by registration and base_id, so it is not limited by the
+        maximum document size and can be read a window of BY slabs at a time
+        (see fetch_registration_slabs). The registration entry records the 
+        layout and the range of base_ids.
 
         Args:
-            registration_data (list[dict]): The registration data to update
+            registration_data (list[dict]): The registration data to update,
+            ordered by base_id
             seg_str (str): The segment id to update the registration data for
             base_year (int): The base year to update the registration data for
             years (list[int]): The years to update the registration data for
+            majority_slabs (list[dict], optional): slab index of the CY slab 
+            with the most overlap with each BY slab, by year (as a string), 
+            stored as the majority field of the BY slabs. Defaults to None.
         """
-        self.registration_collection.update_one(
+        reg_id = self.registration_collection.find_one(
             {'segment_id': seg_str,
              'base_year': base_year,
              'years': years},
-            {'$set': {'registration_data': registration_data}}
+            ['_id']
+        )['_id']
+        self.registration_slab_collection.create_index(
+            [('registration_id', pymongo.ASCENDING), 
+             ('base_id', pymongo.ASCENDING)],
+            unique=True
         )
+        self.registration_slab_collection.delete_many(
+            {'registration_id': reg_id})
+        if registration_data:
+            documents = [{'registration_id': reg_id, **entry} 
+                         for entry in registration_data]
+            if majority_slabs is not None:
+                for document, majority in zip(documents, majority_slabs):
+                    document['majority'] = majority
+            self.registration_slab_collection.insert_many(documents)
+        self.registration_collection.update_one(
+            {'_id': reg_id},
+            {'$set': {
+                'registration_data': [],
+                'layout': 'slabs',
+                'num_slabs': len(registration_data),
+                'first_base_id': (registration_data[0]['base_id'] 
+                                  if registration_data else None),
+                'last_base_id': (registration_data[-1]['base_id'] 
+                                 if registration_data else None)
+            }}
+        )
+
+
+    def fetch_registration_slabs(self, reg_id, first_base_id: int, 
+                                 last_base_id: int) -> list[dict]:
+        """Fetches the registration data of a window of BY slabs of a 
+        registration stored one document per BY slab
+
+        Args:
+            reg_id (ObjectId): id of the registration
+            first_base_id (int): first base_id of the window
+            last_base_id (int): last base_id of the window (included)
+
+        Returns:
+            list[dict]: the registration data of the BY slabs in the window,
+            ordered by base_id
+        """
+        return list(self.registration_slab_collection.find(
+            {'registration_id': reg_id,
+             'base_id': {'$gte': first_base_id, '$lte': last_base_id}},
+            {'_id': 0, 'registration_id': 0}
+        ).sort('base_id', pymongo.ASCENDING))
+
+
+    def update_registration_export(self, reg_id, export: dict):
+        """Records the last export of the spreadsheet of a registration
+
+        Args:
+            reg_id (ObjectId): id of the registration
+            export (dict): time of the export (exported_at), settings and file
+            names of the spreadsheet
+        """
+        self.registration_collection.update_one(
+            {'_id': reg_id}, {'$set': {'export': export}}
+        )
+
+
+    def server_time(self):
+        """Gets the current time of the database server, the clock the 
+        updated_at field of the slabs is set with
+
+        Returns:
+            datetime: the current time of the server, in UTC
+        """
+        return self.client.admin.command('hello')['localTime']
     
 
     def create_registration_entry(self, seg_str: str, base_year: int, 
@@ -189,19 +346,25 @@ class SlabInventory():
             seg_str (str): the segment string 
             base_year (int): the base year
             years (list[int]): list of years to be registered
+
+        Returns:
+            ObjectId: id of the new entry
         """
-        self.registration_collection.delete_one({
+        old_entry = self.registration_collection.find_one_and_delete({
             'segment_id': seg_str,
             'base_year': base_year,
             'years': years
-        })
+        }, ['_id'])
+        if old_entry is not None:
+            self.registration_slab_collection.delete_many(
+                {'registration_id': old_entry['_id']})
         entry = {
             'segment_id': seg_str,
             'base_year': base_year,
             'years': years,
             'registration_data': []
         }
-        self.registration_collection.insert_one(entry)
+        return self.registration_collection.insert_one(entry).inserted_id
     
 
     def add_crack_stats(self, slab_index, crack_length, avg_crack_width, median_crack_width,
@@ -217,11 +380,12 @@ class SlabInventory():
             year (int): year of the slab
         """
         seg_year_id = f'{seg_str}_{year}'
-        self.slab_collection.update_one(
-            {'seg_year_id': seg_year_id, 'slab_index': slab_index},
-            {'$set': {'total_crack_length': crack_length, 'avg_crack_width': avg_crack_width,
-                      'median_crack_width': median_crack_width}}
-        )
+        with self.write_lock:
+            self.slab_collection.update_one(
+                {'seg_year_id': seg_year_id, 'slab_index': slab_index},
+                {'$set': {'total_crack_length': crack_length, 'avg_crack_width': avg_crack_width,
+                          'median_crack_width': median_crack_width}}
+            )
 
 
     def delete_segment_year_slabs(self, seg_str: str, year: int):
@@ -232,7 +396,8 @@ class SlabInventory():
             year (int): The year to delete the slabs for
         """
         seg_year_id = f'{seg_str}_{year}'
-        self.slab_collection.delete_many({'seg_year_id': seg_year_id})
+        with self.write_lock:
+            self.slab_collection.delete_many({'seg_year_id': seg_year_id})
 
 
     def find_subjoints_in_range(self, y_min: float, y_max: float, seg_str: str,
@@ -316,7 +481,9 @@ class SlabInventory():
             'z4_median': z4_median,
             'z5_median': z5_median,
         }
-        self.slab_collection.update_one(query, {'$set': entry}, upsert=True)
+        with self.write_lock:
+            self.slab_collection.update_one(query, {'$set': entry}, 
+                                            upsert=True)
         #self.slab_collection.insert_one(entry)
 
 
@@ -0,0 +1,127 @@
+from PyQt5.QtCore import QObject, pyqtSignal
+import threading
+
+
+class SlabUpdateWriter(QObject):
+    write_failed = pyqtSignal(str)
+    write_recovered = pyqtSignal()
+
+    def __init__(self, slab_inventory, interval: float=2.0):
+        """Writes slab updates to the database on a background thread, so a
+        slow database does not block the GUI. Updates to the same slab are
+        coalesced until they are written, with later values of a field
+        replacing earlier ones. Updates are written in batches, one batch at a
+        time and in order, so the updates of a slab are applied in the order
+        they were made. A batch that fails to be written is retried with the
+        next one.
+
+        Args:
+            slab_inventory (SlabInventory): database containing all the slab
+            data
+            interval (float, optional): seconds between writes. Defaults to
+            2.0.
+        """
+        super().__init__()
+        self._slab_inventory = slab_inventory
+        self._interval = interval
+        # (seg_year_id, slab_index) -> fields to set, in order of first update
+        self._pending = {}
+        self._failing = False
+        self._flush_requested = False
+        self._stopping = False
+        self._condition = threading.Condition()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+
+    def add_update(self, year, slab_index, update_data, seg_str):
+        """Queues an update of a slab.
+
+        Args:
+            year (int): year of the slab to update
+            slab_index (int): slab index of the slab to update
+            update_data (dict): data to update the slab with
+            seg_str (str): segment string in the format "Ixx_MMxx_MMxx"
+        """
+        key = (f"{seg_str}_{year}", slab_index)
+        with self._condition:
+            self._pending.setdefault(key, {}).update(update_data)
+
+
+    def pending_count(self) -> int:
+        """Gets the number of slabs with updates not written yet.
+
+        Returns:
+            int: number of slabs
+        """
+        with self._condition:
+            return len(self._pending)
+
+
+    def flush(self):
+        """Requests the queued updates to be written now, without waiting for
+        the write.
+        """
+        with self._condition:
+            self._flush_requested = True
+            self._condition.notify()
+
+
+    def stop(self, timeout: float=30.0):
+        """Writes the queued updates and stops the background thread. Blocks
+        until the updates are written or the timeout expires.
+
+        Args:
+            timeout (float, optional): maximum number of seconds to wait.
+            Defaults to 30.0.
+        """
+        with self._condition:
+            self._stopping = True
+            self._condition.notify()
+        self._thread.join(timeout)
+        if self._pending:
+            print(f'Could not save the changes of {len(self._pending)} '
+                  'slab(s) to the database')
+
+
+    def _run(self):
+        while True:
+            with self._condition:
+                if not self._stopping and not self._flush_requested:
+                    self._condition.wait(self._interval)
+                self._flush_requested = False
+                stopping = self._stopping
+                batch = self._pending
+                self._pending = {}
+            if batch:
+                self._write(batch)
+            if stopping:
+                # one last attempt for updates queued during the write
+                with self._condition:
+                    batch = self._pending
+                    self._pending = {}
+                if batch:
+                    self._write(batch)
+                return
+
+
+    def _write(self, batch):
+        """Writes a batch of updates. If the write fails, the batch is put
+        back in front of the updates queued since, so it is retried with them.
+
+        Args:
+            batch (dict): fields to set, by (seg_year_id, slab_index)
+        """
+        try:
+            self._slab_inventory.write_slab_updates(batch)
+        except Exception as e:
+            with self._condition:
+                for key, update_data in self._pending.items():
+                    batch.setdefault(key, {}).update(update_data)
+                self._pending = batch
+            self._failing = True
+            self.write_failed.emit(str(e))
+            return
+        if self._failing:
+            self._failing = False
+            self.write_recovered.emit()
@@ -1,7 +1,13 @@
+import hashlib
+import json
 import os
 import shutil
 
+import numpy as np
+
 from file_manager.files import FileManager
+from file_manager.framestore import FrameStore, build_frame_store
+from file_manager.slab_images import PYRAMID_LEVELS, pyramid_directory
 import xml.etree.ElementTree as ET
 from enum import Enum
 
@@ -18,7 +24,11 @@ class CropFileManager(FileManager):
         self.input_im_path = None
         self.output_im_path = None
         self.input_im_files = None
+        # frames of the current image mode packed in a single array, if the
+        # frame store was built and is up to date
+        self.frame_store = None
         self.annotation_file = None
+        self.annotation_hash = None
 
         self.data_path = os.path.join(main_path, str(year))
         if not os.path.exists(self.data_path):
@@ -26,20 +36,29 @@ class CropFileManager(FileManager):
         self.annotation_path = os.path.join(self.data_path, "CVAT_output")
         if not os.path.exists(self.annotation_path):
             raise ValueError("CVAT annotation folder could not be found.")
+        # merged annotations and parsed subjoints, reused while unchanged
+        self.cache_path = os.path.join(self.annotation_path, "cache")
+        self.manifest_path = os.path.join(self.cache_path, "manifest.json")
+        self.subjoints_path = os.path.join(self.cache_path, "subjoints.npz")
+        self.joint_plan_path = os.path.join(self.cache_path, "joint_plan.npz")
         self.slab_path = os.path.join(self.data_path, "Slabs")
         if not os.path.exists(self.slab_path):
             os.mkdir(self.slab_path)  
         self.csv_path = os.path.join(self.data_path, "slabs.csv")  # Slab file
         self.debug_path = os.path.join(self.data_path, "debug.csv")  # Debug file
+        # progress of the crop run, kept with the slabs it describes
+        self.checkpoint_path = os.path.join(self.slab_path, "checkpoint.json")
     
         self.join_annotations()
-        self.clean_slab_folder()  # Cleaning folders; comment as necessary
     
 
     def join_annotations(self):
-        """Joins all the XML annotation files into a single XML file. Deletes
-        the individual XML files after joining them. The joined file is saved to
-        the same folder
+        """Joins all the XML annotation files into a single XML file saved to
+        the cache folder of the annotation folder. The individual XML files are
+        kept. The files are merged by streaming through them one element at a
+        time, and the subjoints are extracted in the same pass and saved in a
+        binary form (see load_subjoints). If the annotation files did not
+        change since the last merge, the cached merge is reused.
 
         Raises:
             ValueError: If there are no XML annotation files in the annotation
@@ -48,39 +67,190 @@ class CropFileManager(FileManager):
         xml_files = self.filter_files(self.annotation_path, "xml")
         if not xml_files:
             raise ValueError("No XML files found in annotation path.")
-        
-        file_path = os.path.join(self.annotation_path, xml_files[0])
-        base_tree = ET.parse(file_path)
-        base_root = base_tree.getroot()
-        os.remove(file_path)
-        for i in range(1, len(xml_files)):
-            file_path = os.path.join(self.annotation_path, xml_files[i])
-            curr_root = ET.parse(file_path).getroot()
-            base_root.extend(curr_root)
-            os.remove(file_path)
-
-        self.annotation_file = os.path.join(
-            self.annotation_path, "annotations.xml"
-            )
-        base_tree.write(self.annotation_file)
-            
-
-    def clean_slab_folder(self):
-        # Removing previous slab images; comment as necessary
-        try:
-            shutil.rmtree(self.slab_path)
-        except:
-            pass
-
-        os.mkdir(self.slab_path)
+        os.makedirs(self.cache_path, exist_ok=True)
+        self.annotation_file = os.path.join(self.cache_path, "annotations.xml")
 
-    
-    def switch_image_mode(self, image_mode: str):
+        manifest = {}
+        if os.path.exists(self.manifest_path):
+            with open(self.manifest_path) as f:
+                manifest = json.load(f)
+        files = self.fingerprint_annotations(xml_files, 
+                                             manifest.get('files', {}))
+        hasher = hashlib.sha1()
+        for file in xml_files:
+            hasher.update(file.encode())
+            hasher.update(files[file]['sha1'].encode())
+        self.annotation_hash = hasher.hexdigest()
+
+        if (manifest.get('annotation_hash') == self.annotation_hash
+            and os.path.exists(self.annotation_file)
+            and os.path.exists(self.subjoints_path)):
+            return
+        self.merge_annotations(xml_files)
+        tmp_path = self.manifest_path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump({'annotation_hash': self.annotation_hash, 
+                       'files': files}, f)
+        os.replace(tmp_path, self.manifest_path)
+
+
+    def fingerprint_annotations(self, xml_files: list[str], 
+                                cached: dict) -> dict:
+        """Computes the fingerprint (size, modification time and SHA-1 hash) 
+        of each annotation file. Files whose size and modification time match
+        the cached fingerprint are not read again.
+
+        Args:
+            xml_files (list[str]): names of the annotation files
+            cached (dict): fingerprints recorded by the last merge, by file name
+
+        Returns:
+            dict: fingerprint of each annotation file, by file name
+        """
+        files = {}
+        for file in xml_files:
+            stat = os.stat(os.path.join(self.annotation_path, file))
+            entry = cached.get(file)
+            if (entry is not None and entry['size'] == stat.st_size
+                and entry['mtime_ns'] == stat.st_mtime_ns):
+                files[file] = entry
+                continue
+            hasher = hashlib.sha1()
+            with open(os.path.join(self.annotation_path, file), 'rb') as f:
+                for chunk in iter(lambda: f.read(1 << 20), b''):
+                    hasher.update(chunk)
+            files[file] = {'size': stat.st_size, 
+                           'mtime_ns': stat.st_mtime_ns,
+                           'sha1': hasher.hexdigest()}
+        return files
+
+
+    def merge_annotations(self, xml_files: list[str]):
+        """Streams through the annotation files in order, appending the 
+        children of each root element to the merged XML file, and saves the
+        first two points of every subjoint polyline along with the index of
+        its image (in merged order).
+
+        Args:
+            xml_files (list[str]): names of the annotation files
+        """
+        image_ids = []
+        points = []
+        num_images = 0
+        tmp_path = self.annotation_file + '.tmp'
+        with open(tmp_path, 'wb') as out:
+            out.write(b'<?xml version="1.0" encoding="utf-8"?>\n')
+            out.write(b'<annotations>')
+            for file in xml_files:
+                depth = 0
+                root = None
+                for event, elem in ET.iterparse(
+                    os.path.join(self.annotation_path, file), 
+                    events=('start', 'end')):
+                    if event == 'start':
+                        if depth == 0:
+                            root = elem
+                        depth += 1
+                        continue
+                    depth -= 1
+                    if depth != 1:
+                        continue
+                    if elem.tag == 'image':
+                        for polyline in elem.iter('polyline'):
+                            if polyline.get('label') != 'subjoint':
+                                continue
+                            coords = polyline.get('points', '').replace(
+                                ',', ';').split(';')
+                            if len(coords) < 4:
+                                continue
+                            image_ids.append(num_images)
+                            points.append([float(c) for c in coords[:4]])
+                        num_images += 1
+                    out.write(ET.tostring(elem))
+                    root.clear()
+            out.write(b'</annotations>\n')
+        os.replace(tmp_path, self.annotation_file)
+
+        tmp_path = self.subjoints_path + '.tmp.npz'
+        np.savez(tmp_path, 
+                 num_images=np.int64(num_images),
+                 image_ids=np.array(image_ids, dtype=np.int64),
+                 points=np.array(points, dtype=np.float64).reshape(-1, 4))
+        os.replace(tmp_path, self.subjoints_path)
+
+
+    def load_subjoints(self) -> tuple[int, np.ndarray, np.ndarray]:
+        """Loads the subjoints extracted from the merged annotations.
+
+        Returns:
+            tuple[int, np.ndarray, np.ndarray]: the number of images, the 
+            index of the image of each subjoint (in ascending order) and the
+            (x1, y1, x2, y2) points of each subjoint in absolute pixels of its
+            image
+        """
+        with np.load(self.subjoints_path) as data:
+            return (int(data['num_images']), data['image_ids'], 
+                    data['points'])
+
+
+    def load_joint_plan(self, key: str) -> tuple[np.ndarray, np.ndarray]:
+        """Loads the cached joint plan of the segment-year.
+
+        Args:
+            key (str): key identifying the annotations and the parameters the
+            plan was built with
+
+        Returns:
+            tuple[np.ndarray, np.ndarray]: the (x1, y1, x2, y2) points of all
+            the subjoints in relative pixels, ordered by joint, and the offset
+            of the first subjoint of each joint (with the total number of 
+            subjoints last), or None if there is no plan for the key
+        """
+        if not os.path.exists(self.joint_plan_path):
+            return None
+        with np.load(self.joint_plan_path) as data:
+            if str(data['key']) != key:
+                return None
+            return data['points'], data['joint_offsets']
+
+
+    def save_joint_plan(self, key: str, points: np.ndarray, 
+                        joint_offsets: np.ndarray):
+        """Saves the joint plan of the segment-year to the cache folder.
+
+        Args:
+            key (str): key identifying the annotations and the parameters the
+            plan was built with
+            points (np.ndarray): the (x1, y1, x2, y2) points of all the 
+            subjoints in relative pixels, ordered by joint
+            joint_offsets (np.ndarray): the offset of the first subjoint of 
+            each joint, with the total number of subjoints last
+        """
+        tmp_path = self.joint_plan_path + '.tmp.npz'
+        np.savez(tmp_path, key=np.array(key), points=points, 
+                 joint_offsets=np.asarray(joint_offsets, dtype=np.int64))
+        os.replace(tmp_path, self.joint_plan_path)
+
+
+    def clean_output_folder(self):
+        """Removes the previous slab images of the current image mode, along
+        with their pyramid thumbnails.
+        """
+        shutil.rmtree(self.output_im_path, ignore_errors=True)
+        for level in PYRAMID_LEVELS:
+            shutil.rmtree(pyramid_directory(self.output_im_path, level), 
+                          ignore_errors=True)
+        os.makedirs(self.output_im_path, exist_ok=True)
+
+
+    def switch_image_mode(self, image_mode: str, clean: bool=False):
         """Sets the input and output paths for the slabs based on the image
         mode. Also fetches the list of image files to be processed.
 
         Args:
             image_mode (str): The image mode to be used for the slabs
+            clean (bool, optional): if True, removes the previous slab images
+            of the image mode. Defaults to False.
         Raises:
             ValueError: If the input image path does not exist
             ValueError: If the annotation path does not exist
@@ -104,9 +274,35 @@ class CropFileManager(FileManager):
         self.output_im_path = os.path.join(self.slab_path, 
                                            ('output_' 
                                             + self.image_mode.name.lower()))
-        os.mkdir(self.output_im_path)
+        os.makedirs(self.output_im_path, exist_ok=True)
+        if clean:
+            self.clean_output_folder()
         
-        self.input_im_files = self.filter_files(self.input_im_path, file_type)
+        # the index of an up to date frame store lists the same files, which
+        # saves listing a folder of thousands of frames
+        self.frame_store = FrameStore.open(self.input_im_path)
+        if (self.frame_store is not None 
+            and self.frame_store.is_current(self.input_im_path)):
+            self.input_im_files = self.frame_store.files
+        else:
+            self.frame_store = None
+            self.input_im_files = self.filter_files(self.input_im_path, 
+                                                    file_type)
+
+
+    def build_frame_store(self, frame_size: tuple[int, int]):
+        """Packs the frames of the current image mode into its frame store
+        (see file_manager.framestore), unless the store is up to date.
+
+        Args:
+            frame_size (tuple[int, int]): (width, height) of the frames
+        """
+        if (self.frame_store is not None 
+            and self.frame_store.frame_shape == (frame_size[1], 
+                                                 frame_size[0])):
+            return
+        self.frame_store = build_frame_store(self.input_im_path, frame_size)
+        self.input_im_files = self.frame_store.files
 
         
         
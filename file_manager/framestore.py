@@ -0,0 +1,336 @@
+import argparse
+import json
+import os
+import threading
+
+import cv2
+import numpy as np
+from tqdm import tqdm
+
+from file_manager.files import FileManager
+
+# frame stores of <year>/Range are written to <year>/FrameStore/Range.npy,
+# with their index in <year>/FrameStore/Range.json
+STORE_DIRECTORY = 'FrameStore'
+# version 2 stores the frames in reversed order (see FrameBuffer)
+STORE_VERSION = 2
+# file type of the frames of each image folder
+FRAME_FILE_TYPES = {'Range': 'jpg', 'Intensity': 'jpg', 'Segmentation': 'png'}
+
+# opened stores, by index path, with the modification time of their index
+_open_stores = {}
+_open_lock = threading.Lock()
+
+
+def frame_store_paths(img_dir: str) -> tuple[str, str]:
+    """Gets the paths of the frame array and of the index of the frame store
+    of a raw image directory.
+
+    Args:
+        img_dir (str): raw image directory of the year (Range, Intensity or
+        Segmentation)
+
+    Returns:
+        tuple[str, str]: path of the frame array and path of the index
+    """
+    img_dir = os.path.normpath(img_dir)
+    store_dir = os.path.join(os.path.dirname(img_dir), STORE_DIRECTORY)
+    name = os.path.basename(img_dir)
+    return (os.path.join(store_dir, f'{name}.npy'),
+            os.path.join(store_dir, f'{name}.json'))
+
+
+class FrameBuffer:
+    def __init__(self, frames: np.ndarray):
+        """Frames of a segment in a single contiguous array, in reversed order
+        (the last frame of the segment first). The frames of a slab are 
+        stacked topmost (last) frame first, so with that order the mosaic of
+        any range of frames is a view of the buffer instead of a copy.
+
+        Args:
+            frames (np.ndarray): (frames, height, width) or (frames, height,
+            width, channels) contiguous array, in reversed order
+        """
+        self.frames = frames
+
+
+    def __len__(self) -> int:
+        return len(self.frames)
+
+
+    @property
+    def frame_shape(self) -> tuple[int, int]:
+        return self.frames.shape[1:3]
+
+
+    @classmethod
+    def decode(cls, paths: list[str], frame_size: tuple[int, int]=None,
+               flag: int=cv2.IMREAD_COLOR):
+        """Decodes frame files into a new buffer. Each frame is decoded
+        directly into its place in the buffer.
+
+        Args:
+            paths (list[str]): paths of the frames, in segment order
+            frame_size (tuple[int, int], optional): (width, height) the
+            frames are resized to. Defaults to None (size of the first frame).
+            flag (int, optional): cv2.imread flag the frames are decoded with.
+            Defaults to cv2.IMREAD_COLOR.
+
+        Raises:
+            ValueError: if a frame could not be read
+
+        Returns:
+            FrameBuffer: the buffer of the frames
+        """
+        frames = None
+        for i, path in enumerate(reversed(paths)):
+            img = cv2.imread(path, flag)
+            if img is None:
+                raise ValueError(f'Could not read frame {path}.')
+            if frames is None:
+                if frame_size is None:
+                    frame_size = (img.shape[1], img.shape[0])
+                frames = np.empty((len(paths), frame_size[1], frame_size[0])
+                                  + img.shape[2:], dtype=img.dtype)
+            if img.shape[:2] != (frame_size[1], frame_size[0]):
+                img = cv2.resize(img, frame_size)
+            frames[i] = img
+        return cls(frames)
+
+
+    def frame(self, index: int) -> np.ndarray:
+        """Gets a frame by its index in the segment.
+
+        Args:
+            index (int): index of the frame in the segment
+
+        Returns:
+            np.ndarray: view of the frame
+        """
+        return self.frames[len(self.frames) - 1 - index]
+
+
+    def mosaic(self, bottom_index: int, top_index: int) -> np.ndarray:
+        """Gets the frames in a range stacked vertically, topmost frame
+        first, as a view of the buffer.
+
+        Args:
+            bottom_index (int): index of the bottommost frame in the segment
+            top_index (int): index of the topmost frame in the segment
+
+        Raises:
+            ValueError: if the range is empty or not in the buffer
+
+        Returns:
+            np.ndarray: the (frames * height, width) mosaic, with the channels
+            of the frames if they have any
+        """
+        num_frames = len(self.frames)
+        if not 0 <= bottom_index <= top_index < num_frames:
+            raise ValueError(f'Invalid frame range {bottom_index} to '
+                             f'{top_index} of {num_frames} frames.')
+        frames = self.frames[num_frames - 1 - top_index:
+                             num_frames - bottom_index]
+        return frames.reshape((-1,) + frames.shape[2:])
+
+
+class FrameStore(FrameBuffer):
+    def __init__(self, frames: np.ndarray, files: list[str],
+                 ids: np.ndarray, source_mtime_ns: int):
+        """Raw frames of a segment-year packed in a single memory-mapped
+        array, so a range of frames is read by slicing the array instead of
+        decoding image files. Frames are stored in grayscale and all have the
+        same size. Like every frame buffer, the array holds the frames in the
+        reverse order of their file names.
+
+        Args:
+            frames (np.ndarray): (frames, height, width) uint8 frames, in
+            reversed order
+            files (list[str]): file name of each frame, in segment order
+            ids (np.ndarray): id of each frame, taken from its file name (-1
+            if the file name has no id), in segment order
+            source_mtime_ns (int): modification time of the image directory
+            when the frames were packed
+        """
+        super().__init__(frames)
+        self.files = files
+        self.ids = ids
+        self.source_mtime_ns = source_mtime_ns
+        # frames are found by id only if the files are in increasing order of
+        # id, which is not the case if some file names have no id (-1)
+        self.ids_increasing = bool(np.all(ids >= 0)
+                                   and np.all(np.diff(ids) > 0))
+
+
+    @classmethod
+    def open(cls, img_dir: str):
+        """Opens the frame store of a raw image directory. Stores are opened
+        once and shared, until their index is rewritten.
+
+        Args:
+            img_dir (str): raw image directory of the year
+
+        Returns:
+            FrameStore: the frame store, or None if the directory has no frame
+            store
+        """
+        array_path, index_path = frame_store_paths(img_dir)
+        try:
+            index_mtime = os.stat(index_path).st_mtime_ns
+        except FileNotFoundError:
+            return None
+        with _open_lock:
+            cached = _open_stores.get(index_path)
+            if cached is not None and cached[0] == index_mtime:
+                return cached[1]
+            with open(index_path) as f:
+                index = json.load(f)
+            if index.get('version') != STORE_VERSION:
+                return None
+            store = cls(np.load(array_path, mmap_mode='r'), index['files'],
+                        np.array(index['ids'], dtype=np.int64),
+                        index['source_mtime_ns'])
+            _open_stores[index_path] = (index_mtime, store)
+            return store
+
+
+    def is_current(self, img_dir: str) -> bool:
+        """Checks if the frames of the image directory were not added,
+        removed or renamed since they were packed. A frame overwritten in
+        place is not detected, the store needs to be built again after that.
+
+        Args:
+            img_dir (str): raw image directory the store was built from
+
+        Returns:
+            bool: True if the store is up to date
+        """
+        return os.stat(img_dir).st_mtime_ns == self.source_mtime_ns
+
+
+    def mosaic_by_id(self, id1: int, id2: int) -> np.ndarray:
+        """Gets the frames with ids id1 to id2 stacked vertically, topmost
+        (id2) frame first.
+
+        Args:
+            id1 (int): id of the bottommost frame
+            id2 (int): id of the topmost frame
+
+        Returns:
+            np.ndarray: view of the mosaic, or None if some of the frames are
+            not in the store or the frames of the store cannot be found by id
+        """
+        if not self.ids_increasing or id1 > id2:
+            return None
+        bottom_index, top_index = np.searchsorted(self.ids, (id1, id2))
+        # with increasing ids, the range holds every id from id1 to id2 only
+        # if both ends are found and it has one frame per id
+        if (top_index >= len(self.ids) or self.ids[bottom_index] != id1
+            or self.ids[top_index] != id2
+            or top_index - bottom_index != id2 - id1):
+            return None
+        return self.mosaic(bottom_index, top_index)
+
+
+def build_frame_store(img_dir: str,
+                      frame_size: tuple[int, int]=None) -> FrameStore:
+    """Packs the frames of a raw image directory into its frame store. Frames
+    are decoded the way the crop reads them (in color, resized to the frame
+    size, then converted to grayscale), so cropping from the store gives the
+    same slab images.
+
+    Args:
+        img_dir (str): raw image directory of the year (Range, Intensity or
+        Segmentation)
+        frame_size (tuple[int, int], optional): (width, height) the frames
+        are resized to. Defaults to None (size of the first frame).
+
+    Raises:
+        ValueError: if the directory has no frames
+
+    Returns:
+        FrameStore: the new frame store
+    """
+    img_dir = os.path.normpath(img_dir)
+    file_manager = FileManager(img_dir)
+    file_type = FRAME_FILE_TYPES.get(os.path.basename(img_dir), 'jpg')
+    # recorded before listing, so frames added during the build are detected
+    source_mtime_ns = os.stat(img_dir).st_mtime_ns
+    files = file_manager.filter_files(img_dir, file_type)
+    if not files:
+        raise ValueError(f'No {file_type} frames found in {img_dir}.')
+    if frame_size is None:
+        height, width = cv2.imread(os.path.join(img_dir, files[0])).shape[:2]
+        frame_size = (width, height)
+
+    array_path, index_path = frame_store_paths(img_dir)
+    # the previous store is not used anymore once it is replaced
+    with _open_lock:
+        _open_stores.pop(index_path, None)
+    os.makedirs(os.path.dirname(array_path), exist_ok=True)
+    tmp_path = array_path + '.tmp'
+    frames = np.lib.format.open_memmap(
+        tmp_path, mode='w+', dtype=np.uint8,
+        shape=(len(files), frame_size[1], frame_size[0])
+        )
+    for i, file in enumerate(tqdm(files, desc=f'Packing {img_dir}')):
+        img = cv2.imread(os.path.join(img_dir, file))
+        if img is None:
+            raise ValueError(f'Could not read frame {file}.')
+        if img.shape[:2] != (frame_size[1], frame_size[0]):
+            img = cv2.resize(img, frame_size)
+        frames[len(files) - 1 - i] = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+    frames.flush()
+    del frames
+    os.replace(tmp_path, array_path)
+
+    ids = [file_manager.get_im_id(file) for file in files]
+    ids = [-1 if im_id is None else im_id for im_id in ids]
+    tmp_path = index_path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump({'version': STORE_VERSION, 'files': files, 'ids': ids,
+                   'source_mtime_ns': source_mtime_ns}, f)
+    os.replace(tmp_path, index_path)
+    return FrameStore.open(img_dir)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description='Packs the raw frames of a year into memory-mapped frame '
+                    'stores, read by the crop and the annotation tool '
+                    'instead of the image files'
+    )
+    parser.add_argument('-d',
+                        metavar='<filepath>',
+                        type=str,
+                        required=True,
+                        help='Directory of the data')
+    parser.add_argument('-y',
+                        metavar='<year>',
+                        type=int,
+                        required=True,
+                        help='Year of the data')
+    parser.add_argument('--mode',
+                        metavar='<image mode>',
+                        choices=['range', 'intensity', 'segmentation'],
+                        nargs='*',
+                        type=str,
+                        default=['range'],
+                        help='Image layers to pack ("range" | "intensity" | '
+                             '"segmentation")')
+    parser.add_argument('--pxheight',
+                        metavar='<height in pixels>',
+                        type=int,
+                        default=1250,
+                        help='Height of the frames in pixels')
+    parser.add_argument('--pxwidth',
+                        metavar='<width in pixels>',
+                        type=int,
+                        default=1040,
+                        help='Width of the frames in pixels')
+    args = parser.parse_args()
+    for mode in args.mode:
+        build_frame_store(
+            os.path.join(args.d, str(args.y), mode.capitalize()),
+            (args.pxwidth, args.pxheight)
+            )
@@ -0,0 +1,271 @@
+import os
+
+import cv2
+from PIL import Image
+
+from file_manager.framestore import FrameBuffer, FrameStore
+
+# size the year panels display the slab images at. The levels of the 
+# thumbnail pyramid written by the crop are multiples of this size
+PYRAMID_BASE_SIZE = (330, 500)
+PYRAMID_LEVELS = (1, 2)
+
+
+def is_raw_directory(img_dir: str) -> bool:
+    """Checks if an image directory holds the uncropped (raw) Range or
+    Intensity frames instead of the cropped slab images.
+
+    Args:
+        img_dir (str): image directory of a year
+
+    Returns:
+        bool: True if the directory holds raw frames
+    """
+    return 'Range' in img_dir or 'Intensity' in img_dir
+
+
+def pyramid_directory(img_dir: str, level: int) -> str:
+    """Gets the directory of a level of the thumbnail pyramid of an image
+    directory. Thumbnails of <year>/Range and <year>/Slabs/output_range are
+    stored in <year>/Pyramid/L<level>/Range and 
+    <year>/Pyramid/L<level>/output_range respectively.
+
+    Args:
+        img_dir (str): image directory of the year (raw or cropped)
+        level (int): level of the pyramid
+
+    Returns:
+        str: directory of the thumbnails
+    """
+    img_dir = os.path.normpath(img_dir)
+    year_dir = os.path.dirname(img_dir)
+    if not is_raw_directory(img_dir):
+        year_dir = os.path.dirname(year_dir)
+    return os.path.join(year_dir, 'Pyramid', f'L{level}', 
+                        os.path.basename(img_dir))
+
+
+def pyramid_level(max_size: tuple[int, int]) -> int:
+    """Gets the smallest pyramid level whose thumbnails are at least as large
+    as an image displayed at the given size.
+
+    Args:
+        max_size (tuple[int, int]): (width, height) the image is displayed at
+
+    Returns:
+        int: the pyramid level, or None if every level is too small
+    """
+    for level in PYRAMID_LEVELS:
+        if (max_size[0] <= level * PYRAMID_BASE_SIZE[0] 
+            and max_size[1] <= level * PYRAMID_BASE_SIZE[1]):
+            return level
+    return None
+
+
+def write_pyramid(img, img_dir: str, file_name: str):
+    """Writes the thumbnails of an image for every level of the pyramid. The
+    thumbnail of a level fits in the level size and keeps the aspect ratio
+    of the image.
+
+    Args:
+        img (np.array): the full resolution image
+        img_dir (str): image directory the image belongs to
+        file_name (str): file name of the image
+    """
+    height, width = img.shape[:2]
+    for level in PYRAMID_LEVELS:
+        scale = min(level * PYRAMID_BASE_SIZE[0] / width, 
+                    level * PYRAMID_BASE_SIZE[1] / height, 1)
+        size = (max(1, round(width * scale)), max(1, round(height * scale)))
+        level_dir = pyramid_directory(img_dir, level)
+        os.makedirs(level_dir, exist_ok=True)
+        cv2.imwrite(os.path.join(level_dir, file_name),
+                    cv2.resize(img, size, interpolation=cv2.INTER_AREA))
+
+
+def load_slab_image(img_dir: str, slab_index: int, start_im: int,
+                    end_im: int, max_size: tuple[int, int]=None):
+    """Reads the image of a slab from disk. Does not use Qt, so it can be run
+    from worker threads.
+
+    Args:
+        img_dir (str): image directory of the year
+        slab_index (int): slab index of the slab
+        start_im (int): bottommost raw frame id of the slab
+        end_im (int): topmost raw frame id of the slab
+        max_size (tuple[int, int], optional): (width, height) the image will
+        be displayed at. If provided, the smallest pyramid thumbnails filling
+        that size are used if they were generated. Otherwise, raw frames are 
+        decoded in grayscale at the lowest resolution that still fills that
+        size. Defaults to None (full resolution).
+
+    Raises:
+        Exception: if the image of the slab could not be found
+
+    Returns:
+        np.array: the image of the slab
+    """
+    if img_dir == '':
+        raise Exception('No slab image for the year')
+    if is_raw_directory(img_dir):
+        return concat_images(img_dir, start_im, end_im, max_size)
+    level = pyramid_level(max_size) if max_size is not None else None
+    if level is not None:
+        for ext in ('png', 'jpg'):
+            img_path = os.path.join(pyramid_directory(img_dir, level), 
+                                    f'{slab_index}.{ext}')
+            if os.path.exists(img_path):
+                return cv2.imread(img_path)
+    img_path = os.path.join(img_dir, f'{slab_index}.jpg')
+    if not os.path.exists(img_path):
+        img_path = os.path.join(img_dir, f'{slab_index}.png')
+    if not os.path.exists(img_path):
+        raise Exception(f'Slab Image Not Found')
+    return cv2.imread(img_path)
+
+
+def raw_frame_path(img_dir: str, im_id: int) -> str:
+    """Gets the path of a raw frame
+
+    Args:
+        img_dir (str): raw image directory of the year
+        im_id (int): id of the frame
+
+    Returns:
+        str: path of the frame
+    """
+    if 'Range' in img_dir:
+        return os.path.join(img_dir, f'LcmsResult_ImageRng_{im_id:06}.jpg')
+    return os.path.join(img_dir, f'LcmsResult_ImageInt_{im_id:06}.jpg')
+
+
+def reduction_factor(frame_size: tuple[int, int], num_frames: int,
+                     max_size: tuple[int, int]) -> int:
+    """Chooses the largest reduction of the resolution of a mosaic (1/2, 1/4
+    or 1/8) that still fills the display size.
+
+    Args:
+        frame_size (tuple[int, int]): (width, height) of the frames
+        num_frames (int): number of frames in the mosaic
+        max_size (tuple[int, int]): (width, height) the mosaic will be 
+        displayed at
+
+    Returns:
+        int: the factor the resolution can be divided by (1 for none)
+    """
+    # the mosaic is scaled down by this factor to fit the display size
+    scale = max(frame_size[0] / max_size[0], 
+                num_frames * frame_size[1] / max_size[1])
+    for factor in (8, 4, 2):
+        if factor <= scale:
+            return factor
+    return 1
+
+
+def reduced_read_flag(frame_path: str, num_frames: int, 
+                      max_size: tuple[int, int]) -> int:
+    """Chooses the cv2.imread flag decoding the frames of a mosaic at the
+    lowest resolution (1/2, 1/4 or 1/8) that still fills the display size.
+    Only the header of the frame is read to get its size.
+
+    Args:
+        frame_path (str): path of one of the frames
+        num_frames (int): number of frames in the mosaic
+        max_size (tuple[int, int]): (width, height) the mosaic will be 
+        displayed at
+
+    Returns:
+        int: the cv2.imread flag to use
+    """
+    with Image.open(frame_path) as frame:
+        factor = reduction_factor(frame.size, num_frames, max_size)
+    return {8: cv2.IMREAD_REDUCED_GRAYSCALE_8,
+            4: cv2.IMREAD_REDUCED_GRAYSCALE_4,
+            2: cv2.IMREAD_REDUCED_GRAYSCALE_2}.get(factor, 
+                                                   cv2.IMREAD_GRAYSCALE)
+
+
+def mosaic_from_store(img_dir: str, id1: int, id2: int,
+                      max_size: tuple[int, int]=None):
+    """Slices the raw frames of a slab from the frame store of the image
+    directory, without decoding them.
+
+    Args:
+        img_dir (str): raw image directory of the year
+        id1 (int): the bottommost image id
+        id2 (int): the topmost image id
+        max_size (tuple[int, int], optional): (width, height) the mosaic will 
+        be displayed at. If provided, the mosaic is scaled down like frames
+        decoded at a reduced resolution. Defaults to None (full resolution).
+
+    Returns:
+        np.array: the grayscale mosaic, topmost frame first, or None if the
+        directory has no up to date frame store holding the frames
+    """
+    store = FrameStore.open(img_dir)
+    if store is None or not store.is_current(img_dir):
+        return None
+    mosaic = store.mosaic_by_id(id1, id2)
+    if mosaic is None or max_size is None:
+        return mosaic
+    height, width = store.frame_shape
+    factor = reduction_factor((width, height), id2 - id1 + 1, max_size)
+    if factor == 1:
+        return mosaic
+    return cv2.resize(mosaic, (max(1, mosaic.shape[1] // factor), 
+                               max(1, mosaic.shape[0] // factor)),
+                      interpolation=cv2.INTER_AREA)
+
+
+def concat_images(img_dir: str, id1: int, id2: int, 
+                  max_size: tuple[int, int]=None):
+    """Concatenates the raw frames of a slab vertically, topmost frame first.
+    The frames are decoded directly into a frame buffer, or sliced from the
+    frame store of the directory if there is one (in grayscale).
+
+    Args:
+        img_dir (str): raw image directory of the year
+        id1 (int): the bottommost image id
+        id2 (int): the topmost image id
+        max_size (tuple[int, int], optional): (width, height) the mosaic will 
+        be displayed at. If provided, the frames are read in grayscale from
+        the pyramid thumbnails if they were generated, or decoded at a 
+        reduced resolution otherwise. Defaults to None (full resolution).
+
+    Raises:
+        Exception: if the start image id is greater than the end image id
+        Exception: if there is no slab image for the year
+    """
+    if id1 > id2:
+        raise Exception('start Im greater than end Im')
+    if not id1 or not id2:
+        raise Exception('No slab image for the year')
+    num_frames = id2 - id1 + 1
+    flag = cv2.IMREAD_COLOR
+    level_dir = None
+    if max_size is not None:
+        level = pyramid_level(max_size)
+        if level is not None:
+            level_dir = pyramid_directory(img_dir, level)
+        if not level_dir or not os.path.exists(raw_frame_path(level_dir, id2)):
+            level_dir = None
+    # the thumbnails are smaller to read than the full resolution frames
+    if level_dir is None:
+        mosaic = mosaic_from_store(img_dir, id1, id2, max_size)
+        if mosaic is not None:
+            return mosaic
+    if max_size is not None:
+        if level_dir is not None:
+            img_dir = level_dir
+            flag = cv2.IMREAD_GRAYSCALE
+        elif not os.path.exists(raw_frame_path(img_dir, id2)):
+            raise Exception('Slab Image Not Found')
+        else:
+            flag = reduced_read_flag(raw_frame_path(img_dir, id2), num_frames,
+                                     max_size)
+    paths = [raw_frame_path(img_dir, i) for i in range(id1, id2 + 1)]
+    try:
+        frames = FrameBuffer.decode(paths, flag=flag)
+    except ValueError:
+        raise Exception('Slab Image Not Found')
+    return frames.mosaic(0, num_frames - 1)
@@ -0,0 +1,67 @@
+class RegistrationWindow:
+    def __init__(self, slab_inventory, registration, window: int=256):
+        """Registration data of the BY slabs around the one being annotated.
+        Registrations stored one document per BY slab are read a window of
+        BY slabs at a time, and the next window is read when a BY slab
+        outside of it is requested. Registrations stored as a single array in
+        the registration entry (before the registration_slabs collection)
+        are kept whole.
+
+        Args:
+            slab_inventory (SlabInventory): database containing all the slab
+            information
+            registration (dict): the registration entry
+            window (int, optional): number of BY slabs read at once. Defaults
+            to 256.
+        """
+        self._slab_inventory = slab_inventory
+        self._reg_id = registration['_id']
+        self._window = window
+        # loaded registration data, by base_id
+        self._entries = {}
+        if registration.get('layout') == 'slabs':
+            self._first_base_id = registration['first_base_id']
+            self._last_base_id = registration['last_base_id']
+            self._loaded = None
+        else:
+            reg_data = registration['registration_data']
+            self._entries = {entry['base_id']: entry for entry in reg_data}
+            self._first_base_id = reg_data[0]['base_id']
+            self._last_base_id = reg_data[-1]['base_id']
+            self._loaded = (self._first_base_id, self._last_base_id)
+
+
+    @property
+    def first_base_id(self):
+        return self._first_base_id
+
+
+    @property
+    def last_base_id(self):
+        return self._last_base_id
+
+
+    def get(self, base_id: int):
+        """Gets the registration data of a BY slab, reading the window of BY
+        slabs centered on it if it is not loaded.
+
+        Args:
+            base_id (int): base_id of the BY slab
+
+        Returns:
+            dict: the registration data of the BY slab, or None if the
+            registration has no BY slab with that base_id
+        """
+        if base_id < self._first_base_id or base_id > self._last_base_id:
+            return None
+        if (self._loaded is None or base_id < self._loaded[0]
+            or base_id > self._loaded[1]):
+            first = max(self._first_base_id, base_id - self._window // 2)
+            last = min(self._last_base_id, first + self._window - 1)
+            self._entries = {
+                entry['base_id']: entry
+                for entry in self._slab_inventory.fetch_registration_slabs(
+                    self._reg_id, first, last)
+            }
+            self._loaded = (first, last)
+        return self._entries.get(base_id)
@@ -1,5 +1,8 @@
 from PyQt5.QtCore import QObject, pyqtSignal
 from enum import Enum
+import os
+
+from model.registration_window import RegistrationWindow
 
 class ImageType(Enum):
     # cropped images
@@ -13,7 +16,7 @@ class ToolModel(QObject):
     replaced_year_changed = pyqtSignal(int)
     replaced_type_changed = pyqtSignal(str)
     def __init__(self, year_panel_models, slab_inventory, directory,
-                 all_reg_data):
+                 all_reg_data, slab_writer):
         """Constructor for ToolModel, containing data for the annotation tool 
         main window
 
@@ -23,23 +26,28 @@ class ToolModel(QObject):
             slab_inventory (SlabInventory): database containing all the slab 
             information
             directory (str): directory of the slab data  
-            all_reg_data (dict): registration data and metadata for the specific
-            registration being annotated
+            all_reg_data (dict): registration entry of the registration being
+            annotated. Its registration data is read a window of BY slabs at
+            a time (see RegistrationWindow)
+            slab_writer (SlabUpdateWriter): writes the slab updates to the
+            database in the background
         """
         super().__init__()
         self._year_panel_models = year_panel_models
         self._base_year = all_reg_data['base_year']
         self._seg_id = all_reg_data['_id']
         self._seg_str = all_reg_data['segment_id']
-        self._reg_data = all_reg_data['registration_data']
+        self._registration = RegistrationWindow(slab_inventory, all_reg_data)
         self._directory = directory.replace('/', '\\')
         self._slab_inventory = slab_inventory
+        self._slab_writer = slab_writer
         self._image_type = ImageType.RANGE
-        self._first_BY_index = self._reg_data[0]['base_id']
-        self._last_BY_index = self._reg_data[-1]['base_id'] 
+        self._first_BY_index = self._registration.first_base_id
+        self._last_BY_index = self._registration.last_base_id
         self._current_BY_index = self._first_BY_index
-        self._replaced_year = self._reg_data[0]['replaced']
-        self._replaced_type = self._reg_data[0]['replaced_type']
+        first_entry = self._registration.get(self._first_BY_index)
+        self._replaced_year = first_entry['replaced']
+        self._replaced_type = first_entry['replaced_type']
         
 
 
@@ -76,14 +84,32 @@ class ToolModel(QObject):
         return self._last_BY_index
 
 
+    @property
+    def current_BY_index(self):
+        return self._current_BY_index
+    
+
+    @current_BY_index.setter
+    def current_BY_index(self, current_BY_index):
+        self._current_BY_index = current_BY_index
+
+
     @property
     def year_panel_models(self):
         return self._year_panel_models  
     
 
-    @property
-    def reg_data(self):
-        return self._reg_data
+    def registration_entry(self, by_slab_id):
+        """Gets the registration data of a base year slab
+
+        Args:
+            by_slab_id (int): base year slab ID
+
+        Returns:
+            dict: the registration data of the slab, or None if the slab is
+            not in the registration
+        """
+        return self._registration.get(by_slab_id)
 
 
     @property
@@ -107,6 +133,24 @@ class ToolModel(QObject):
             self._image_type = ImageType.RAW_RANGE
 
 
+    def year_img_directory(self, year):
+        """Gets the directory of the images of a year for the current image 
+        type
+
+        Args:
+            year (int): year of the images
+
+        Returns:
+            str: directory of the images
+        """
+        img_type = self._image_type.value
+        if img_type == 'Range' or img_type == 'Intensity':
+            suffix = img_type
+        else:
+            suffix = os.path.join('Slabs', img_type)
+        return os.path.join(self._directory, str(year), suffix)
+
+
     @property
     def directory(self):
         return self._directory
@@ -132,11 +176,17 @@ class ToolModel(QObject):
         self._seg_str = seg_str
 
         
+    @property
+    def slab_writer(self):
+        return self._slab_writer
+
+
     def execute_updates(self):
-        """Executes all the requests in the requests list stored in the 
-        database object and clears all the requests after.
+        """Requests the queued slab updates to be written to the database. 
+        The updates are written in the background, so this does not wait for
+        the database.
         """ 
-        self._slab_inventory.execute_requests()
+        self._slab_writer.flush()
 
 
         
\ No newline at end of file
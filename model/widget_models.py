@@ -23,14 +23,16 @@ class ClassificationModel(QObject):
     def construct_registration_list(self):
         """Construct a list of registrations for the given segment ID, and
         stores mapping between years and the corresponding registration 
-        metadata.
+        metadata. Only the metadata is fetched; the registration data itself
+        is fetched when the annotation tool starts.
 
         Args:
             seg_id (str): segment ID
         """
         registrations = {}
         reg_metadata = self._slab_inventory.all_registration_data(
-            filter={"segment_id": self._menu_model.segment_id}
+            filter={"segment_id": self._menu_model.segment_id},
+            projection=['base_year', 'years', 'segment_id']
         )
         for reg in reg_metadata:
             by = reg['base_year']
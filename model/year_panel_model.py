@@ -38,8 +38,14 @@ class SlabStateSignal(QObject):
 
 
 class YearPanelModel(QObject):
+    # fields of the slab entries shown by the panel
+    SLAB_STATE_FIELDS = ['primary_state', 'secondary_state', 'sealed', 
+                         'special_state', 'failed_spall', 'joint_spall', 
+                         'patched_spall', 'intensity_replaced', 'comments', 
+                         'length', 'width', 'mean_faulting', 'start_im', 
+                         'end_im']
     
-    def __init__(self, year, slab_inventory, seg_str):
+    def __init__(self, year, slab_inventory, seg_str, slab_writer):
         """Constructor for YearPanelModel, containing all data for a speicific
         image in a given year to display in a YearPanel.
 
@@ -48,6 +54,8 @@ class YearPanelModel(QObject):
             slab_inventory (SlabInventory): database containing all the slab 
             data
             seg_str (str): segment string identifying the segment
+            slab_writer (SlabUpdateWriter): writes the slab updates to the
+            database in the background
         """
         super().__init__()
         self.image_signal = ImageSignal()
@@ -58,6 +66,7 @@ class YearPanelModel(QObject):
         self._panel_updated = False
         self._year = year
         self._slab_inventory = slab_inventory
+        self._slab_writer = slab_writer
         self._slab_id_list = None
         self._lock_panel = False
         self._slab_id_list_index = None
@@ -73,6 +82,8 @@ class YearPanelModel(QObject):
         self._intensity_replaced = None
         self._slabs_info = None
         self._seg_str = seg_str
+        # state fields of the slabs of the year, by slab index
+        self._slab_cache = None
 
 
     @property
@@ -232,17 +243,48 @@ class YearPanelModel(QObject):
         self._slab_id_list = slab_id_list
 
 
-    def populate_slab_info(self):
-        """Populates necessary fields for the current slab based on slab ID. 
-        Fetches data from the database and notifies view of changes upon the
-        slab switch.
+    def load_slab_cache(self):
+        """Fetches the state fields of all the slabs of the year from the 
+        database in a single query, so switching slabs does not need to query
+        the database.
+        """
+        self._slab_cache = self._slab_inventory.fetch_slabs(
+            self._year, None, self._seg_str, self.SLAB_STATE_FIELDS
+            )
+
+
+    def slab_image_range(self, slab_id):
+        """Gets the raw frames spanned by a slab from the slab cache.
 
         Args:
-            slab_id (int): slab ID to switch to
+            slab_id (int): slab ID of the slab
+
+        Returns:
+            tuple[int, int]: the bottommost and topmost raw frame ids, or None
+            if the slab is not cached
+        """
+        if self._slab_cache is None or slab_id not in self._slab_cache:
+            return None
+        slab_data = self._slab_cache[slab_id]
+        return slab_data.get('start_im'), slab_data.get('end_im')
+
+
+    def populate_slab_info(self):
+        """Populates necessary fields for the current slab based on slab ID. 
+        Reads the data from the slab cache (fetching the slabs missing from 
+        the cache from the database in a single query) and notifies view of 
+        changes upon the slab switch.
         """
+        if self._slab_cache is None:
+            self.load_slab_cache()
+        missing = [slab_id for slab_id in self._slab_id_list 
+                   if slab_id not in self._slab_cache]
+        if missing:
+            self._slab_cache.update(self._slab_inventory.fetch_slabs(
+                self._year, missing, self._seg_str, self.SLAB_STATE_FIELDS
+                ))
         for slab_id in self._slab_id_list:
-            slab_data = self._slab_inventory.fetch_slab(self._year, slab_id,
-                                                        self._seg_str)
+            slab_data = self._slab_cache[slab_id]
             if 'primary_state' not in slab_data:
                 self._primary_states.append(None)
             else:
@@ -333,28 +375,33 @@ class YearPanelModel(QObject):
         
 
     def push_updates_to_db(self, seg_str):
-        """Sends a request to the database to update a certain slab. 
+        """Queues the updates of the slabs of the panel to be written to the
+        database. 
 
         Args:
             seg_str (str): segment string identifying the segment
         """
         if self._panel_updated and not self._lock_panel:
             for i in range(len(self._slab_id_list)):
-                self._slab_inventory.add_slab_update_request(
-                    self._year, self._slab_id_list[i],
-                    {
-                        'primary_state': self._primary_states[i],
-                        'secondary_state': self._secondary_states[i],
-                        'sealed': self._sealed[i],
-                        'special_state': self._replaced[i],
-                        'failed_spall': self._failed_spall[i],
-                        'joint_spall': self._joint_spall[i],
-                        'patched_spall': self._patched_spall[i],
-                        'intensity_replaced': self._intensity_replaced[i],
-                        'comments': self._slabs_info['comments'][i]
-                    },
-                    seg_str
+                update_data = {
+                    'primary_state': self._primary_states[i],
+                    'secondary_state': self._secondary_states[i],
+                    'sealed': self._sealed[i],
+                    'special_state': self._replaced[i],
+                    'failed_spall': self._failed_spall[i],
+                    'joint_spall': self._joint_spall[i],
+                    'patched_spall': self._patched_spall[i],
+                    'intensity_replaced': self._intensity_replaced[i],
+                    'comments': self._slabs_info['comments'][i]
+                }
+                self._slab_writer.add_update(
+                    self._year, self._slab_id_list[i], update_data, seg_str
                 )
+                # keep the cache in sync with the database
+                if self._slab_cache is not None:
+                    self._slab_cache.setdefault(
+                        self._slab_id_list[i], {}
+                        ).update(update_data)
 
                 
             
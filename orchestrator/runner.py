@@ -0,0 +1,266 @@
+import os
+import sys
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import Manager
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PRE_CVAT_DIR = os.path.join(ROOT_DIR, 'data_pipeline')
+STAGES = ['pre-cvat', 'crop']
+
+
+def discover_years(data_dir: str, years: list[int] = None) -> list[int]:
+    """Finds all the year folders (named in the format XXXX) in the data
+    directory of a segment.
+
+    Args:
+        data_dir (str): path to the folder containing all the segment data
+        years (list[int], optional): if provided, only these years are kept.
+        Defaults to None.
+
+    Raises:
+        ValueError: If the data directory does not exist
+        ValueError: If a requested year has no folder in the data directory
+
+    Returns:
+        list[int]: sorted list of years found in the data directory
+    """
+    if not os.path.isdir(data_dir):
+        raise ValueError("Data source directory could not be found.")
+    found = sorted(int(name) for name in os.listdir(data_dir)
+                   if len(name) == 4 and name.isdigit()
+                   and os.path.isdir(os.path.join(data_dir, name)))
+    if years is None:
+        return found
+    missing = [year for year in years if year not in found]
+    if missing:
+        raise ValueError(f"Year folder(s) {missing} could not be found.")
+    return sorted(years)
+
+
+class TimedLock:
+    def __init__(self, lock):
+        """Lock that keeps track of the time spent waiting to acquire it.
+
+        Args:
+            lock: the lock (or semaphore) to acquire
+        """
+        self.lock = lock
+        self.wait = 0.0
+
+
+    def __enter__(self):
+        start = time.perf_counter()
+        self.lock.acquire()
+        self.wait += time.perf_counter() - start
+        return self
+
+
+    def __exit__(self, *exc_info):
+        self.lock.release()
+
+
+def run_year_stages(config: dict, year: int, db_semaphore) -> list[dict]:
+    """Runs the requested stages for a single year, one after another. The
+    stages hold the shared database semaphore around their database writes
+    only, so only a limited number of years write at the same time while the
+    processing of every year runs in parallel. Runs inside a worker process
+    of the pool.
+
+    Args:
+        config (dict): pipeline configuration (see PipelineOrchestrator)
+        year (int): the year to process
+        db_semaphore (multiprocessing.managers.AcquirerProxy): semaphore
+        limiting the number of concurrent database writers
+
+    Returns:
+        list[dict]: one result per stage, with the keys 'year', 'stage',
+        'status' ('ok' | 'skipped' | 'failed'), 'seconds', 'wait' and
+        'message'
+    """
+    results = []
+    failed = False
+    for stage in config['stages']:
+        result = {'year': year, 'stage': stage, 'status': 'ok',
+                  'seconds': 0.0, 'wait': 0.0, 'message': ''}
+        results.append(result)
+        if failed:
+            result['status'] = 'skipped'
+            result['message'] = 'previous stage failed'
+            continue
+        runner = STAGE_RUNNERS[stage]
+        skip_reason = runner.skip_reason(config, year)
+        if skip_reason:
+            result['status'] = 'skipped'
+            result['message'] = skip_reason
+            continue
+
+        write_lock = TimedLock(db_semaphore)
+        start = time.perf_counter()
+        try:
+            runner.run(config, year, write_lock)
+        except Exception as e:
+            failed = True
+            result['status'] = 'failed'
+            result['message'] = f'{type(e).__name__}: {e}'
+            traceback.print_exc()
+        finally:
+            result['seconds'] = time.perf_counter() - start
+            result['wait'] = write_lock.wait
+    return results
+
+
+class PreCvatStage:
+    """Extracts the LCMS XML data of a year (see data_pipeline/xml_parse.py).
+    """
+    @staticmethod
+    def skip_reason(config, year):
+        year_dir = os.path.join(config['data_dir'], str(year))
+        if not os.path.isdir(os.path.join(year_dir, 'XML')):
+            return 'no XML folder'
+        if not os.path.isdir(os.path.join(year_dir,
+                                          config['pre_cvat_mode'].capitalize())):
+            return f"no {config['pre_cvat_mode'].capitalize()} folder"
+        return None
+
+
+    @staticmethod
+    def run(config, year, write_lock):
+        # the pre-CVAT application is written to be run from its own folder
+        if PRE_CVAT_DIR not in sys.path:
+            sys.path.insert(0, PRE_CVAT_DIR)
+        from pre_cvat.parser import XML_CVAT_Parser
+        XML_CVAT_Parser(config['data_dir'], config['px_height'],
+                        config['px_width'], config['mm_height'],
+                        config['mm_width'], config['pre_cvat_mode'],
+                        config['task_size'], config['begin_MM'],
+                        config['end_MM'], year, config['interstate'],
+                        write_lock)
+
+
+class CropStage:
+    """Crops the slabs of a year (see cropapp.py).
+    """
+    @staticmethod
+    def skip_reason(config, year):
+        annotation_path = os.path.join(config['data_dir'], str(year),
+                                       'CVAT_output')
+        if not os.path.isdir(annotation_path):
+            return 'no CVAT_output folder'
+        if not any(file.endswith('.xml')
+                   for file in os.listdir(annotation_path)):
+            return 'no annotations in CVAT_output'
+        return None
+
+
+    @staticmethod
+    def run(config, year, write_lock):
+        if ROOT_DIR not in sys.path:
+            sys.path.insert(0, ROOT_DIR)
+        from crop_app.crop_slab_cvat import CropSlabsCVAT
+        from database.db import SlabInventory
+        CropSlabsCVAT(config['data_dir'], config['px_height'],
+                      config['px_width'], config['mm_height'],
+                      config['mm_width'], config['mode'],
+                      config['begin_MM'], config['end_MM'], year,
+                      config['interstate'], SlabInventory(write_lock),
+                      config['overwrite'],
+                      config['func'] == 'validation-only',
+                      config['func'] == 'crop-only',
+                      config['resume'], config['pyramid'],
+                      config.get('crack_workers', 1),
+                      config.get('frame_store', False))
+
+
+STAGE_RUNNERS = {
+    'pre-cvat': PreCvatStage,
+    'crop': CropStage
+}
+
+
+class PipelineOrchestrator:
+    def __init__(self, config: dict):
+        """Runs the pipeline stages for every year of a segment. Years are
+        independent of each other, so each year is processed in its own worker
+        process, while the stages of a single year run in order.
+
+        Args:
+            config (dict): pipeline configuration, containing 'data_dir',
+            'interstate', 'begin_MM', 'end_MM', 'years', 'stages', 'func',
+            'mode', 'pre_cvat_mode', 'task_size', 'px_height', 'px_width',
+            'mm_height', 'mm_width', 'overwrite', 'resume', 'pyramid',
+            'frame_store', 'workers' (global worker budget) and 'db_workers'
+            (maximum number of years writing to the database at the same 
+            time)
+        """
+        self.config = config
+        self.years = discover_years(config['data_dir'], config['years'])
+        self.results = []
+        self.total_seconds = 0.0
+
+
+    def run(self) -> list[dict]:
+        """Runs all the stages for all the years and prints a summary table.
+
+        Returns:
+            list[dict]: the stage results, sorted by year and stage order
+        """
+        if not self.years:
+            raise ValueError("No year folders found in the data directory.")
+        # years running at once, the database semaphore only limits their
+        # writes
+        workers = max(1, min(self.config['workers'], len(self.years)))
+        # workers left over by the years share the crack stats calculation
+        config = dict(self.config,
+                      crack_workers=max(1, self.config['workers'] // workers))
+        start = time.perf_counter()
+        with Manager() as manager:
+            db_semaphore = manager.BoundedSemaphore(
+                max(1, self.config['db_workers']))
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                futures = {
+                    executor.submit(run_year_stages, config, year,
+                                    db_semaphore): year
+                    for year in self.years
+                }
+                for future in as_completed(futures):
+                    year = futures[future]
+                    try:
+                        year_results = future.result()
+                    except Exception as e:
+                        year_results = [
+                            {'year': year, 'stage': stage, 'status': 'failed',
+                             'seconds': 0.0, 'wait': 0.0,
+                             'message': f'{type(e).__name__}: {e}'}
+                            for stage in self.config['stages']
+                        ]
+                    self.results.extend(year_results)
+                    print(f"Finished {year}: " + ', '.join(
+                        f"{r['stage']} {r['status']}" for r in year_results))
+        self.total_seconds = time.perf_counter() - start
+
+        stage_order = {stage: i for i, stage in enumerate(STAGES)}
+        self.results.sort(key=lambda r: (r['year'], stage_order[r['stage']]))
+        self.print_summary()
+        return self.results
+
+
+    def print_summary(self):
+        """Prints a table of the status and timing of every stage of every
+        year, followed by the total time per stage and the wall clock time.
+        """
+        header = (f"{'year':<6}{'stage':<10}{'status':<9}"
+                  f"{'time (s)':>10}{'db wait (s)':>13}  message")
+        print()
+        print(header)
+        print('-' * len(header))
+        for r in self.results:
+            print(f"{r['year']:<6}{r['stage']:<10}{r['status']:<9}"
+                  f"{r['seconds']:>10.1f}{r['wait']:>13.1f}  {r['message']}")
+        print('-' * len(header))
+        for stage in self.config['stages']:
+            stage_total = sum(r['seconds'] for r in self.results
+                              if r['stage'] == stage)
+            print(f"Total {stage} time: {stage_total:.1f} s")
+        print(f"Wall clock time: {self.total_seconds:.1f} s")
@@ -0,0 +1,198 @@
+import argparse
+import os
+from orchestrator.runner import PipelineOrchestrator, STAGES
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description='Runs the pre-CVAT and crop stages for all the years of a '
+                    'segment, processing independent years in parallel'
+    )
+
+    parser.add_argument('-d',
+                        metavar='<filepath>',
+                        type=str,
+                        required=True,
+                        help='Directory for all the segment data')
+
+    parser.add_argument('-i',
+                        metavar='<interstate>',
+                        type=str,
+                        required=True,
+                        help='Interstate of data (eg. I16WB)')
+
+    parser.add_argument('-b',
+                        metavar='<beginning MM>',
+                        type=str,
+                        required=True,
+                        help='begining MM of the segment')
+
+    parser.add_argument('-e',
+                        metavar='<ending MM>',
+                        type=str,
+                        required=True,
+                        help='ending MM of the segment')
+
+    parser.add_argument('-y',
+                        metavar='<year>',
+                        type=int,
+                        nargs='*',
+                        default=None,
+                        help='Years to process (default: every year folder '
+                             'found in the data directory)')
+
+    parser.add_argument('--stages',
+                        metavar='<stage>',
+                        choices=STAGES,
+                        nargs='*',
+                        type=str,
+                        default=STAGES,
+                        help='Stages to run ("pre-cvat" | "crop")')
+
+    parser.add_argument('-f',
+                        metavar='<function>',
+                        type=str,
+                        default='crop-slabs',
+                        help='Function of the crop stage ("crop-slabs" | '
+                             '"validation-only" | "crop-only")')
+
+    parser.add_argument('--mode',
+                        metavar='<cropping mode>',
+                        choices=['range', 'intensity', 'segmentation'],
+                        nargs='*',
+                        type=str,
+                        default=['range'],
+                        help='Image layer to crop ("range" | "intensity | '
+                             'segmentation")')
+
+    parser.add_argument('--premode',
+                        metavar='<annotation mode>',
+                        choices=['range', 'intensity'],
+                        type=str,
+                        default='range',
+                        help='Image layer to annotate in the pre-CVAT stage '
+                             '("range" | "intensity")')
+
+    parser.add_argument('--tasksize',
+                        metavar='<number of images per task>',
+                        type=int,
+                        default=100000000000,
+                        help='Number of images per task')
+
+    parser.add_argument('--pxheight',
+                        metavar='<height in pixels>',
+                        type=int,
+                        default=1250,
+                        help='Height of the images in pixels')
+
+    parser.add_argument('--pxwidth',
+                        metavar='<width in pixels>',
+                        type=int,
+                        default=1040,
+                        help='Width of the images in pixels')
+
+    parser.add_argument('--mmheight',
+                        metavar='<height in mm>',
+                        type=int,
+                        default=5000,
+                        help='Height of the images in millimeters')
+
+    parser.add_argument('--mmwidth',
+                        metavar='<width in mm>',
+                        type=int,
+                        default=4160,
+                        help='Width of the images in millimeters')
+
+    parser.add_argument('--workers',
+                        metavar='<number of processes>',
+                        type=int,
+                        default=os.cpu_count() or 1,
+                        help='Maximum number of years processed at once')
+
+    parser.add_argument('--dbworkers',
+                        metavar='<number of writers>',
+                        type=int,
+                        default=2,
+                        help='Maximum number of years writing to the database '
+                             'at once')
+
+    parser.add_argument('--overwrite',
+                        default=False,
+                        action='store_true',
+                        help='delete segment entries in database before '
+                             'cropping')
+
+    parser.add_argument('--resume',
+                        default=False,
+                        action='store_true',
+                        help='continue interrupted crop runs from their last '
+                             'completed slab')
+
+    parser.add_argument('--pyramid',
+                        default=False,
+                        action='store_true',
+                        help='also write thumbnails of the slabs and frames '
+                             'for the annotation tool')
+
+    parser.add_argument('--frame-store',
+                        default=False,
+                        action='store_true',
+                        help='pack the frames of each mode into a single '
+                             'memory-mapped file before cropping')
+
+    args = parser.parse_args()
+    begin_MM = int(args.b)
+    end_MM = int(args.e)
+
+    if args.f not in {"crop-slabs", "validation-only", "crop-only"}:
+        raise ValueError("Please enter a valid function name.")
+
+    if not args.stages:
+        raise ValueError("Please specify at least one stage.")
+
+    if begin_MM < 0 or end_MM < 0:
+        raise ValueError("MM cannot be negative")
+
+    if args.y is not None:
+        for year in args.y:
+            if len(str(year)) != 4 or year < 0:
+                raise ValueError("Please enter a valid year.")
+
+    if args.tasksize <= 0:
+        raise ValueError("Please enter a valid task size.")
+
+    if args.workers <= 0 or args.dbworkers <= 0:
+        raise ValueError("Number of workers must be positive.")
+
+    if ('EB' not in args.i
+        and 'WB' not in args.i
+        and 'NB' not in args.i
+        and 'SB' not in args.i):
+        raise ValueError("Please specify direction of interstate highway \
+                         (eg. I16WB)")
+
+    if 'crop' in args.stages and args.f == "crop-slabs":
+        response = input("Are you sure you want to update the database? Use '-f crop-only' if you only want to crop slabs. (Y/n): ")
+        if response.lower() != 'y':
+            exit()
+
+    PipelineOrchestrator({
+        'data_dir': args.d,
+        'interstate': args.i,
+        'begin_MM': begin_MM,
+        'end_MM': end_MM,
+        'years': args.y,
+        'stages': [stage for stage in STAGES if stage in args.stages],
+        'func': args.f,
+        'mode': args.mode,
+        'pre_cvat_mode': args.premode,
+        'task_size': args.tasksize,
+        'px_height': args.pxheight,
+        'px_width': args.pxwidth,
+        'mm_height': args.mmheight,
+        'mm_width': args.mmwidth,
+        'overwrite': args.overwrite,
+        'resume': args.resume,
+        'pyramid': args.pyramid,
+        'frame_store': args.frame_store,
+        'workers': args.workers,
+        'db_workers': args.dbworkers
+    }).run()
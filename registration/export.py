@@ -0,0 +1,333 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+# numeric slab fields read to build the spreadsheet
+SLAB_FIELDS = ['length', 'median_faulting', 'mean_faulting', 'p95_faulting',
+               'total_crack_length', 'median_crack_width']
+# annotated slab fields the state columns are built from
+STATE_FIELDS = ['primary_state', 'special_state', 'intensity_replaced']
+
+
+def single_spreadsheet_fields(years: list[int]) -> list[str]:
+    """Gets the columns of the single spreadsheet of a registration.
+
+    Args:
+        years (list[int]): years of the registration
+
+    Returns:
+        list[str]: the column names, in order
+    """
+    fields = ['interstate', 'direction', 'MP_from', 'MP_to', 'BY_id',
+              'BY_length (ft)']
+    for column in ('state', 'faulting', 'total_crack_length',
+                   'median_crack_width', 'p95_faulting'):
+        fields.extend(f'{year}_{column}' for year in years)
+    fields.extend(['year_replaced', 'replaced_type'])
+    return fields
+
+
+def fetch_year_table(slab_inventory, seg_str: str, year: int,
+                     slab_indices: list[int]=None) -> pd.DataFrame:
+    """Fetches the fields of the spreadsheet of the slabs of a year in a
+    single query.
+
+    Args:
+        slab_inventory (SlabInventory): database containing all the slab data
+        seg_str (str): segment string in the format "Ixx_MMxx_MMxx"
+        year (int): year of the slabs
+        slab_indices (list[int], optional): slab indices of the slabs to
+        fetch. Defaults to None (all the slabs of the year).
+
+    Returns:
+        pd.DataFrame: the SLAB_FIELDS (as floats, missing fields are NaN) and
+        STATE_FIELDS of the slabs, indexed by slab index
+    """
+    fields = SLAB_FIELDS + STATE_FIELDS
+    slabs = slab_inventory.fetch_slabs(year, slab_indices, seg_str,
+                                       projection=fields)
+    table = pd.DataFrame.from_records(list(slabs.values()),
+                                      columns=['slab_index'] + fields)
+    return table.set_index('slab_index').astype(dict.fromkeys(SLAB_FIELDS,
+                                                               float))
+
+
+def slab_states(year_slabs: pd.DataFrame,
+                include_intensity_replaced=False) -> np.ndarray:
+    """Gets the state shown in the spreadsheet for each slab: R for replaced
+    slabs, the primary state otherwise.
+
+    Args:
+        year_slabs (pd.DataFrame): slab fields (see fetch_year_table)
+        include_intensity_replaced (bool, optional): If True, slabs annotated
+        as replaced on the intensity images are also R. Defaults to False.
+
+    Returns:
+        np.ndarray: the state of each slab, None if it has none
+    """
+    replaced = (year_slabs['special_state'] == 'R').to_numpy()
+    if include_intensity_replaced:
+        replaced |= (year_slabs['intensity_replaced'] == 'R').to_numpy()
+    states = np.where(replaced, 'R',
+                      year_slabs['primary_state'].to_numpy(dtype=object))
+    states[pd.isna(states)] = None
+    return states
+
+
+def average_faulting(table: pd.DataFrame, cy_slabs: list[list[int]]):
+    """Averages the mean faulting of the CY slabs associated with each BY
+    slab. Slabs without faulting (or with a faulting of 0) are not counted.
+
+    Args:
+        table (pd.DataFrame): slab fields of the year (see fetch_year_table)
+        cy_slabs (list[list[int]]): slab indices of the CY slabs associated
+        with each BY slab
+
+    Returns:
+        np.ndarray: the average faulting of each BY slab, NaN if none of its
+        CY slabs has faulting
+    """
+    counts = np.fromiter((len(ids) for ids in cy_slabs), dtype=np.int64,
+                         count=len(cy_slabs))
+    rows = np.repeat(np.arange(len(cy_slabs)), counts)
+    ids = np.fromiter((i for ids in cy_slabs for i in ids), dtype=np.int64,
+                      count=int(counts.sum()))
+    faulting = table['mean_faulting'].reindex(ids).to_numpy()
+    counted = ~np.isnan(faulting) & (faulting != 0)
+    total = np.bincount(rows[counted], weights=faulting[counted],
+                        minlength=len(cy_slabs))
+    count = np.bincount(rows[counted], minlength=len(cy_slabs))
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(total != 0, total / count, np.nan)
+
+
+def _year_columns(table: pd.DataFrame, year: int, slab_ids: np.ndarray,
+                  cy_slabs: list[list[int]]=None,
+                  include_intensity_replaced=False) -> dict:
+    """Builds the columns of a year for a set of rows of the spreadsheet.
+
+    Args:
+        table (pd.DataFrame): slab fields of the year (see fetch_year_table)
+        year (int): the year
+        slab_ids (np.ndarray): slab index of the majority slab of each row, -1
+        if the BY slab has none in the year
+        cy_slabs (list[list[int]], optional): slab indices of the CY slabs of
+        each row, to average their faulting. Defaults to None (faulting of
+        the majority slab).
+        include_intensity_replaced (bool, optional): see slab_states. Defaults
+        to False.
+
+    Returns:
+        dict: the values of the year columns of the rows (arrays, and a
+        Series for the states), by column name
+    """
+    # BY slabs without a majority slab in the year have no values
+    year_slabs = table.reindex(slab_ids)
+    if cy_slabs is not None:
+        faulting = average_faulting(table, cy_slabs)
+        faulting[slab_ids == -1] = np.nan
+    else:
+        faulting = year_slabs['median_faulting'].to_numpy()
+    return {
+        # kept as objects, so states and missing states (None) are written
+        # the same whether the column has states or not
+        f'{year}_state': pd.Series(
+            slab_states(year_slabs, include_intensity_replaced),
+            dtype=object),
+        f'{year}_faulting': faulting,
+        f'{year}_p95_faulting': year_slabs['p95_faulting'].to_numpy(),
+        f'{year}_total_crack_length': (
+            year_slabs['total_crack_length'].to_numpy()),
+        f'{year}_median_crack_width': (
+            year_slabs['median_crack_width'].to_numpy())
+    }
+
+
+def _majority_ids(majority_slabs: list[dict], year: int) -> np.ndarray:
+    return np.fromiter((slabs.get(str(year), -1) for slabs in majority_slabs),
+                       dtype=np.int64, count=len(majority_slabs))
+
+
+def build_single_table(slab_inventory, seg_str: str, years: list[int],
+                       by: int, reg_data: list[dict],
+                       majority_slabs: list[dict], avg_faulting=False,
+                       progress=None,
+                       include_intensity_replaced=False) -> pd.DataFrame:
+    """Builds the single spreadsheet of a registration, one row per BY slab,
+    a column at a time. The slabs of each year are fetched in a single query.
+    The single associating slab in the CY is the one that has the most
+    overlap with the BY slab.
+
+    Args:
+        slab_inventory (SlabInventory): database containing all the slab data
+        seg_str (str): segment string in the format "Ixx_MMxx_MMxx"
+        years (list[int]): years of the registration
+        by (int): base year
+        reg_data (list[dict]): registration data, one entry per BY slab
+        majority_slabs (list[dict]): slab index of the CY slab with the most
+        overlap with each BY slab, by year (as a string)
+        avg_faulting (bool, optional): If True, the faulting of a year is the
+        average faulting of all the CY slabs associated with the BY slab
+        instead of the faulting of the majority slab. Defaults to False.
+        progress (callable, optional): called with the number of years done
+        after each year. Defaults to None.
+        include_intensity_replaced (bool, optional): If True, slabs annotated
+        as replaced on the intensity images have the R state. Defaults to
+        False.
+
+    Returns:
+        pd.DataFrame: the spreadsheet, with the columns of
+        single_spreadsheet_fields
+    """
+    metadata = seg_str.split('_')
+    interstate = metadata[0]
+    begin_MM = int(metadata[1][2:])
+    direction = interstate[-2:].upper()
+    num_rows = len(reg_data)
+
+    columns = {'interstate': np.full(num_rows, interstate[0:-2],
+                                     dtype=object),
+               'direction': np.full(num_rows, direction, dtype=object)}
+    for done, year in enumerate(years, 1):
+        table = fetch_year_table(slab_inventory, seg_str, year)
+        slab_ids = _majority_ids(majority_slabs, year)
+        cy_slabs = None
+        if avg_faulting:
+            cy_slabs = [entry.get(str(year), []) for entry in reg_data]
+        columns.update(_year_columns(table, year, slab_ids, cy_slabs,
+                                     include_intensity_replaced))
+        if year == by:
+            lengths = table['length'].reindex(slab_ids).to_numpy()
+            columns['BY_id'] = slab_ids
+            columns['BY_length (ft)'] = np.round(lengths / 304.8, 2)
+            # mileposts accumulate the length of the slabs, decreasing on
+            # westbound and southbound segments
+            mp_lengths = np.round(lengths / 1609000, 5)
+            if direction not in ['NB', 'EB']:
+                mp_lengths = -mp_lengths
+            mileposts = np.cumsum(np.concatenate(([begin_MM], mp_lengths)))
+            columns['MP_from'] = mileposts[:-1]
+            columns['MP_to'] = mileposts[1:]
+        if progress is not None:
+            progress(done)
+    columns['year_replaced'] = pd.array(
+        [entry['replaced'] for entry in reg_data], dtype='Int64')
+    columns['replaced_type'] = np.array(
+        [entry['replaced_type'] for entry in reg_data], dtype=object)
+    return pd.DataFrame(columns, columns=single_spreadsheet_fields(years))
+
+
+def refresh_single_table(table: pd.DataFrame, slab_inventory, seg_str: str,
+                         years: list[int], reg_data: list[dict],
+                         majority_slabs: list[dict], updated_since,
+                         avg_faulting=False, progress=None,
+                         include_intensity_replaced=False) -> int:
+    """Patches the single spreadsheet of a registration with the slabs
+    updated since it was built, instead of building it again. Only the ids of
+    the updated slabs of each year are fetched, then the fields of the slabs
+    of the rows they change. The BY lengths and the mileposts are not
+    patched, since a change of the slab lengths needs a new registration.
+
+    Args:
+        table (pd.DataFrame): the spreadsheet (see build_single_table),
+        patched in place
+        slab_inventory (SlabInventory): database containing all the slab data
+        seg_str (str): segment string in the format "Ixx_MMxx_MMxx"
+        years (list[int]): years of the registration
+        reg_data (list[dict]): registration data, one entry per BY slab
+        majority_slabs (list[dict]): slab index of the CY slab with the most
+        overlap with each BY slab, by year (as a string)
+        updated_since (datetime): time the spreadsheet was built at, by the
+        clock of the database
+        avg_faulting (bool, optional): see build_single_table. Defaults to
+        False.
+        progress (callable, optional): called with the number of years done
+        after each year. Defaults to None.
+        include_intensity_replaced (bool, optional): see build_single_table.
+        Defaults to False.
+
+    Raises:
+        ValueError: if the spreadsheet does not match the registration
+
+    Returns:
+        int: number of rows patched
+    """
+    if (len(table) != len(reg_data)
+        or list(table.columns) != single_spreadsheet_fields(years)):
+        raise ValueError('The spreadsheet does not match the registration, '
+                         'export it again.')
+    patched = np.zeros(len(reg_data), dtype=bool)
+    for done, year in enumerate(years, 1):
+        updated = slab_inventory.fetch_slabs(year, None, seg_str,
+                                             projection=[],
+                                             updated_since=updated_since)
+        if updated:
+            slab_ids = _majority_ids(majority_slabs, year)
+            updated_ids = np.fromiter(updated, dtype=np.int64,
+                                      count=len(updated))
+            rows = np.isin(slab_ids, updated_ids)
+            cy_slabs = None
+            if avg_faulting:
+                cy_slabs = [entry.get(str(year), []) for entry in reg_data]
+                rows |= np.fromiter(
+                    (not updated.keys().isdisjoint(ids) for ids in cy_slabs),
+                    dtype=bool, count=len(cy_slabs)
+                    )
+            rows = np.flatnonzero(rows)
+            if rows.size:
+                slab_ids = slab_ids[rows]
+                needed = set(slab_ids[slab_ids != -1].tolist())
+                if cy_slabs is not None:
+                    cy_slabs = [cy_slabs[row] for row in rows]
+                    needed.update(i for ids in cy_slabs for i in ids)
+                year_table = fetch_year_table(slab_inventory, seg_str, year,
+                                              sorted(needed))
+                for column, values in _year_columns(
+                        year_table, year, slab_ids, cy_slabs,
+                        include_intensity_replaced).items():
+                    table.iloc[rows, table.columns.get_loc(column)] = (
+                        np.asarray(values))
+                patched[rows] = True
+        if progress is not None:
+            progress(done)
+    return int(patched.sum())
+
+
+def write_single_table(table: pd.DataFrame, csv_path: str,
+                       parquet_path: str=None):
+    """Writes the single spreadsheet of a registration to a CSV file, and
+    optionally to a Parquet file.
+
+    Args:
+        table (pd.DataFrame): the spreadsheet (see build_single_table)
+        csv_path (str): path of the CSV file
+        parquet_path (str, optional): path of the Parquet file. Defaults to
+        None (no Parquet file).
+    """
+    table.to_csv(csv_path, index=False, lineterminator='\r\n')
+    if parquet_path is not None:
+        table.to_parquet(parquet_path, index=False)
+
+
+def read_single_table(csv_path: str, parquet_path: str=None) -> pd.DataFrame:
+    """Reads the single spreadsheet of a registration written by
+    write_single_table, from the Parquet file if it exists (it keeps the
+    column types) or else from the CSV file.
+
+    Args:
+        csv_path (str): path of the CSV file
+        parquet_path (str, optional): path of the Parquet file. Defaults to
+        None (no Parquet file).
+
+    Returns:
+        pd.DataFrame: the spreadsheet
+    """
+    if parquet_path is not None and os.path.exists(parquet_path):
+        return pd.read_parquet(parquet_path)
+    columns = pd.read_csv(csv_path, nrows=0).columns
+    dtypes = {column: object for column in columns
+              if column.endswith('_state')}
+    dtypes.update({'interstate': str, 'direction': str,
+                   'replaced_type': object, 'year_replaced': 'Int64'})
+    return pd.read_csv(csv_path, dtype=dtypes, float_precision='round_trip')
@@ -0,0 +1,114 @@
+import argparse
+import os
+import sys
+
+from registration.export import (read_single_table, refresh_single_table,
+                                 write_single_table)
+
+
+def refresh_export(slab_inventory, registration: dict, data_dir: str,
+                   progress=None) -> int:
+    """Refreshes the single spreadsheet of a registration with the slabs
+    annotated since it was last exported, reusing the stored registration
+    instead of running it again. The refreshed spreadsheet replaces the
+    previous one and the export time is updated.
+
+    Args:
+        slab_inventory (SlabInventory): database containing all the slab data
+        registration (dict): the registration entry
+        data_dir (str): folder the spreadsheet was written to
+        progress (callable, optional): called with the number of years done
+        after each year. Defaults to None.
+
+    Raises:
+        ValueError: if the registration was never exported or was made before
+        the majority slabs were stored with it
+
+    Returns:
+        int: number of rows refreshed
+    """
+    export = registration.get('export')
+    if export is None:
+        raise ValueError('The registration was never exported, run the '
+                         'registration to export it.')
+    if registration.get('layout') == 'slabs':
+        reg_data = slab_inventory.fetch_registration_slabs(
+            registration['_id'], registration['first_base_id'],
+            registration['last_base_id'])
+    else:
+        reg_data = registration['registration_data']
+    majority_slabs = [entry.get('majority') for entry in reg_data]
+    if None in majority_slabs:
+        raise ValueError('The registration does not have its majority slabs, '
+                         'run the registration again.')
+
+    csv_path = os.path.join(data_dir, export['csv'])
+    parquet_path = None
+    if export['parquet'] is not None:
+        parquet_path = os.path.join(data_dir, export['parquet'])
+    table = read_single_table(csv_path, parquet_path)
+    exported_at = slab_inventory.server_time()
+    refreshed = refresh_single_table(
+        table, slab_inventory, registration['segment_id'],
+        registration['years'], reg_data, majority_slabs,
+        export['exported_at'], export['avg_faulting'], progress,
+        export['include_intensity_replaced'])
+    if refreshed:
+        write_single_table(table, csv_path, parquet_path)
+    slab_inventory.update_registration_export(
+        registration['_id'], export | {'exported_at': exported_at})
+    return refreshed
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description='Refreshes the spreadsheet of a registration with the '
+                    'slabs annotated since it was exported'
+    )
+    parser.add_argument('-d',
+                        metavar='<filepath>',
+                        type=str,
+                        required=True,
+                        help='Directory the spreadsheet was written to')
+    parser.add_argument('-i',
+                        metavar='<interstate>',
+                        type=str,
+                        required=True,
+                        help='Interstate of data (eg. I16WB)')
+    parser.add_argument('-b',
+                        metavar='<beginning MM>',
+                        type=str,
+                        required=True,
+                        help='begining MM of the segment')
+    parser.add_argument('-e',
+                        metavar='<ending MM>',
+                        type=str,
+                        required=True,
+                        help='ending MM of the segment')
+    parser.add_argument('--by',
+                        metavar='<base year>',
+                        type=int,
+                        required=True,
+                        help='Base year of the registration')
+    parser.add_argument('-y',
+                        metavar='<year>',
+                        type=int,
+                        nargs='*',
+                        default=None,
+                        help='Years of the registration, if the segment has '
+                             'several registrations with that base year')
+    args = parser.parse_args()
+
+    from database.db import SlabInventory
+    slab_inventory = SlabInventory()
+    reg_filter = {'segment_id': f'{args.i}_MM{args.b}_MM{args.e}',
+                  'base_year': args.by}
+    if args.y:
+        reg_filter['years'] = sorted(args.y)
+    registrations = list(slab_inventory.all_registration_data(reg_filter))
+    if len(registrations) != 1:
+        sys.exit(f'Found {len(registrations)} registrations of '
+                 f'{reg_filter["segment_id"]} with base year {args.by}, '
+                 'select one with -y.')
+    refreshed = refresh_export(slab_inventory, registrations[0], args.d)
+    print(f'Refreshed {refreshed} rows')
@@ -1,11 +1,10 @@
 import copy
 import sys, os
-import csv
 import pandas as pd
-from tqdm import tqdm
 from os.path import exists
 from registration import overlap
 from registration.overlap import OverlapType, AlignmentType
+from registration.export import build_single_table, write_single_table
 from PyQt5.QtCore import QObject, pyqtSignal
 
 class SlabRegistration(QObject):
@@ -17,7 +16,7 @@ class SlabRegistration(QObject):
     def __init__(self, slab_inventory, seg_str: str, data_dir: str, mode: str,
                  by: int, years: list, first_slabs: list, 
                  include_replaced=True, include_intensity_replaced=False,
-                 ratio: float = 0.5):
+                 ratio: float = 0.5, export_parquet=False):
         super().__init__()
         self.slab_inventory = slab_inventory
         self.MEMBERSHIP_THRESHOLD = ratio
@@ -38,6 +37,8 @@ class SlabRegistration(QObject):
         self.mode = mode
         self.include_replaced = include_replaced
         self.include_intensity_replaced = include_intensity_replaced
+        # also write the spreadsheet to a Parquet file
+        self.export_parquet = export_parquet
         by_start_slab = self.first_slabs[self.years.index(self.by)]
         self.by_slabs = list(self.slab_inventory.get_year_slab_data(seg_str,
             self.by, by_start_slab))
@@ -60,15 +61,16 @@ class SlabRegistration(QObject):
     def run(self):
         """Carries out registration for each year.
         """
-        self.slab_inventory.create_registration_entry(self.seg_str, self.by, 
-                                                      self.years)
+        self.reg_id = self.slab_inventory.create_registration_entry(
+            self.seg_str, self.by, self.years)
         for year, first_slab in zip(self.years, self.first_slabs):
             if year != self.by: 
                 self.categorize_by_length(year, first_slab)
         self.slab_inventory.update_registration_data(self.reg_data, 
                                                      self.seg_str, 
                                                      self.by, 
-                                                     self.years)
+                                                     self.years,
+                                                     self.majority_slabs)
         if self.mode == 'single':
             self.build_single_spreadsheet(
                 avg_faulting=False,
@@ -239,108 +241,41 @@ class SlabRegistration(QObject):
         with the BY slab. If the avg_faulting flag is set to True, then all 
         CY slabs' faulting values that are associated with the BY slab will be
         averaged together instead of just using the CY slab with the majority 
-        overlap.
+        overlap. The spreadsheet is built a column at a time from the slabs 
+        of each year (see registration.export) and written in one go, to CSV
+        and, if export_parquet is set, to Parquet. The export is recorded in
+        the registration entry, so the spreadsheet can then be refreshed with
+        the slabs annotated since (see registration.refresh).
 
         Args:
             avg_faulting (bool, optional): If True, the average faulting of the
             CY slabs will be calculated. Defaults to False.
+            include_intensity_replaced (bool, optional): If True, slabs
+            annotated as replaced on the intensity images have the R state.
+            Defaults to False.
         """
-  
         self.reset_progress.emit()
-        self.progress_max.emit(len(self.reg_data))  
-            
-        metadata = self.seg_str.split('_')
-        interstate = metadata[0]
-        beginMM = int(metadata[1][2:])
-        csv_name = (
-            f'{self.seg_str}_{self.years[0]}_{self.years[-1]}_single.csv')
-        spread_path = os.path.join(self.data_dir, csv_name)
-        with open(spread_path, "w", newline="") as csv_file:
-            fields = ['interstate', 'direction', 'MP_from', 'MP_to', 'BY_id',
-                      'BY_length (ft)']
-            for year in self.years:
-                fields.append(f'{year}_state')
-            for year in self.years:
-                fields.append(f'{year}_faulting')
-            for year in self.years:
-                fields.append(f'{year}_total_crack_length')
-            for year in self.years:
-                fields.append(f'{year}_median_crack_width')
-            for year in self.years:
-                fields.append(f'{year}_p95_faulting')
-            curr_MP = beginMM
-            fields.extend(['year_replaced', 'replaced_type'])
-            writer = csv.DictWriter(csv_file, fieldnames=fields)    
-            writer.writeheader()
-            i_name = interstate[0:-2]
-            direction = interstate[-2:].upper()
-            for i, entry in tqdm(enumerate(self.reg_data), 
-                                 total=len(self.reg_data)):
-                row_dict = {'interstate': i_name, 
-                            'direction': direction,
-                            'year_replaced': entry['replaced'],
-                            'replaced_type': entry['replaced_type']}
-                for year in self.years:
-                    yr_slab = None
-                    if str(year) in self.majority_slabs[i]:
-                        yr_id = self.majority_slabs[i][str(year)]
-                        yr_slab = self.slab_inventory.fetch_slab(
-                            year, yr_id, self.seg_str)
-                        # TODO: Add parameter to show annotated intensity images
-                        # if ('intensity_replaced' in yr_slab and (include_intensity_replaced 
-                        #     and yr_slab['intensity_replaced'] == 'R')) or yr_slab['special_state'] == 'R':  
-                        #     row_dict[f'{year}_state'] = 'R'
-                        # else:
-                        #     row_dict[f'{year}_state'] = yr_slab['primary_state']
-
-                        row_dict[f'{year}_faulting'] = (
-                            self.avg_faulting_BY(i, year) if avg_faulting
-                            else yr_slab['median_faulting']
-                            )
-                        row_dict[f'{year}_p95_faulting'] = yr_slab['p95_faulting']
-                        row_dict[f'{year}_total_crack_length'] = yr_slab['total_crack_length'] if 'total_crack_length' in yr_slab else None
-                        row_dict[f'{year}_median_crack_width'] = yr_slab['median_crack_width'] if 'median_crack_width' in yr_slab else None
-                    if year == self.by:
-                        row_dict['BY_id'] = yr_id
-                        row_dict['BY_length (ft)'] = round(yr_slab['length'] / 
-                                                           304.8, 2)
-                        row_dict['MP_from'] = curr_MP
-                        curr_MP += (round(yr_slab['length'] / 1609000, 5) 
-                                    if direction in ['NB', 'EB'] 
-                                    else -round(yr_slab['length'] / 1609000, 5))
-                        row_dict['MP_to'] = curr_MP
-                writer.writerow(row_dict)
-                self.progress.emit(i + 1)
-        
-
-    def avg_faulting_BY(self, byi, year):
-        """Calculates the average faulting of a BY slab. Uses the base year 
-        index (zero-indexed, representing the i-th BY slab in the list of BY)
-
-        Args:
-            byi (int): index of the BY slab
-            year (int): year of the CY slabs to look at
-
-        Returns:
-            float: average faulting of the BY slab
-        """
-        total = 0
-        count = 0
-        cy_slab_ids = self.reg_data[byi][str(year)]
-        for cy_id in cy_slab_ids:
-            slab = self.slab_inventory.fetch_slab(year, cy_id, self.seg_str)
-            if slab['mean_faulting']:
-                total += slab['mean_faulting']
-                count += 1
-
-        if total == 0:
-            return None
-        return total / count
-
-
-                    
-
-
-
-    
-
+        # one step per year, and one for writing the files
+        self.progress_max.emit(len(self.years) + 1)
+        # taken before reading the slabs, so slabs annotated during the 
+        # export are refreshed
+        exported_at = self.slab_inventory.server_time()
+        table = build_single_table(self.slab_inventory, self.seg_str, 
+                                   self.years, self.by, self.reg_data, 
+                                   self.majority_slabs, avg_faulting, 
+                                   self.progress.emit, 
+                                   include_intensity_replaced)
+        name = f'{self.seg_str}_{self.years[0]}_{self.years[-1]}_single'
+        parquet_path = None
+        if self.export_parquet:
+            parquet_path = os.path.join(self.data_dir, f'{name}.parquet')
+        write_single_table(table, os.path.join(self.data_dir, f'{name}.csv'),
+                           parquet_path)
+        self.slab_inventory.update_registration_export(self.reg_id, {
+            'exported_at': exported_at,
+            'avg_faulting': avg_faulting,
+            'include_intensity_replaced': include_intensity_replaced,
+            'csv': f'{name}.csv',
+            'parquet': f'{name}.parquet' if self.export_parquet else None
+            })
+        self.progress.emit(len(self.years) + 1)
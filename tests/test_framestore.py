@@ -0,0 +1,38 @@
+import numpy as np
+
+from file_manager.framestore import FrameStore
+
+
+def make_store(ids: list[int]) -> FrameStore:
+    """Builds a store of 2x3 frames, frame i of the segment filled with i."""
+    frames = np.stack([np.full((2, 3), i, dtype=np.uint8)
+                       for i in range(len(ids))][::-1])
+    files = [f'frame_{i}.jpg' for i in range(len(ids))]
+    return FrameStore(frames, files, np.array(ids, dtype=np.int64), 0)
+
+
+def frame_values(mosaic: np.ndarray) -> list[int]:
+    return [int(frame[0, 0]) for frame in mosaic.reshape(-1, 2, 3)]
+
+
+def test_mosaic_by_id():
+    store = make_store([1, 2, 3, 4])
+    assert frame_values(store.mosaic_by_id(2, 4)) == [3, 2, 1]
+    assert frame_values(store.mosaic_by_id(3, 3)) == [2]
+
+
+def test_mosaic_by_id_missing_frame():
+    store = make_store([1, 2, 4])
+    assert store.mosaic_by_id(1, 3) is None
+    assert store.mosaic_by_id(3, 4) is None
+    assert store.mosaic_by_id(4, 5) is None
+    assert frame_values(store.mosaic_by_id(1, 2)) == [1, 0]
+
+
+def test_mosaic_by_id_file_without_id():
+    # file names are sorted by name, so a file without an id (-1) can be
+    # anywhere in the store
+    for ids in ([-1, 1, 2], [1, -1, 2], [1, 2, -1]):
+        store = make_store(ids)
+        assert store.mosaic_by_id(1, 2) is None
+        assert store.mosaic_by_id(-1, -1) is None
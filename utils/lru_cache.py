@@ -0,0 +1,95 @@
+import threading
+from collections import OrderedDict
+
+
+class LRUCache:
+    def __init__(self, max_size: int, size_of=None):
+        """Thread-safe least recently used cache bounded by the total size of
+        its values. When the cache is full, the least recently used values are
+        evicted first.
+
+        Args:
+            max_size (int): maximum total size of the cached values
+            size_of (callable, optional): function returning the size of a
+            value. Defaults to None (every value has a size of 1, so max_size
+            is the maximum number of values).
+        """
+        self.max_size = max_size
+        self.size_of = size_of if size_of is not None else lambda value: 1
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+
+    def get(self, key, default=None):
+        """Gets a value from the cache and marks it as the most recently used.
+        Counts a hit if the key is cached and a miss otherwise.
+
+        Args:
+            key (hashable): key of the value
+            default (optional): returned if the key is not cached. Defaults to
+            None.
+
+        Returns:
+            the cached value, or default if the key is not cached
+        """
+        with self._lock:
+            if key not in self._items:
+                self.misses += 1
+                return default
+            self.hits += 1
+            self._items.move_to_end(key)
+            return self._items[key][0]
+
+
+    def put(self, key, value):
+        """Adds a value to the cache, evicting the least recently used values
+        until the cache fits in its maximum size. Values larger than the
+        maximum size are not cached.
+
+        Args:
+            key (hashable): key of the value
+            value: value to cache
+        """
+        size = self.size_of(value)
+        with self._lock:
+            if key in self._items:
+                self.size -= self._items.pop(key)[1]
+            if size > self.max_size:
+                return
+            self._items[key] = (value, size)
+            self.size += size
+            while self.size > self.max_size:
+                self.size -= self._items.popitem(last=False)[1][1]
+
+
+    def pop(self, key):
+        """Removes a value from the cache, if cached.
+
+        Args:
+            key (hashable): key of the value
+        """
+        with self._lock:
+            if key in self._items:
+                self.size -= self._items.pop(key)[1]
+
+
+    def clear(self):
+        """Removes every value from the cache. The hit and miss counters are
+        kept.
+        """
+        with self._lock:
+            self._items.clear()
+            self.size = 0
+
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._items
+
+
+    def __len__(self):
+        with self._lock:
+            return len(self._items)
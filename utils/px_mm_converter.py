@@ -1,5 +1,21 @@
+import numpy as np
+
+
 class PXMMConverter:
     def __init__(self, px_height, px_width, mm_height, mm_width, num_images):
+        """Converts coordinates between the pixels of the images of a segment
+        and millimeters along the segment. Every conversion also accepts
+        NumPy arrays of coordinates and image indices (broadcast against each
+        other) and then returns arrays, so all the points of an image or of
+        a segment can be converted in a single call.
+
+        Args:
+            px_height (int): height of an image in pixels
+            px_width (int): width of an image in pixels
+            mm_height (int): height of an image in millimeters
+            mm_width (int): width of an image in millimeters
+            num_images (int): number of images in the segment
+        """
         self.px_height = px_height
         self.px_width = px_width
         self.mm_height = mm_height
@@ -11,53 +27,71 @@ class PXMMConverter:
 
     def convert_px_to_mm_relative(self, px_x, px_y, img_index):
         """Converts pixel coordinates to millimeter coordinates. Assumes that
-        the origin for px measurement is the top left corner of the image and 
-        the origin for the mm measurement is the bottom left corner of the 
+        the origin for px measurement is the top left corner of the image and
+        the origin for the mm measurement is the bottom left corner of the
         image. y-values are relative to the first image of the segment.
 
         Args:
-            x (float): x-coordinate in pixels
-            y (float): y-coordinate in pixels, use absolute value in terms of 
-            a single image
-            img_index (int): index of the image in the segment (zero-indexed)
-
+            px_x (float | np.ndarray): x-coordinate(s) in pixels
+            px_y (float | np.ndarray): y-coordinate(s) in pixels, use absolute
+            value in terms of a single image
+            img_index (int | np.ndarray): index of the image(s) in the segment
+            (zero-indexed)
 
         Returns:
-            tuple: (x, y) in millimeters
+            tuple: (x, y) in millimeters, arrays if any argument is an array
         """
-        mm_x = px_x / self.scale_factor_x
-        abs_mm_y = (self.px_height - px_y) / self.scale_factor_y 
-        mm_y = abs_mm_y + img_index * self.mm_height
-        return (mm_x, mm_y)
+        mm_x = np.divide(px_x, self.scale_factor_x)
+        abs_mm_y = np.subtract(self.px_height, px_y) / self.scale_factor_y
+        mm_y = abs_mm_y + np.multiply(img_index, self.mm_height)
+        return (self._unwrap(mm_x), self._unwrap(mm_y))
 
 
     def convert_mm_to_px(self, mm_x, mm_y, img_index):
         """Converts millimeter coordinates to px coordinates. Assumes that
-        the origin for px measurement is the top left corner of the image and 
-        the origin for the mm measurement is the bottom left corner of the 
+        the origin for px measurement is the top left corner of the image and
+        the origin for the mm measurement is the bottom left corner of the
         image. y-values are relative to the first image of the segment.
 
         Args:
-            x (float): x-coordinate in pixels
-            y (float): y-coordinate in pixels, use absolute value in terms of a
-            single image
-            img_index (int): index of the current image in the segment
+            mm_x (float | np.ndarray): x-coordinate(s) in millimeters
+            mm_y (float | np.ndarray): y-coordinate(s) in millimeters, in
+            terms of a single image
+            img_index (int | np.ndarray): index of the current image(s) in
+            the segment
+
+        Returns:
+            tuple: (x, y) in pixels, arrays if any argument is an array
         """
-        px_x = mm_x * self.scale_factor_x
-        abs_px_y = self.px_height - mm_y * self.scale_factor_y
-        px_y = (self.num_images - img_index - 1) * self.px_height + abs_px_y
-        return (px_x, px_y)
-    
+        px_x = np.multiply(mm_x, self.scale_factor_x)
+        abs_px_y = self.px_height - np.multiply(mm_y, self.scale_factor_y)
+        px_y = (np.subtract(self.num_images - 1, img_index) * self.px_height
+                + abs_px_y)
+        return (self._unwrap(px_x), self._unwrap(px_y))
+
 
     def px_abs_to_rel(self, px_y, img_index):
         """Converts absolute pixel y-coordinate to relative pixel y-coordinate
         in terms of the first image in the segment.
 
         Args:
-            px_y (float): y-coordinate in pixels
-            img_index (int): index of the current image in the segment
+            px_y (float | np.ndarray): y-coordinate(s) in pixels
+            img_index (int | np.ndarray): index of the current image(s) in
+            the segment
 
         Returns:
-            float: relative y-coordinate in pixels
+            float | np.ndarray: relative y-coordinate(s) in pixels
         """
-        return px_y + (self.num_images - img_index - 1) * self.px_height
+        return self._unwrap(
+            np.add(px_y, np.subtract(self.num_images - 1, img_index)
+                   * self.px_height)
+            )
+
+
+    @staticmethod
+    def _unwrap(value):
+        # conversions of scalars return Python numbers, as before arrays were
+        # accepted
+        if isinstance(value, np.ndarray):
+            return value
+        return value.item() if isinstance(value, np.generic) else value
@@ -1,15 +1,16 @@
 import sys
 import os
 from PyQt5.QtWidgets import (QApplication, QMainWindow, QHBoxLayout, 
-                             QAbstractButton, QStyle, QWidget)
+                             QAbstractButton, QStyle, QWidget, QLabel)
 from PyQt5.QtGui import QIntValidator, QIcon
 from PyQt5 import QtCore
 from PyQt5.QtCore import pyqtSlot
-from PyQt5.uic import loadUi
+from views.ui_loader import load_ui
 
 class AnnotationTool(QMainWindow):
     os.environ["QT_AUTO_SCREEN_SCALE_FACTOR"] = "1" 
-    def __init__(self, tool_controller, tool_model, year_panels):
+    def __init__(self, tool_controller, tool_model, year_panels, 
+                 debug_caches=None):
         """Constructor for the main annotation tool window
 
         Args:
@@ -17,12 +18,15 @@ class AnnotationTool(QMainWindow):
             tool_model (ToolModel): Model for tool window
             year_panels (dict[int, YearPanel]): Dictionary of year panels for
             each registration year
+            debug_caches (dict[str, LRUCache], optional): if provided, the
+            hit and miss counts of these caches are shown in the status bar.
+            Defaults to None.
         """
         super().__init__()
         self._tool_controller = tool_controller
         self._tool_model = tool_model
         self._year_panels = year_panels
-        loadUi('resources/mainapp.ui', self)
+        load_ui('mainapp', self)
         self.setWindowTitle('JPCP Annotation Tool')
         self.secondary_icon = self.style().standardIcon(
             QStyle.SP_DialogYesButton
@@ -108,12 +112,63 @@ class AnnotationTool(QMainWindow):
         self.num_lbl.setText("/"+ str(self._tool_model.last_BY_index))
         self.populate_year_buttons()
 
+        # failures to save the annotations are shown in the status bar
+        self._tool_model.slab_writer.write_failed.connect(self.on_write_failed)
+        self._tool_model.slab_writer.write_recovered.connect(
+            self.on_write_recovered
+        )
+
+        # cache statistics, refreshed every second
+        self._debug_caches = debug_caches
+        if debug_caches:
+            self.cache_stats_lbl = QLabel()
+            self.statusBar().addPermanentWidget(self.cache_stats_lbl)
+            self.debug_timer = QtCore.QTimer(self)
+            self.debug_timer.timeout.connect(self.show_cache_stats)
+            self.debug_timer.start(1000)
+
         # radiate a signal to display the first slabs
         self._tool_controller.update_slabs_displayed(
             str(self._tool_model.first_BY_index),
             self.slab_form)
 
     
+    def show_cache_stats(self):
+        """Shows the hit and miss counts and the size of the debug caches in
+        the status bar.
+        """
+        stats = []
+        for name, cache in self._debug_caches.items():
+            stats.append(f'{name}: {cache.hits} hits, {cache.misses} misses, '
+                         f'{len(cache)} cached '
+                         f'({cache.size / (1024 * 1024):.0f} MB)')
+        self.cache_stats_lbl.setText(' | '.join(stats))
+
+
+    @pyqtSlot(str)
+    def on_write_failed(self, error):
+        """Shows that the annotations could not be saved to the database. 
+        The changes are kept and saved again with the next write.
+
+        Args:
+            error (str): error raised by the database
+        """
+        self.statusBar().setStyleSheet('color: red')
+        self.statusBar().showMessage(
+            f'Could not save changes of '
+            f'{self._tool_model.slab_writer.pending_count()} slab(s), '
+            f'retrying: {error}'
+        )
+
+
+    @pyqtSlot()
+    def on_write_recovered(self):
+        """Clears the save failure message once the changes are saved.
+        """
+        self.statusBar().setStyleSheet('')
+        self.statusBar().showMessage('Changes saved', 5000)
+
+
     def populate_year_buttons(self):
         """Populates the text of the year buttons in the main annotation tool
         """
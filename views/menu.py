@@ -5,7 +5,7 @@ from PyQt5.QtWidgets import (QApplication, QMainWindow, QVBoxLayout, QAction,
 from PyQt5.QtGui import QPalette, QColor
 from PyQt5 import QtCore
 from PyQt5.QtCore import pyqtSlot
-from PyQt5.uic import loadUi
+from views.ui_loader import load_ui
 
 class MainMenu(QMainWindow):
     def __init__(self, menu_controller, menu_model, classification_view,
@@ -15,7 +15,7 @@ class MainMenu(QMainWindow):
         self._menu_model = menu_model
         self._classification_view = classification_view 
         self._registration_view = registration_view
-        loadUi('resources/menu.ui', self)
+        load_ui('menu', self)
         self.setWindowTitle('Main Menu')
 
         # listen to changes from model
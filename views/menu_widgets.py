@@ -6,7 +6,7 @@ from PyQt5.QtWidgets import (QApplication, QMainWindow, QVBoxLayout, QAction,
 from PyQt5.QtGui import QPalette, QColor, QIntValidator, QDoubleValidator
 from PyQt5 import QtCore
 from PyQt5.QtCore import pyqtSlot, QThread, pyqtSignal
-from PyQt5.uic import loadUi
+from views.ui_loader import load_ui
 
 
 class ClassificationMenu(QWidget):
@@ -14,7 +14,7 @@ class ClassificationMenu(QWidget):
         super().__init__()
         self._classification_controller = classification_controller
         self._classification_model = classification_model
-        loadUi('resources/classification_menu.ui', self)
+        load_ui('classification_menu', self)
         self.setWindowTitle('Classification Menu')
 
     
@@ -64,7 +64,7 @@ class RegistrationMenu(QWidget):
         self._registration_controller = registration_controller
         self._registration_model = registration_model
         self.id_text_edits = {}
-        loadUi('resources/registration_menu.ui', self)
+        load_ui('registration_menu', self)
         self.setWindowTitle('Registration Menu')
         self.reg_progress.setVisible(False)
         self.year_btn_group = QButtonGroup()
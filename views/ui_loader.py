@@ -0,0 +1,68 @@
+import argparse
+import importlib
+import os
+import time
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+UI_DIR = os.path.join(ROOT_DIR, 'resources')
+COMPILED_DIR = os.path.join(ROOT_DIR, 'views', 'compiled')
+# time spent building each window from its .ui file, by .ui file name
+ui_load_times = {}
+
+
+def load_ui(name: str, widget):
+    """Builds the widgets of a .ui file into a widget. Uses the UI class
+    precompiled with pyuic (see compile_all) if it exists and is newer than
+    the .ui file, which is faster than parsing the .ui file with loadUi.
+    Either way, the child widgets are set as attributes of the widget.
+
+    Args:
+        name (str): name of the .ui file in the resources folder, without the
+        extension
+        widget (QWidget): widget to build the UI into
+    """
+    start = time.perf_counter()
+    ui_path = os.path.join(UI_DIR, f'{name}.ui')
+    compiled_path = os.path.join(COMPILED_DIR, f'{name}_ui.py')
+    module = None
+    # the compiled class is only used if it is up to date with the .ui file
+    if (os.path.exists(compiled_path) 
+        and os.path.getmtime(compiled_path) >= os.path.getmtime(ui_path)):
+        module = importlib.import_module(f'views.compiled.{name}_ui')
+    if module is None:
+        from PyQt5.uic import loadUi
+        loadUi(ui_path, widget)
+    else:
+        ui_class = next(getattr(module, attr) for attr in dir(module)
+                        if attr.startswith('Ui_'))
+        ui = ui_class()
+        ui.setupUi(widget)
+        for attr, value in vars(ui).items():
+            setattr(widget, attr, value)
+    ui_load_times[name] = time.perf_counter() - start
+
+
+def compile_all():
+    """Compiles every .ui file in the resources folder into a Python module
+    in views/compiled. Needs to be run again after a .ui file is changed.
+    """
+    from PyQt5.uic import compileUi
+    os.makedirs(COMPILED_DIR, exist_ok=True)
+    open(os.path.join(COMPILED_DIR, '__init__.py'), 'w').close()
+    for file in sorted(os.listdir(UI_DIR)):
+        if not file.endswith('.ui'):
+            continue
+        name = file[:-len('.ui')]
+        with open(os.path.join(UI_DIR, file)) as ui_file, \
+             open(os.path.join(COMPILED_DIR, f'{name}_ui.py'), 'w') as py_file:
+            compileUi(ui_file, py_file)
+        print(f'Compiled {file}')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description='Precompiles the .ui files of the application with pyuic '
+                    'for faster startup'
+    )
+    parser.parse_args()
+    compile_all()
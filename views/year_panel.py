@@ -1,10 +1,13 @@
 import sys, os
 from PyQt5.QtWidgets import QWidget, QButtonGroup, QAbstractButton, QStyle, QApplication
 
-from PyQt5.uic import loadUi
+from views.ui_loader import load_ui
 from PyQt5.QtCore import pyqtSlot, Qt
 from PyQt5.QtGui import QPixmap, QIcon
 class YearPanel(QWidget):
+    # (width, height) the slab images are displayed at
+    IMAGE_SIZE = (330, 500)
+
     def __init__(self, year_panel_controller, year_panel_model):    
         super().__init__()
         self._year_panel_controller = year_panel_controller
@@ -12,7 +15,7 @@ class YearPanel(QWidget):
         self.secondary_icon = self.style().standardIcon(
             QStyle.SP_DialogYesButton
             ) 
-        loadUi('resources/year_panel.ui', self)
+        load_ui('year_panel', self)
         # Set up buttons so slab states can be annotated
         self.state_btn_group = QButtonGroup()   
         self.state_btn_group.setExclusive(False)
@@ -65,8 +68,8 @@ class YearPanel(QWidget):
     @pyqtSlot(str)
     def on_BY_slab_changed(self, slab_dir):
         try:
-            img = self._year_panel_controller.get_slab_image()
-            img = img.scaled(330, 500, 1, 0)
+            img = self._year_panel_controller.get_scaled_slab_pixmap(
+                *self.IMAGE_SIZE)
             self.slab_img.setPixmap(img)
         except Exception as e:
             self.slab_img.setText(str(e))